@@ -4,31 +4,55 @@
 
 import typing as _t
 
+from .funcs_stats import register_routes as _register_routes
 from .node_dict_add_any import StringConstructorDictAddAny
 from .node_dict_add_string import StringConstructorDictAddString
 from .node_dict_key_extract import StringConstructorDictExtractString
+from .node_dict_merge import StringConstructorDictMerge
+from .node_dict_from_file import StringConstructorDictFromFile
 from .node_dict_from_text import StringConstructorDictFromText
 from .node_dict_preview import StringConstructorDictPreview
+from .node_dict_prune import StringConstructorDictPrune
 from .node_formatter import StringConstructorFormatter
+from .node_formatter_batch import StringConstructorFormatterBatch
+from .node_formatter_combinations import StringConstructorFormatterCombinations
+from .node_formatter_multi import StringConstructorFormatterMulti
+from .node_template_compile import StringConstructorTemplateCompile
 from .node_validate_keys import StringConstructorValidateKeys
 
 NODE_CLASS_MAPPINGS: _t.Dict[str, type] = {
 	'StringConstructorDictAddAny': StringConstructorDictAddAny,
 	'StringConstructorDictAddString': StringConstructorDictAddString,
 	'StringConstructorDictExtractString': StringConstructorDictExtractString,
+	'StringConstructorDictFromFile': StringConstructorDictFromFile,
 	'StringConstructorDictFromText': StringConstructorDictFromText,
+	'StringConstructorDictMerge': StringConstructorDictMerge,
 	'StringConstructorDictPreview': StringConstructorDictPreview,
+	'StringConstructorDictPrune': StringConstructorDictPrune,
 	'StringConstructorFormatter': StringConstructorFormatter,
+	'StringConstructorFormatterBatch': StringConstructorFormatterBatch,
+	'StringConstructorFormatterCombinations': StringConstructorFormatterCombinations,
+	'StringConstructorFormatterMulti': StringConstructorFormatterMulti,
+	'StringConstructorTemplateCompile': StringConstructorTemplateCompile,
 	'StringConstructorValidateKeys': StringConstructorValidateKeys,
 }
 NODE_DISPLAY_NAME_MAPPINGS: _t.Dict[str, str] = {
 	'StringConstructorDictAddAny': "Add ANY to Dict",
 	'StringConstructorDictAddString': "Add String to Dict",
 	'StringConstructorDictExtractString': "Extract String from Dict",
+	'StringConstructorDictFromFile': "Dict from File",
 	'StringConstructorDictFromText': "Dict from Text",
+	'StringConstructorDictMerge': "Merge Dicts",
 	'StringConstructorDictPreview': "Preview Dict",
+	'StringConstructorDictPrune': "Prune Dict by Template",
 	'StringConstructorFormatter': "String Formatter",
+	'StringConstructorFormatterBatch': "String Formatter (Batch)",
+	'StringConstructorFormatterCombinations': "String Formatter (Combinations)",
+	'StringConstructorFormatterMulti': "String Formatter (Multi)",
+	'StringConstructorTemplateCompile': "Compile Template",
 	'StringConstructorValidateKeys': "Validate Dict",
 }
 
+_register_routes()
+
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
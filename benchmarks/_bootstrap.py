@@ -0,0 +1,52 @@
+# encoding: utf-8
+"""
+Helpers to import the node-pack modules outside of ComfyUI.
+
+The pack's root ``__init__.py`` registers all the nodes (and thus, imports ComfyUI itself).
+Benchmarks only need the internal modules, so the package is registered here as a bare namespace,
+without running its ``__init__.py``.
+
+The modules still import a few ComfyUI modules themselves. Outside of ComfyUI, lightweight stand-ins
+from ``_stubs`` are used instead: they're appended to the end of ``sys.path``, so the real ComfyUI modules
+(if they're importable) always take precedence.
+"""
+
+import typing as _t
+
+from importlib import import_module as _import_module
+from pathlib import Path as _Path
+import sys as _sys
+import types as _types
+
+
+PACKAGE_NAME = 'string_constructor'
+PACKAGE_DIR = _Path(__file__).resolve().parent.parent
+STUBS_DIR = _Path(__file__).resolve().parent / '_stubs'
+
+
+def _add_comfy_stand_ins():
+	stubs_dir = str(STUBS_DIR)
+	if stubs_dir not in _sys.path:
+		_sys.path.append(stubs_dir)
+
+
+def _register_bare_package():
+	if PACKAGE_NAME in _sys.modules:
+		return
+	package = _types.ModuleType(PACKAGE_NAME)
+	package.__path__ = [str(PACKAGE_DIR)]
+	package.__package__ = PACKAGE_NAME
+	_sys.modules[PACKAGE_NAME] = package
+
+
+def pack_module(name: str) -> _types.ModuleType:
+	"""Import a module of the node pack by its name (e.g.: ``'funcs_template'``)."""
+	_add_comfy_stand_ins()
+	_register_bare_package()
+	return _import_module(f'{PACKAGE_NAME}.{name}')
+
+
+def best_time(func: _t.Callable[[], _t.Any], repeat: int = 5, number: int = 1) -> float:
+	"""The best (lowest) time of a single call, in seconds."""
+	from timeit import repeat as _repeat
+	return min(_repeat(func, repeat=repeat, number=number)) / number
@@ -0,0 +1,2 @@
+# encoding: utf-8
+"""A lightweight stand-in for ComfyUI's ``comfy`` package: only what the node pack imports."""
@@ -0,0 +1,17 @@
+# encoding: utf-8
+"""A stand-in for ``comfy.comfy_types.node_typing``: only the types the node pack uses."""
+
+from enum import Enum as _Enum
+
+
+class StrEnum(str, _Enum):
+	def __str__(self) -> str:
+		return str(self.value)
+
+
+class IO(StrEnum):
+	STRING = 'STRING'
+	BOOLEAN = 'BOOLEAN'
+	INT = 'INT'
+	FLOAT = 'FLOAT'
+	ANY = '*'
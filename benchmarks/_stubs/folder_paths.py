@@ -0,0 +1,8 @@
+# encoding: utf-8
+"""A stand-in for ComfyUI's ``folder_paths`` module."""
+
+import os as _os
+
+
+def get_input_directory() -> str:
+	return _os.getcwd()
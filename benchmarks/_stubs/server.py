@@ -0,0 +1,14 @@
+# encoding: utf-8
+"""A stand-in for ComfyUI's ``server`` module: status messages are only counted, not sent anywhere."""
+
+
+class _PromptServerInstance:
+	def __init__(self):
+		self.n_messages = 0
+
+	def send_progress_text(self, text: str, node_id: str):
+		self.n_messages += 1
+
+
+class PromptServer:
+	instance = _PromptServerInstance()
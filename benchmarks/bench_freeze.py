@@ -0,0 +1,73 @@
+# encoding: utf-8
+"""
+Benchmark: the cost of freezing non-string values added to a dict (like the ones from ``Dict: Add ANY``).
+
+``frozendict.deepfreeze()`` (used for every added value up to v1.1) is compared against ``_frozen_value()``,
+which skips already immutable values and opaque objects, and freezes huge sequences with a single copy.
+
+Run from the repo root::
+
+	python benchmarks/bench_freeze.py
+"""
+
+from _bootstrap import best_time, pack_module
+
+from frozendict import deepfreeze as _deepfreeze
+
+
+class _OpaqueTensor:
+	"""A stand-in for a tensor-like object: not a container, but has a ``__dict__``."""
+	def __init__(self, n: int):
+		self.data = bytearray(n)
+		self.shape = (n, )
+
+
+def _payloads():
+	return {
+		'list: 100k ints': list(range(100_000)),
+		'tuple: 100k ints': tuple(range(100_000)),
+		'list: 10k small dicts': [{'i': i, 'tags': ['a', 'b']} for i in range(10_000)],
+		'dict: 1k lists of 10': {f'k{i}': list(range(10)) for i in range(1000)},
+		'opaque object (tensor-like)': _OpaqueTensor(1 << 20),
+		'int': 42,
+	}
+
+
+def main():
+	format_dict_module = pack_module('format_dict')
+	frozen_value = format_dict_module._frozen_value
+	from_mapping = format_dict_module.FormatDict.from_mapping
+
+	print(f"{'payload':<30} {'deepfreeze, ms':>15} {'frozen_value, ms':>17} {'speedup':>8}  kept as-is")
+	for name, payload in _payloads().items():
+		deep_time = best_time(lambda: _deepfreeze(payload))
+		new_time = best_time(lambda: frozen_value(payload))
+		print(
+			f"{name:<30} {deep_time * 1e3:>15.3f} {new_time * 1e3:>17.3f} {deep_time / max(new_time, 1e-9):>7.0f}x"
+			f"  {frozen_value(payload) is payload}"
+		)
+
+	# A chain of dict nodes, each adding its own big list - the way Add ANY nodes are chained in a workflow:
+	n_nodes = 20
+	big_list = list(range(50_000))
+
+	def chain():
+		format_dict = from_mapping({})
+		for i in range(n_nodes):
+			format_dict = format_dict.updated({f'list_{i}': big_list})
+		return format_dict
+
+	def chain_deepfreeze():
+		format_dict = from_mapping({})
+		for i in range(n_nodes):
+			format_dict = format_dict.updated({f'list_{i}': _deepfreeze(big_list)})
+		return format_dict
+
+	print(
+		f"\nChain of {n_nodes} nodes, each adding a list of {len(big_list)} ints: "
+		f"{best_time(chain_deepfreeze) * 1e3:.1f} ms (deepfreeze) vs {best_time(chain) * 1e3:.1f} ms"
+	)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,128 @@
+# encoding: utf-8
+"""
+Benchmark: the start-up cost of the node pack - the way ComfyUI loads it.
+
+Each measurement is done in a fresh interpreter:
+- ``import`` of the whole package (its ``__init__.py`` registering all the nodes);
+- the first access to all the node metadata (``INPUT_TYPES()`` and ``DESCRIPTION`` - what ComfyUI's ``/object_info``
+  asks for, when the UI is opened).
+
+Also shows which heavy modules are left un-imported by the package import itself.
+
+Run from the repo root::
+
+	python benchmarks/bench_import.py
+	python benchmarks/bench_import.py --ref v1.1.2  # also measure another git revision - to compare against
+"""
+
+import typing as _t
+
+import argparse as _argparse
+import json as _json
+from pathlib import Path as _Path
+import shutil as _shutil
+import statistics as _statistics
+import subprocess as _subprocess
+import sys as _sys
+import tempfile as _tempfile
+
+from _bootstrap import PACKAGE_DIR, PACKAGE_NAME, STUBS_DIR
+
+
+_DEFERRED_MODULES = ('multiprocessing', 'concurrent.futures.process', 'server', 'folder_paths', 'comfy')
+
+# Runs in a fresh interpreter. Prints the measurements as JSON:
+_MEASURE_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, {parent_dir!r})
+sys.path.append({stubs_dir!r})
+preloaded = set(sys.modules)
+
+start = time.perf_counter()
+import {package} as package
+import_time = time.perf_counter() - start
+deferred = [m for m in {deferred!r} if m not in sys.modules or m in preloaded]
+
+start = time.perf_counter()
+for node_cls in package.NODE_CLASS_MAPPINGS.values():
+	node_cls.INPUT_TYPES()
+	node_cls.DESCRIPTION
+metadata_time = time.perf_counter() - start
+
+print(json.dumps({{
+	'import': import_time,
+	'metadata': metadata_time,
+	'deferred': deferred,
+}}))
+'''
+
+
+def _measured_once(parent_dir: _Path) -> _t.Dict[str, _t.Any]:
+	script = _MEASURE_SCRIPT.format(
+		parent_dir=str(parent_dir), stubs_dir=str(STUBS_DIR), package=PACKAGE_NAME, deferred=_DEFERRED_MODULES,
+	)
+	output = _subprocess.run(
+		[_sys.executable, '-c', script], capture_output=True, text=True, check=True,
+	).stdout
+	return _json.loads(output.strip().splitlines()[-1])
+
+
+def _measured(parent_dir: _Path, repeat: int) -> _t.Dict[str, _t.Any]:
+	_measured_once(parent_dir)  # Warm-up: the bytecode is cached (and so are the files, by the OS) - as it is in ComfyUI
+	runs = [_measured_once(parent_dir) for _ in range(repeat)]
+	return {
+		'import': _statistics.median(r['import'] for r in runs),
+		'metadata': _statistics.median(r['metadata'] for r in runs),
+		'deferred': runs[-1]['deferred'],
+	}
+
+
+def _linked_package_dir(temp_dir: _Path, package_dir: _Path) -> _Path:
+	"""A directory from which the package is importable by its name."""
+	parent_dir = temp_dir / 'path'
+	parent_dir.mkdir()
+	try:
+		(parent_dir / PACKAGE_NAME).symlink_to(package_dir, target_is_directory=True)
+	except OSError:  # No symlinks (Windows without privileges)
+		_shutil.copytree(package_dir, parent_dir / PACKAGE_NAME, ignore=_shutil.ignore_patterns('.git'))
+	return parent_dir
+
+
+def _exported_revision(temp_dir: _Path, ref: str) -> _Path:
+	"""The given git revision of the pack, exported into a temporary directory."""
+	out_dir = temp_dir / 'ref'
+	out_dir.mkdir()
+	archive = _subprocess.run(
+		['git', 'archive', '--format=tar', ref], cwd=str(PACKAGE_DIR), capture_output=True, check=True,
+	).stdout
+	_subprocess.run(['tar', '-x', '-C', str(out_dir)], input=archive, check=True)
+	return out_dir
+
+
+def main(args: _t.Sequence[str] = None):
+	parser = _argparse.ArgumentParser(description="String Constructor import-time benchmark.")
+	parser.add_argument('--ref', help="Also measure this git revision (tag/branch/commit) - to compare against.")
+	parser.add_argument('--repeat', type=int, default=10, help="Fresh interpreters per measurement.")
+	parsed = parser.parse_args(args)
+
+	print(f"{'revision':<20} {'import, ms':>11} {'metadata, ms':>13}  not imported")
+	with _tempfile.TemporaryDirectory() as temp_dir:
+		temp_dir = _Path(temp_dir)
+		revisions = [('working tree', PACKAGE_DIR)]
+		if parsed.ref:
+			ref_dir = temp_dir / 'ref_root'
+			ref_dir.mkdir()
+			revisions.append((parsed.ref, _exported_revision(ref_dir, parsed.ref)))
+
+		for i, (name, package_dir) in enumerate(revisions):
+			revision_dir = temp_dir / f'revision_{i}'
+			revision_dir.mkdir()
+			result = _measured(_linked_package_dir(revision_dir, package_dir), max(parsed.repeat, 1))
+			print(
+				f"{name:<20} {result['import'] * 1e3:>11.2f} {result['metadata'] * 1e3:>13.2f}  "
+				f"{', '.join(result['deferred']) or '-'}"
+			)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,73 @@
+# encoding: utf-8
+"""
+Benchmark: scaling of the safe-mode template tokenizer with the template length.
+
+The template is JSON-like text (lots of literal curly brackets) with a placeholder every few lines.
+The current offset-based tokenizer is compared against the regex-based one from the earlier versions,
+which re-matched the remaining text after each placeholder (so, quadratic in the template length).
+
+Run from the repo root::
+
+	python benchmarks/bench_safe_tokenizer.py
+
+For a linear tokenizer, time per KB stays (roughly) the same for any template size.
+"""
+
+import typing as _t
+
+import re as _re
+
+from _bootstrap import best_time, pack_module
+
+
+_re_legacy_match = _re.compile(
+	r'(?P<prefix>.*?)'
+	r'(?P<open_brackets>\{+)'
+	r'(?P<inside_brackets>[^{}]+)'
+	r'(?P<closed_brackets>\}+)'
+	r'(?P<suffix>[^{}].*)?$',
+	flags=_re.DOTALL,
+).match
+
+
+def _legacy_safe_tokens_gen(template: str):
+	suffix: str = template
+	while suffix:
+		match = _re_legacy_match(suffix)
+		if not match:
+			break
+		prefix, open_brackets, inside_brackets, closed_brackets, suffix = match.groups()
+		if prefix:
+			yield prefix
+		yield open_brackets, inside_brackets, closed_brackets
+	if suffix:
+		yield suffix
+
+
+def _json_like_template(n_blocks: int) -> str:
+	block = (
+		'{{"id": {i}, "name": "item_{i}", "tags": ["a", "b"], '
+		'"style": {{"color": "red", "size": 12}}}},\n'
+		'prompt_{i}: {char_short}, {scene}, {{ literal }}\n'
+	)
+	return ''.join(block.replace('{i}', str(i)) for i in range(n_blocks))
+
+
+def main(sizes: _t.Iterable[int] = (10, 100, 1000, 3000, 10000), legacy_max_size: int = 3000):
+	tokens_gen = pack_module('funcs_template')._safe_tokens_gen
+
+	print(f"{'blocks':>8} {'KB':>9} {'linear, ms':>11} {'µs/KB':>8} {'legacy, ms':>11} {'µs/KB':>8}")
+	for n_blocks in sizes:
+		template = _json_like_template(n_blocks)
+		size_kb = len(template) / 1024.0
+		t_linear = best_time(lambda: list(tokens_gen(template)))
+		line = f"{n_blocks:>8} {size_kb:>9.1f} {t_linear * 1e3:>11.3f} {t_linear * 1e6 / size_kb:>8.1f}"
+		if n_blocks <= legacy_max_size:
+			assert list(tokens_gen(template)) == list(_legacy_safe_tokens_gen(template))
+			t_legacy = best_time(lambda: list(_legacy_safe_tokens_gen(template)), repeat=3)
+			line += f" {t_legacy * 1e3:>11.3f} {t_legacy * 1e6 / size_kb:>8.1f}"
+		print(line)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,352 @@
+# encoding: utf-8
+"""
+Benchmark suite: the main hot paths of the node pack, measured headless (outside of ComfyUI).
+
+Covers:
+- ``_Formatter`` in safe, unsafe and recursive modes - over different template sizes and placeholder densities;
+- long chains of ``_new_updated_dict()`` (the way chained dict nodes build a dict);
+- ``_parsed_kv_pairs_gen()`` on big texts;
+- ``_preview_message()`` on big dicts (with and without the size limits).
+
+Run from the repo root::
+
+	python benchmarks/bench_suite.py --output bench_results.json
+	python benchmarks/bench_suite.py --compare bench_results.json
+
+The results are written as JSON (to stdout, or to ``--output`` file), with a human-readable table in stderr.
+With ``--compare``, each case is compared against the same case in a previous results file:
+the exit code is 1 if any of them got slower by more than ``--threshold``.
+"""
+
+import typing as _t
+
+import argparse as _argparse
+from dataclasses import dataclass as _dataclass, field as _field
+from datetime import datetime as _datetime, timezone as _timezone
+import json as _json
+import platform as _platform
+import re as _re
+import statistics as _statistics
+import subprocess as _subprocess
+import sys as _sys
+from timeit import Timer as _Timer
+
+from _bootstrap import PACKAGE_DIR, pack_module
+
+
+_FORMAT_VERSION = 1
+_MIN_RUN_TIME = 0.05  # Seconds. Fast cases are run in loops of at least this total time
+
+
+@_dataclass
+class _Case:
+	group: str
+	name: str
+	params: _t.Dict[str, _t.Any]
+	func: _t.Callable[[], _t.Any]
+
+	@property
+	def key(self) -> str:
+		params = ','.join(f'{k}={v}' for k, v in self.params.items())
+		return f'{self.group}/{self.name}[{params}]'
+
+
+@_dataclass
+class _Result:
+	key: str
+	group: str
+	name: str
+	params: _t.Dict[str, _t.Any]
+	best_s: float
+	median_s: float
+	number: int
+	repeat: int
+	extra: _t.Dict[str, _t.Any] = _field(default_factory=dict)
+
+
+# ----------------------------------------------------------
+# Inputs
+
+def _format_dict(n_keys: int, recursive_depth: int = 0) -> _t.Dict[str, str]:
+	"""
+	A dict with ``n_keys`` entries. With a non-zero ``recursive_depth``, the entries reference each other
+	in chains of this length.
+	"""
+	out_dict = dict()
+	for i in range(n_keys):
+		if recursive_depth and i % (recursive_depth + 1):
+			out_dict[f'k{i}'] = f'text {i}, {{k{i - 1}}}'
+		else:
+			out_dict[f'k{i}'] = f'text {i}'
+	return out_dict
+
+
+def _template(n_fields: int, literal_length: int, n_keys: int, with_json: bool = False) -> str:
+	"""A template with ``n_fields`` placeholders, each followed by ``literal_length`` characters of literal text."""
+	literal = ('x' * literal_length) if not with_json else ('{"a": 1}' + 'x' * max(literal_length - 8, 0))
+	return ''.join(f'{{k{(i * 7) % n_keys}}}{literal}' for i in range(n_fields))
+
+
+def _library_text(n_chunks: int, n_lines: int = 3) -> str:
+	return ''.join(
+		f'key_{i}\n' + ''.join(f'  some prompt words, line {j} of chunk {i}  \n' for j in range(n_lines)) + '\n'
+		for i in range(n_chunks)
+	)
+
+
+# ----------------------------------------------------------
+# Cases
+
+def _formatter_cases(quick: bool) -> _t.Iterator[_Case]:
+	node_formatter = pack_module('node_formatter')
+	formatter_cls = node_formatter._Formatter
+
+	n_keys = 200
+	densities = {'dense': 10, 'sparse': 200}
+	sizes = (10, 100) if quick else (10, 100, 1000)
+	modes = {
+		'safe': dict(safe=True, recursive=False),
+		'unsafe': dict(safe=False, recursive=False),
+		'safe_recursive': dict(safe=True, recursive=True),
+		'unsafe_recursive': dict(safe=False, recursive=True),
+	}
+	for mode_name, mode_kwargs in modes.items():
+		format_dict = _format_dict(n_keys, recursive_depth=4 if mode_kwargs['recursive'] else 0)
+		for density_name, literal_length in densities.items():
+			for n_fields in sizes:
+				template = _template(n_fields, literal_length, n_keys)
+
+				def func(template=template, format_dict=format_dict, mode_kwargs=mode_kwargs):
+					return formatter_cls(format_dict=format_dict, show_status=False, **mode_kwargs)(template)
+
+				yield _Case('formatter', mode_name, dict(fields=n_fields, density=density_name), func)
+
+	# Literal curly brackets (JSON-like text) - the case safe mode exists for:
+	format_dict = _format_dict(n_keys)
+	for n_fields in sizes:
+		template = _template(n_fields, 40, n_keys, with_json=True)
+		yield _Case(
+			'formatter', 'safe_json', dict(fields=n_fields),
+			lambda template=template: formatter_cls(format_dict=format_dict, show_status=False)(template),
+		)
+
+	# A template compiled once (by "Compile Template" node) - vs. the same text looked up in the compile cache:
+	template_cls = pack_module('funcs_template').Template
+	for n_fields in sizes:
+		template = template_cls.from_text(_template(n_fields, 10, n_keys))
+		yield _Case(
+			'formatter', 'safe_compiled', dict(fields=n_fields, density='dense'),
+			lambda template=template: formatter_cls(format_dict=format_dict, show_status=False)(template),
+		)
+
+
+def _template_compile_cases(quick: bool) -> _t.Iterator[_Case]:
+	compile_template = pack_module('funcs_template')._compile_template
+	for n_fields in ((100, ) if quick else (100, 1000, 10000)):
+		template = _template(n_fields, 40, 200, with_json=True)
+		yield _Case('template', 'compile_safe', dict(fields=n_fields), lambda template=template: compile_template(template))
+
+
+def _template_render_cases(quick: bool) -> _t.Iterator[_Case]:
+	"""Rendering of an already compiled safe template: well-formed, with a missing key and with JSON-like text."""
+	compile_template = pack_module('funcs_template')._compile_template
+	format_dict = _format_dict(200)
+	missing_key_dict = {k: v for k, v in format_dict.items() if k != 'k7'}
+	for n_fields in ((100, ) if quick else (100, 1000)):
+		compiled = compile_template(_template(n_fields, 20, 200), True)
+		compiled_json = compile_template(_template(n_fields, 20, 200, with_json=True), True)
+		yield _Case('template', 'render_safe', dict(fields=n_fields), lambda c=compiled: c.render(format_dict))
+		yield _Case(
+			'template', 'render_safe_missing_key', dict(fields=n_fields),
+			lambda c=compiled: c.render(missing_key_dict),
+		)
+		yield _Case('template', 'render_safe_json', dict(fields=n_fields), lambda c=compiled_json: c.render(format_dict))
+
+
+def _dict_chain_cases(quick: bool) -> _t.Iterator[_Case]:
+	funcs_common = pack_module('funcs_common')
+	new_dict_with_updated_key = funcs_common._new_dict_with_updated_key
+
+	for n_nodes in ((1000, ) if quick else (1000, 8000)):
+		def chain(n_nodes=n_nodes):
+			format_dict = None
+			for i in range(n_nodes):
+				format_dict = new_dict_with_updated_key(format_dict, f'key_{i}', f'value {i}')
+			return format_dict
+
+		yield _Case('dict', 'add_key_chain', dict(nodes=n_nodes), chain)
+
+	# Merging multiple dicts: pairwise, one by one - vs. all at once
+	for n_dicts in ((8, ) if quick else (2, 8)):
+		dicts = [
+			funcs_common._new_updated_dict(None, {f'key_{i}_{j}': f'value {j}' for j in range(2000)})
+			for i in range(n_dicts)
+		]
+
+		def merge_pairwise(dicts=dicts):
+			merged = None
+			for format_dict in dicts:
+				merged = funcs_common._new_updated_dict(merged, format_dict)
+			return merged
+
+		yield _Case('dict', 'merge_pairwise', dict(dicts=n_dicts), merge_pairwise)
+		yield _Case('dict', 'merge_all', dict(dicts=n_dicts), lambda dicts=dicts: funcs_common._merged_dicts(dicts))
+
+	base_dict = funcs_common._new_updated_dict(None, _format_dict(10000))
+	update = _format_dict(100)
+	yield _Case(
+		'dict', 'update_big_dict', dict(size=len(base_dict), updated=len(update)),
+		lambda: funcs_common._new_updated_dict(base_dict, update),
+	)
+
+
+def _parse_cases(quick: bool) -> _t.Iterator[_Case]:
+	parsed_kv_pairs_gen = pack_module('node_dict_from_text')._parsed_kv_pairs_gen
+	for n_chunks in ((1000, ) if quick else (1000, 20000)):
+		text = _library_text(n_chunks)
+		for cleanup in (True, False):
+			yield _Case(
+				'parse', 'kv_pairs', dict(chunks=n_chunks, kb=len(text) // 1024, cleanup=cleanup),
+				lambda text=text, cleanup=cleanup: list(parsed_kv_pairs_gen(text, strip_lines=cleanup)),
+			)
+
+
+def _preview_cases(quick: bool) -> _t.Iterator[_Case]:
+	funcs_common = pack_module('funcs_common')
+	preview_message = pack_module('node_dict_preview')._preview_message
+
+	n_entries = 1000 if quick else 5000
+	format_dict = funcs_common._new_updated_dict(None, _format_dict(n_entries))
+	format_dict = funcs_common._new_updated_dict(format_dict, {'big_list': list(range(10000)), 'nested': {'a': [1, 2]}})
+	limits = {
+		'unlimited': (0, 0, 0),
+		'default_limits': (65536, 1000, 2000),
+	}
+	for limits_name, limits_values in limits.items():
+		yield _Case(
+			'preview', 'message', dict(entries=len(format_dict), limits=limits_name),
+			lambda limits_values=limits_values: preview_message(format_dict, *limits_values),
+		)
+
+
+_CASE_GROUPS = (
+	_formatter_cases,
+	_template_compile_cases,
+	_template_render_cases,
+	_dict_chain_cases,
+	_parse_cases,
+	_preview_cases,
+)
+
+# ----------------------------------------------------------
+# Running
+
+
+def _measured(case: _Case, repeat: int) -> _Result:
+	timer = _Timer(case.func)
+	number, total_time = timer.autorange()
+	while total_time < _MIN_RUN_TIME and number < (1 << 20):
+		number *= 2
+		total_time = timer.timeit(number)
+	times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+	return _Result(
+		key=case.key, group=case.group, name=case.name, params=case.params,
+		best_s=min(times), median_s=_statistics.median(times), number=number, repeat=repeat,
+	)
+
+
+def _git_commit() -> _t.Optional[str]:
+	try:
+		return _subprocess.run(
+			['git', 'rev-parse', 'HEAD'], cwd=str(PACKAGE_DIR), capture_output=True, text=True, check=True, timeout=10,
+		).stdout.strip() or None
+	except (OSError, _subprocess.SubprocessError):
+		return None
+
+
+def _package_version() -> _t.Optional[str]:
+	try:
+		pyproject = (PACKAGE_DIR / 'pyproject.toml').read_text(encoding='utf-8')
+	except OSError:
+		return None
+	match = _re.search(r'^version\s*=\s*"([^"]+)"', pyproject, flags=_re.MULTILINE)
+	return match.group(1) if match else None
+
+
+def _meta_info(quick: bool) -> _t.Dict[str, _t.Any]:
+	return {
+		'format_version': _FORMAT_VERSION,
+		'package_version': _package_version(),
+		'git_commit': _git_commit(),
+		'timestamp': _datetime.now(_timezone.utc).isoformat(timespec='seconds'),
+		'python': _sys.version.split()[0],
+		'implementation': _platform.python_implementation(),
+		'platform': _platform.platform(),
+		'quick': quick,
+	}
+
+
+def run(quick: bool = False, repeat: int = 5, name_filter: str = None) -> _t.Dict[str, _t.Any]:
+	"""Run all the cases (the ones with ``name_filter`` in their key). The results - as a JSON-serializable dict."""
+	results: _t.List[_Result] = list()
+	for cases_gen in _CASE_GROUPS:
+		for case in cases_gen(quick):
+			if name_filter and name_filter not in case.key:
+				continue
+			result = _measured(case, repeat)
+			results.append(result)
+			print(f"{result.key:<70} {result.best_s * 1e3:>12.4f} ms", file=_sys.stderr)
+	return {
+		'meta': _meta_info(quick),
+		'results': [vars(r) for r in results],
+	}
+
+
+def compare(new_results: _t.Dict[str, _t.Any], old_results: _t.Dict[str, _t.Any], threshold: float = 0.25) -> bool:
+	"""Print the comparison table to stderr. Returns ``True`` if no case got slower by more than ``threshold``."""
+	old_by_key = {r['key']: r for r in old_results.get('results', list())}
+	ok = True
+	print(f"\n{'case':<70} {'old, ms':>12} {'new, ms':>12} {'ratio':>7}", file=_sys.stderr)
+	for result in new_results['results']:
+		old = old_by_key.get(result['key'])
+		if old is None:
+			continue
+		ratio = result['best_s'] / max(old['best_s'], 1e-12)
+		regression = ratio > 1.0 + threshold
+		ok = ok and not regression
+		print(
+			f"{result['key']:<70} {old['best_s'] * 1e3:>12.4f} {result['best_s'] * 1e3:>12.4f} {ratio:>6.2f}x"
+			f"{'  ❗ slower' if regression else ''}",
+			file=_sys.stderr,
+		)
+	return ok
+
+
+def main(args: _t.Sequence[str] = None) -> int:
+	parser = _argparse.ArgumentParser(description="String Constructor benchmark suite.")
+	parser.add_argument('--output', '-o', help="Write the JSON results to this file (default: stdout).")
+	parser.add_argument('--compare', '-c', help="A JSON results file from a previous run, to compare against.")
+	parser.add_argument('--threshold', type=float, default=0.25, help="Slowdown considered a regression (0.25 = 25%%).")
+	parser.add_argument('--quick', action='store_true', help="Only the smaller sizes.")
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--filter', '-k', dest='name_filter', help="Only the cases with this substring in their key.")
+	parsed = parser.parse_args(args)
+
+	results = run(quick=parsed.quick, repeat=max(parsed.repeat, 1), name_filter=parsed.name_filter)
+	results_json = _json.dumps(results, indent='\t', ensure_ascii=False)
+	if parsed.output:
+		with open(parsed.output, 'w', encoding='utf-8') as file:
+			file.write(results_json + '\n')
+	else:
+		print(results_json)
+
+	if parsed.compare:
+		with open(parsed.compare, 'r', encoding='utf-8') as file:
+			old_results = _json.load(file)
+		if not compare(results, old_results, parsed.threshold):
+			return 1
+	return 0
+
+
+if __name__ == '__main__':
+	_sys.exit(main())
@@ -145,3 +145,23 @@ def format_object_docstring(_obj, tab_size: int = 8) -> str:
 		return ''
 	# noinspection PyArgumentList
 	return format_docstring(doc, tab_size=tab_size)
+
+
+class LazyDescription:
+	"""
+	A class attribute (node's ``DESCRIPTION``) formatted from the class docstring only when it's first accessed.
+	Then, the formatted string replaces this descriptor on the class itself.
+	"""
+	def __init__(self, tab_size: int = 8):
+		self.tab_size = tab_size
+		self.name = 'DESCRIPTION'
+
+	def __set_name__(self, owner, name: str):
+		self.name = name
+
+	def __get__(self, instance, owner=None) -> str:
+		if owner is None:
+			owner = type(instance)
+		description = format_object_docstring(owner, tab_size=self.tab_size)
+		setattr(owner, self.name, description)
+		return description
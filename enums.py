@@ -24,6 +24,7 @@ def all_values(cls) -> _t.Tuple[str, ...]:
 class DataTypes(__BaseEnum):
 	"""Additional data-types defined byt the node pack."""
 	DICT = 'DICT'
+	TEMPLATE = 'TEMPLATE'
 
 	@staticmethod
 	def __custom_input_type_dict(_dict_args: _t.Tuple[_t.Dict[str, T], ...], kwargs: _t.Dict[str, T]) -> _t.Dict[str, T]:
@@ -37,3 +38,7 @@ def __custom_input_type_dict(_dict_args: _t.Tuple[_t.Dict[str, T], ...], kwargs:
 	@classmethod
 	def input_dict(cls, *_dicts: _t.Dict[str, T], **kwargs: T) -> _t.Tuple[_t.Union['DataTypes', str], _t.Dict[str, T]]:
 		return str(cls.DICT), cls.__custom_input_type_dict(_dicts, kwargs)
+
+	@classmethod
+	def input_template(cls, *_dicts: _t.Dict[str, T], **kwargs: T) -> _t.Tuple[_t.Union['DataTypes', str], _t.Dict[str, T]]:
+		return str(cls.TEMPLATE), cls.__custom_input_type_dict(_dicts, kwargs)
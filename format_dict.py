@@ -0,0 +1,593 @@
+# encoding: utf-8
+"""
+The Format-Dict data type: an immutable mapping, which shares its structure with the dict it's derived from.
+
+Every dict-updating node creates a new dict. With a regular (frozen) dict, each update copies the whole thing:
+a chain of N nodes adding N keys copies ~N²/2 items in total and keeps all the N full copies alive.
+
+Instead, ``FormatDict`` is a stack of layers (regular dicts, never modified after creation):
+an update only adds a new layer on top of the parent dict's layers - which are re-used as-is.
+To keep lookups fast, small layers are merged together as soon as they become comparable in size with
+the layer below them (the "logarithmic method", like in LSM-trees). So there are at most ~log2(N) layers,
+and each item is copied at most ~log2(N) times during the dict's entire "lifetime".
+Thus, adding a key costs amortized O(log N) - both in time and memory.
+
+A layer could also be a lazy one (see ``LazyLayer``): a read-only mapping, which loads its values only on access -
+like a huge prompt library on disk. Such layers are never merged with others: it would load all their values.
+
+A value could be lazy, too (see ``LazyValue``): it's computed only when a template actually references it.
+
+Only the values added by each update are frozen (the ones in the parent dict already are), and even those
+are frozen shallowly whenever deep-freezing would be a waste or would break the value - see ``_frozen_value()``.
+"""
+
+import typing as _t
+
+from collections.abc import Mapping as _Mapping
+from dataclasses import fields as _dataclass_fields, is_dataclass as _is_dataclass
+from itertools import chain as _chain
+
+from frozendict import (
+	deepfreeze as _deepfreeze,
+	frozendict as _frozendict,
+	getFreezeConversionMap as _getFreezeConversionMap,
+	getFreezeConversionInverseMap as _getFreezeConversionInverseMap,
+)
+
+
+_MISSING = object()
+_FINGERPRINT_MASK = (1 << 64) - 1
+
+_SCALAR_TYPES = frozenset((str, int, float, complex, bool, bytes, type(None)))
+_SHALLOW_FREEZE_MIN_LEN = 1024  # Lists/tuples of at least this length are frozen without walking their items
+
+
+def _is_hashable(value) -> bool:
+	try:
+		hash(value)
+	except TypeError:
+		return False
+	return True
+
+
+def _frozen_value(value):
+	"""
+	Freeze a single value added to the dict, doing as little work as possible:
+	- immutable scalars are returned as-is;
+	- so are hashable tuples, frozensets and frozen dicts - they're frozen all the way down already
+	  (the same "hashable == immutable" assumption ``deepfreeze()`` makes itself);
+	- huge lists/tuples are converted to a tuple with a single copy (done in C), without walking their items;
+	- opaque objects ``deepfreeze()`` has no converter for (like tensors) are kept as-is: otherwise,
+	  they'd be replaced with a frozendict of their ``__dict__`` - i.e., the value itself would be lost;
+	- builtin containers are frozen right here (the same way ``deepfreeze()`` does it, but without its
+	  per-item overhead), and only the remaining convertible types are passed to ``deepfreeze()`` itself.
+	"""
+	value_type = type(value)
+	if value_type in _SCALAR_TYPES or value_type is FormatDict:
+		return value
+
+	if value_type is dict:
+		return _frozendict({k: _frozen_value(v) for k, v in value.items()})
+	if value_type is list or value_type is tuple:
+		if len(value) >= _SHALLOW_FREEZE_MIN_LEN:
+			return value if value_type is tuple else tuple(value)
+		if value_type is tuple and _is_hashable(value):
+			return value
+		return tuple([_frozen_value(x) for x in value])
+	if value_type is set:
+		return frozenset(value)  # Set items are hashable - thus, already treated as immutable
+
+	if isinstance(value, (tuple, frozenset, _frozendict)) and _is_hashable(value):
+		return value
+	freeze_types = tuple(_getFreezeConversionMap()) + tuple(_getFreezeConversionInverseMap())
+	if not isinstance(value, freeze_types):
+		return value
+	return _deepfreeze(value)
+
+
+def _values_equal(value1, value2) -> bool:
+	"""Values compared for dict equality. Some types (tensors, arrays) don't have a single-bool answer to ``==``."""
+	if value1 is value2:
+		return True
+	# noinspection PyBroadException
+	try:
+		return bool(value1 == value2)
+	except Exception:
+		return False
+
+
+def is_plain_value(value) -> bool:
+	"""
+	Whether the value is plain data: scalars, containers of plain data, format-dicts made of it
+	and frozen dataclasses of it (like a compiled ``Template``). Anything else is opaque - e.g., tensors, models,
+	functions (including lazy values) or locks: objects owned by someone else, possibly huge, which
+	mustn't be kept alive for longer than their owner wants.
+	"""
+	value_type = type(value)
+	if value_type in _SCALAR_TYPES:
+		return True
+	if value_type is tuple or value_type is list or value_type is frozenset or value_type is set:
+		# Checked in C - for huge lists of numbers or strings:
+		return _SCALAR_TYPES.issuperset(map(type, value)) or all(map(is_plain_value, value))
+	if value_type is FormatDict:
+		return not value.has_opaque_values
+	if isinstance(value, LazyLayer):  # Its values are loaded on demand: checking them would load all of them
+		return True
+	if isinstance(value, _Mapping):
+		return all(map(is_plain_value, value.values()))
+	if isinstance(value, type):  # Classes live as long as their module anyway
+		return True
+	if _is_dataclass(value) and value.__dataclass_params__.frozen:
+		return all(is_plain_value(getattr(value, field.name)) for field in _dataclass_fields(value) if field.compare)
+	return False
+
+
+def _item_fingerprint(key: str, value: _t.Any) -> int:
+	return hash((key, value))
+
+
+class LazyValue:
+	"""
+	A dict value computed only when it's actually needed (a thunk): i.e., when a formatted template references it.
+
+	The wrapped function is called without arguments. During a single formatting run, it's called only once
+	(see ``ResolvedDict``) - but the result isn't remembered by the lazy value itself: the next run calls it again.
+	Compared and hashed by identity.
+	"""
+	__slots__ = ('func', '__weakref__')
+
+	def __init__(self, func: _t.Callable[[], _t.Any]):
+		if not callable(func):
+			raise TypeError(f"A lazy value needs a callable. Got: {func!r}")
+		self.func = func
+
+	def __call__(self):
+		return self.func()
+
+	def __repr__(self) -> str:
+		func_name = getattr(self.func, '__qualname__', None) or getattr(self.func, '__name__', None) or repr(self.func)
+		return f'<lazy: {func_name}>'
+
+
+def _has_lazy_values(mapping: _t.Mapping[str, _t.Any]) -> bool:
+	if isinstance(mapping, FormatDict):
+		return mapping.has_lazy_values
+	return any(isinstance(value, LazyValue) for value in mapping.values())
+
+
+class ResolvedDict(_Mapping):
+	"""
+	A read-only view of a format-dict, which computes its lazy values on access. Each lazy value is computed
+	only once per view - so a single view is meant to be shared by everything formatting against the same dict
+	in a single run (including all the passes of recursive formatting).
+	"""
+	__slots__ = ('format_dict', '_resolved')
+
+	def __init__(self, format_dict: _t.Mapping[str, _t.Any]):
+		self.format_dict = format_dict
+		self._resolved: _t.Dict[str, _t.Any] = dict()
+
+	@classmethod
+	def wrap(cls, format_dict: _t.Mapping[str, _t.Any]) -> _t.Mapping[str, _t.Any]:
+		"""The view - but only if the dict does have any lazy values. Otherwise, the dict itself is returned."""
+		return cls(format_dict) if _has_lazy_values(format_dict) else format_dict
+
+	def __getitem__(self, key: str):
+		resolved = self._resolved
+		if key in resolved:
+			return resolved[key]
+		value = self.format_dict[key]
+		if isinstance(value, LazyValue):
+			value = value()
+			resolved[key] = value
+		return value
+
+	def __contains__(self, key) -> bool:
+		return key in self.format_dict
+
+	def __len__(self) -> int:
+		return len(self.format_dict)
+
+	def __iter__(self) -> _t.Iterator[str]:
+		return iter(self.format_dict)
+
+
+class LazyLayer(_Mapping):
+	"""
+	A base for read-only mappings used as a ``FormatDict`` layer as-is (see ``FormatDict.updated_lazy()``).
+
+	Iterating over keys, ``len()`` and ``in`` checks must be cheap: only getting the values is allowed to be costly.
+	The values must be frozen already (and they can't be ``LazyValue`` instances). They're plain data, too
+	(see ``is_plain_value()``): loaded from somewhere on demand, not live objects.
+	Compared and hashed by identity: comparing by contents would load all the values.
+	"""
+	__slots__ = ()
+
+	@property
+	def fingerprint(self) -> _t.Optional[int]:
+		"""The same as ``FormatDict.fingerprint`` of a dict with all the same items. ``None`` if unknown."""
+		return None
+
+	def same_items(self, other: 'LazyLayer') -> bool:
+		"""
+		Whether the other layer is known to have all the same items - without loading any values.
+		By default, only the very same layer is.
+		"""
+		return self is other
+
+	__eq__ = object.__eq__
+	__ne__ = object.__ne__
+	__hash__ = object.__hash__
+
+
+def _is_mergeable(layer: _t.Mapping[str, _t.Any]) -> bool:
+	return layer.__class__ is dict
+
+
+class FormatDict(_Mapping):
+	"""
+	An immutable, structurally shared mapping of string keys to (frozen) values.
+	Iterates over its keys in the sorted order.
+
+	Instances are meant to be created only via ``from_mapping()`` / ``updated()``.
+	"""
+	__slots__ = (
+		'_layer', '_parent', '_len', '_fingerprint', '_keys_validated', '_has_lazy_values', '_has_opaque_values',
+		'_hash', '_sorted_keys',
+	)
+
+	def __init__(
+		self, layer: _t.Dict[str, _t.Any], parent: _t.Optional['FormatDict'], length: int,
+		fingerprint: _t.Optional[int], keys_validated: bool = False, has_lazy_values: bool = False,
+	):
+		self._layer = layer
+		self._parent = parent
+		self._len = length
+		self._fingerprint = fingerprint
+		self._keys_validated = bool(keys_validated)
+		self._has_lazy_values = bool(has_lazy_values)
+		self._has_opaque_values: _t.Optional[bool] = None
+		self._hash: _t.Optional[int] = None
+		self._sorted_keys: _t.Optional[_t.Tuple[str, ...]] = None
+
+	# ---------------------------------------------------------
+	# Construction
+
+	@classmethod
+	def from_mapping(
+		cls, mapping: _t.Optional[_t.Mapping[str, _t.Any]] = None, keys_validated: bool = False
+	) -> 'FormatDict':
+		"""A new root dict (with no parent to share anything with). Values are frozen."""
+		return _EMPTY.updated(mapping, keys_validated=keys_validated)
+
+	def updated(
+		self, updates: _t.Optional[_t.Mapping[str, _t.Any]], keys_validated: bool = False, values_frozen: bool = False,
+	) -> 'FormatDict':
+		"""
+		A new dict with the given items added/replaced. Only the new values are frozen (see ``_frozen_value()``):
+		the ones in this dict are already frozen.
+
+		:param keys_validated: Whether the keys of ``updates`` are already verified to be valid names.
+			The new dict is marked as validated only if both this dict and the updates are.
+		:param values_frozen: Whether the values of ``updates`` are already frozen (e.g., taken from other
+			``FormatDict`` instances) - then, they're used as-is.
+		"""
+		keys_validated = bool(keys_validated) and self._keys_validated
+		if not updates:
+			if keys_validated or not self._keys_validated:
+				return self
+			return FormatDict(self._layer, self._parent, self._len, self._fingerprint, False, self._has_lazy_values)
+
+		new_layer: _t.Dict[str, _t.Any] = (
+			dict(updates) if values_frozen else {k: _frozen_value(v) for k, v in updates.items()}
+		)
+
+		length = self._len
+		fingerprint = self._fingerprint
+		for key, value in new_layer.items():
+			old_value = self._get(key)
+			if old_value is _MISSING:
+				length += 1
+			elif fingerprint is not None:
+				fingerprint -= _item_fingerprint(key, old_value)
+			if fingerprint is not None:
+				try:
+					fingerprint += _item_fingerprint(key, value)
+				except TypeError:  # Unhashable value
+					fingerprint = None
+		if fingerprint is not None:
+			fingerprint &= _FINGERPRINT_MASK
+
+		# Merge the new layer with the ones below it, while they're of comparable sizes:
+		parent = self
+		while parent is not None and _is_mergeable(parent._layer) and len(parent._layer) <= 2 * len(new_layer):
+			merged_layer = dict(parent._layer)
+			merged_layer.update(new_layer)
+			new_layer = merged_layer
+			parent = parent._parent
+
+		has_lazy_values = self._has_lazy_values or _has_lazy_values(new_layer)
+		return FormatDict(new_layer, parent, length, fingerprint, keys_validated, has_lazy_values)
+
+	def updated_lazy(self, layer: LazyLayer, keys_validated: bool = False) -> 'FormatDict':
+		"""
+		A new dict with a lazy layer on top. The layer is used as-is: only its keys are looked through.
+		"""
+		keys_validated = bool(keys_validated) and self._keys_validated
+		layer_fingerprint = layer.fingerprint
+		if not self._len:
+			fingerprint = None if layer_fingerprint is None else layer_fingerprint & _FINGERPRINT_MASK
+			return FormatDict(layer, None, len(layer), fingerprint, keys_validated)
+
+		length = self._len
+		fingerprint = None if layer_fingerprint is None else self._fingerprint
+		for key in layer:
+			old_value = self._get(key)
+			if old_value is _MISSING:
+				length += 1
+			elif fingerprint is not None:
+				fingerprint -= _item_fingerprint(key, old_value)
+		if fingerprint is not None:
+			fingerprint = (fingerprint + layer_fingerprint) & _FINGERPRINT_MASK
+		return FormatDict(layer, self, length, fingerprint, keys_validated, self._has_lazy_values)
+
+	def _layers_bottom_up(self) -> _t.List[_t.Mapping[str, _t.Any]]:
+		layers: _t.List[_t.Mapping[str, _t.Any]] = list()
+		node = self
+		while node is not None:
+			layers.append(node._layer)
+			node = node._parent
+		layers.reverse()
+		return layers
+
+	def rebased(self, base: 'FormatDict', keys_validated: bool = None) -> 'FormatDict':
+		"""
+		All the items of this dict, on top of the ``base`` one (i.e., this dict's values win).
+		Lazy layers are carried over as-is - so, their values still aren't loaded.
+
+		:param keys_validated: Whether this dict's keys are verified to be valid names. Default: its own flag.
+		"""
+		if keys_validated is None:
+			keys_validated = self._keys_validated
+		if not base._len and bool(keys_validated) == self._keys_validated:
+			return self
+		out_dict = base
+		for layer in self._layers_bottom_up():
+			if _is_mergeable(layer):
+				out_dict = out_dict.updated(layer, keys_validated=keys_validated)
+			else:
+				out_dict = out_dict.updated_lazy(layer, keys_validated=keys_validated)
+		return out_dict
+
+	# ---------------------------------------------------------
+	# Mapping interface
+
+	def _get(self, key: str, default=_MISSING):
+		node = self
+		while node is not None:
+			value = node._layer.get(key, _MISSING)
+			if value is not _MISSING:
+				return value
+			node = node._parent
+		return default
+
+	def __getitem__(self, key: str):
+		value = self._get(key)
+		if value is _MISSING:
+			raise KeyError(key)
+		return value
+
+	def get(self, key: str, default=None):
+		return self._get(key, default)
+
+	def __contains__(self, key) -> bool:
+		try:
+			return self._get(key) is not _MISSING
+		except TypeError:  # Unhashable key
+			return False
+
+	def __len__(self) -> int:
+		return self._len
+
+	def _keys_sorted(self) -> _t.Tuple[str, ...]:
+		sorted_keys = self._sorted_keys
+		if sorted_keys is not None:
+			return sorted_keys
+
+		parent = self._parent
+		if parent is None:
+			sorted_keys = tuple(sorted(self._layer))
+		else:
+			# Parent's keys are already sorted. So, it's effectively a merge of two sorted runs (Timsort detects them):
+			parent_keys = parent._keys_sorted()
+			new_keys = sorted(k for k in self._layer if k not in parent)
+			sorted_keys = tuple(sorted(_chain(parent_keys, new_keys))) if new_keys else parent_keys
+		self._sorted_keys = sorted_keys
+		return sorted_keys
+
+	def __iter__(self) -> _t.Iterator[str]:
+		return iter(self._keys_sorted())
+
+	def _eager_items(self) -> _t.Iterator[_t.Tuple[str, _t.Any]]:
+		"""The items, except for the ones in lazy layers - i.e., the ones available without loading anything."""
+		upper_layers: _t.List[_t.Mapping[str, _t.Any]] = list()
+		node = self
+		while node is not None:
+			layer = node._layer
+			if _is_mergeable(layer):
+				for key, value in layer.items():
+					if not any(key in upper for upper in upper_layers):
+						yield key, value
+			upper_layers.append(layer)
+			node = node._parent
+
+	def _has_item(self, key: str, value, layer: _t.Mapping[str, _t.Any]) -> bool:
+		"""
+		Whether this dict has the same item as the one found in the given layer (of another dict).
+		An item from a lazy layer matches only the same item of a lazy layer known to have the same items.
+		"""
+		node = self
+		while node is not None:
+			own_layer = node._layer
+			if _is_mergeable(own_layer):
+				own_value = own_layer.get(key, _MISSING)
+				if own_value is not _MISSING:
+					return _is_mergeable(layer) and _values_equal(own_value, value)
+			elif key in own_layer:
+				return not _is_mergeable(layer) and own_layer.same_items(layer)
+			node = node._parent
+		return False
+
+	def _sourced_items(self) -> _t.Iterator[_t.Tuple[str, _t.Any, _t.Mapping[str, _t.Any]]]:
+		"""The items along with the layer each one comes from. Values of lazy layers aren't loaded (``_MISSING``)."""
+		upper_layers: _t.List[_t.Mapping[str, _t.Any]] = list()
+		node = self
+		while node is not None:
+			layer = node._layer
+			items = layer.items() if _is_mergeable(layer) else ((key, _MISSING) for key in layer)
+			for key, value in items:
+				if not any(key in upper for upper in upper_layers):
+					yield key, value, layer
+			upper_layers.append(layer)
+			node = node._parent
+
+	def __eq__(self, other) -> bool:
+		"""
+		Two format-dicts are compared without loading the values of their lazy layers: such items are equal
+		only if they come from lazy layers known to have the same items (see ``LazyLayer.same_items()``).
+		So, a lazy item is never equal to a regular one, even with the same value.
+		Comparing to any other mapping does load them, though.
+		"""
+		if self is other:
+			return True
+		if isinstance(other, FormatDict):
+			if self._len != other._len:
+				return False
+			if (
+				self._fingerprint is not None and other._fingerprint is not None
+				and self._fingerprint != other._fingerprint
+			):
+				return False
+			return all(other._has_item(key, value, layer) for key, value, layer in self._sourced_items())
+		if not isinstance(other, _Mapping):
+			return NotImplemented
+		if len(self) != len(other):
+			return False
+		return all(
+			(key in other and _values_equal(other[key], value))
+			for key, value in self.items()
+		)
+
+	# ---------------------------------------------------------
+	# The same API as ``frozendict`` has - for the nodes of other packs, which expect one on the DICT socket
+
+	def copy(self) -> 'FormatDict':
+		"""It's immutable: the copy is the dict itself (the same as ``frozendict.copy()`` does)."""
+		return self
+
+	def set(self, key: str, value) -> 'FormatDict':
+		"""A new dict with the item added/replaced."""
+		return self.updated({key: value})
+
+	def delete(self, key: str) -> 'FormatDict':
+		"""A new dict without the given key. It's a full copy: all the values of lazy layers are loaded."""
+		if key not in self:
+			raise KeyError(key)
+		return FormatDict.from_mapping(
+			{k: v for k, v in self.items() if k != key}, keys_validated=self._keys_validated
+		)
+
+	def __or__(self, other) -> 'FormatDict':
+		if isinstance(other, FormatDict):
+			return other.rebased(self, keys_validated=other._keys_validated)
+		if not isinstance(other, _Mapping):
+			return NotImplemented
+		return self.updated(other)
+
+	def __ror__(self, other) -> 'FormatDict':
+		if not isinstance(other, _Mapping):
+			return NotImplemented
+		return self.rebased(FormatDict.from_mapping(other))
+
+	def __hash__(self) -> int:
+		"""The same as ``frozendict``'s hash - so that equal frozen dicts of both types are interchangeable as keys."""
+		if self._hash is None:
+			self._hash = hash(frozenset(self.items()))
+		return self._hash
+
+	@property
+	def keys_validated(self) -> bool:
+		"""
+		Whether all the keys were already verified to be valid names (when the dict was built).
+		If so, there's no need to verify them again in every node down the line.
+		"""
+		return self._keys_validated
+
+	@property
+	def has_lazy_values(self) -> bool:
+		"""Whether any of the values is a ``LazyValue`` (possibly, overridden by a regular one since)."""
+		return self._has_lazy_values
+
+	@property
+	def has_opaque_values(self) -> bool:
+		"""
+		Whether any of the values isn't plain data (see ``is_plain_value()``). Found only on the first access
+		(going only through this dict's own layer - the parent dict remembers its own answer), and then remembered.
+		"""
+		has_opaque_values = self._has_opaque_values
+		if has_opaque_values is not None:
+			return has_opaque_values
+		parent = self._parent
+		layer = self._layer
+		has_opaque_values = (parent is not None and parent.has_opaque_values) or (
+			_is_mergeable(layer) and not all(map(is_plain_value, layer.values()))
+		)
+		self._has_opaque_values = has_opaque_values
+		return has_opaque_values
+
+	@property
+	def fingerprint(self) -> _t.Optional[int]:
+		"""
+		A cheap content hash, which is updated incrementally with each derived dict (unlike the regular ``hash()``,
+		which needs to go through all the items once per dict).
+		Equal dicts have equal fingerprints. ``None`` if any of the values is unhashable.
+		"""
+		return self._fingerprint
+
+	def __repr__(self) -> str:
+		return '{}({!r})'.format(type(self).__name__, dict(self.items()))
+
+	def __reduce__(self):
+		# Pickled as a single flat layer - e.g., to be sent to another process:
+		return _unpickle_format_dict, (dict(self.items()), self._keys_validated)
+
+
+def _unpickle_format_dict(items: _t.Dict[str, _t.Any], keys_validated: bool = False) -> FormatDict:
+	return FormatDict.from_mapping(items, keys_validated=keys_validated)
+
+
+_EMPTY = FormatDict(dict(), None, 0, 0, keys_validated=True)  # Nothing to validate in an empty dict
+
+
+def _json_default(self, o):
+	if isinstance(o, FormatDict):
+		return dict(o.items())
+	return _json_default.original(self, o)
+
+
+def _register_json_encoder():
+	"""
+	Make ``json.dumps()`` accept a ``FormatDict`` (serialized as a regular dict) - the same way ``frozendict``
+	registers itself: many nodes (like the built-in ``Preview Any``) serialize whatever they get to JSON.
+	The base ``JSONEncoder.default()`` is patched - so every encoder (subclasses too) gets it.
+	"""
+	import json
+
+	encoder_class = [cls for cls in json.JSONEncoder.__mro__ if 'default' in vars(cls)][-1]
+	if encoder_class.default is _json_default:
+		return
+	_json_default.original = encoder_class.default
+	encoder_class.default = _json_default
+
+
+_register_json_encoder()
@@ -0,0 +1,298 @@
+# encoding: utf-8
+"""
+Alternatives: a dict value with multiple options - and the expansion of a template into all the combinations
+of the alternatives it uses.
+
+The combinations are never materialized: each one is addressed by its index (in the simplest case - a mixed-radix
+number, with a digit per key) - so any slice of them, or a seeded random sample, is generated directly,
+one string at a time.
+"""
+
+import typing as _t
+
+from collections import ChainMap as _ChainMap
+from dataclasses import dataclass as _dataclass
+from random import Random as _Random
+
+from .format_dict import FormatDict as _FormatDict
+from .funcs_common import _verify_input_dict
+from .funcs_key_usage import template_key_usage as _template_key_usage
+from .funcs_template import Template as _Template
+from .node_formatter import _Formatter
+
+
+_FEISTEL_ROUNDS = 4
+_U64_MASK = (1 << 64) - 1
+
+_Axis = _t.Tuple[str, 'Alternatives']
+
+
+@_dataclass(frozen=True)
+class Alternatives:
+	"""
+	Multiple alternative values for a single dict key: each combination of the formatted string uses one of them.
+	Formatted as-is (by the regular ``String Formatter``), it gives the first one.
+	"""
+	values: _t.Tuple[_t.Any, ...]
+
+	def __post_init__(self):
+		if not self.values:
+			raise ValueError("No alternatives given")
+
+	def __len__(self) -> int:
+		return len(self.values)
+
+	def __iter__(self):
+		return iter(self.values)
+
+	def __format__(self, format_spec: str) -> str:
+		return format(self.values[0], format_spec)
+
+	def __str__(self) -> str:
+		return str(self.values[0])
+
+
+def _alternatives_items(format_dict: _t.Mapping[str, _t.Any]) -> _t.List[_Axis]:
+	# Lazy layers of a ``FormatDict`` aren't loaded: only the eager values could be alternatives
+	items = format_dict._eager_items() if isinstance(format_dict, _FormatDict) else format_dict.items()
+	return sorted((key, value) for key, value in items if isinstance(value, Alternatives))
+
+
+def alternative_axes(
+	template: _t.Union[str, _Template], format_dict: _t.Mapping[str, _t.Any], recursive: bool = False, safe: bool = True,
+) -> _t.Tuple[_Axis, ...]:
+	"""
+	The keys with alternatives which the template might use (with the alternatives themselves), in a stable order.
+
+	In recursive mode, the alternatives of a key are analyzed as a whole (with all of them joined together):
+	so if one of them references another key with alternatives, that one is an axis, too. If the keys referenced
+	by the template can't be found statically (see ``funcs_key_usage``), all the keys with alternatives are axes.
+	"""
+	items = _alternatives_items(format_dict)
+	if not items:
+		return tuple()
+
+	joined = {key: '\n'.join(str(x) for x in alternatives) for key, alternatives in items}
+	usage = _template_key_usage(template, _ChainMap(joined, format_dict), recursive=recursive, safe=safe)
+	if not usage.complete:
+		return tuple(items)
+	return tuple((key, alternatives) for key, alternatives in items if key in usage.keys)
+
+
+def _referenced_alternatives(
+	text: _t.Union[str, _Template], leaves_dict: _t.Mapping[str, _t.Any], axis_keys: _t.FrozenSet[str],
+	recursive: bool, safe: bool,
+) -> _t.FrozenSet[str]:
+	"""
+	The keys with alternatives the text references - directly or (in recursive mode) via the regular dict entries,
+	but not via other alternatives (in ``leaves_dict``, they're empty). If it can't be known statically - all of them.
+	"""
+	usage = _template_key_usage(text, leaves_dict, recursive=recursive, safe=safe)
+	if not usage.complete:
+		return axis_keys
+	return axis_keys.intersection(usage.keys)
+
+
+# The keys with alternatives yet to be chosen + the ones chosen already:
+_State = _t.Tuple[_t.FrozenSet[str], _t.FrozenSet[str]]
+
+
+class _CombinationTree:
+	"""
+	All the distinct combinations, as a tree of choices: first, an alternative is chosen for each key the template
+	references (in the sorted order of keys). Then, in recursive mode, for each key referenced by the chosen
+	alternatives themselves (unless it's chosen already) - and so on. So a key is a part of a combination only
+	if the chosen alternatives do lead to it: an alternative not referencing any other keys is a single combination.
+
+	The number of combinations in each sub-tree is counted once and remembered (it only depends on which keys
+	are yet to be chosen and which are chosen already) - so the combination at any index is found directly,
+	going down a single path of the tree.
+	"""
+	__slots__ = ('axes', '_children', '_root', '_counts')
+
+	def __init__(
+		self, axes: _t.Sequence[_Axis], roots: _t.FrozenSet[str],
+		children: _t.Dict[str, _t.Tuple[_t.FrozenSet[str], ...]],
+	):
+		self.axes: _t.Dict[str, Alternatives] = dict(axes)
+		self._children = children  # For each key: the keys referenced by each of its alternatives
+		self._root: _State = (roots, frozenset())
+		self._counts: _t.Dict[_State, int] = dict()
+
+	def _branches(self, state: _State) -> _t.Tuple[str, _t.Tuple[_State, ...]]:
+		"""The next key to choose - and the state after choosing each of its alternatives."""
+		pending, chosen = state
+		key = min(pending)
+		pending = pending - {key}
+		chosen = chosen | {key}
+		return key, tuple((pending | (referenced - chosen), chosen) for referenced in self._children[key])
+
+	def count(self, state: _t.Optional[_State] = None) -> int:
+		"""The number of combinations (in the sub-tree starting at the given state)."""
+		if state is None:
+			state = self._root
+		counts = self._counts
+		stack = [state]  # Not recursive: there could be more keys than the recursion limit allows
+		while stack:
+			top = stack[-1]
+			if top in counts:
+				stack.pop()
+				continue
+			if not top[0]:
+				counts[top] = 1
+				stack.pop()
+				continue
+			_, branches = self._branches(top)
+			not_counted = [branch for branch in set(branches) if branch not in counts]
+			if not_counted:
+				stack.extend(not_counted)
+				continue
+			counts[top] = sum(counts[branch] for branch in branches)
+			stack.pop()
+		return counts[state]
+
+	def combination(self, index: int) -> _t.Dict[str, _t.Any]:
+		"""The combination at the given index: the chosen value for each key."""
+		chosen: _t.Dict[str, _t.Any] = dict()
+		state = self._root
+		while state[0]:
+			key, branches = self._branches(state)
+			values = self.axes[key].values
+			first_branch = branches[0]
+			if all(branch == first_branch for branch in branches):
+				# No alternative leads anywhere else: it's a single "digit" of a mixed-radix number
+				digit, index = divmod(index, self.count(first_branch))
+				chosen[key] = values[digit]
+				state = first_branch
+				continue
+			for value, branch in zip(values, branches):
+				branch_count = self.count(branch)
+				if index < branch_count:
+					chosen[key] = value
+					state = branch
+					break
+				index -= branch_count
+		return chosen
+
+
+def _combination_tree(
+	template: _Template, format_dict: _t.Mapping[str, _t.Any], axes: _t.Sequence[_Axis], recursive: bool, safe: bool,
+) -> _CombinationTree:
+	axis_keys = frozenset(key for key, _ in axes)
+	leaves_dict = _ChainMap({key: '' for key in axis_keys}, format_dict)
+	roots = _referenced_alternatives(template, leaves_dict, axis_keys, recursive, safe)
+	children: _t.Dict[str, _t.Tuple[_t.FrozenSet[str], ...]] = {
+		key: tuple(
+			_referenced_alternatives(str(value), leaves_dict, axis_keys, recursive, safe) if recursive else frozenset()
+			for value in alternatives
+		)
+		for key, alternatives in axes
+	}
+	return _CombinationTree(axes, roots, children)
+
+
+class _Shuffle:
+	"""
+	A seeded pseudo-random permutation of ``range(n)``, with each shuffled index computed on its own:
+	a Feistel network over the smallest even power of 2 covering ``n``, with "cycle-walking" to stay within ``n``.
+	So, the first items of the permutation don't depend on how many of them are taken - and nothing is stored.
+	"""
+	__slots__ = ('n', '_half_bits', '_half_mask', '_keys')
+
+	def __init__(self, n: int, seed: int):
+		self.n = n
+		self._half_bits = half_bits = max(-(-max(n - 1, 1).bit_length() // 2), 1)
+		self._half_mask = (1 << half_bits) - 1
+		rnd = _Random(seed)
+		self._keys = tuple(rnd.getrandbits(64) for _ in range(_FEISTEL_ROUNDS))
+
+	def _round(self, value: int, key: int) -> int:
+		value = ((value ^ key) * 0x9E3779B97F4A7C15) & _U64_MASK
+		value ^= value >> 29
+		return value & self._half_mask
+
+	def __getitem__(self, index: int) -> int:
+		half_bits = self._half_bits
+		half_mask = self._half_mask
+		while True:
+			left, right = index >> half_bits, index & half_mask
+			for key in self._keys:
+				left, right = right, left ^ self._round(right, key)
+			index = (left << half_bits) | right
+			if index < self.n:  # Otherwise, walk the cycle on: it always leads back into the range
+				return index
+
+
+def combination_indices(
+	total: int, start: int = 0, count: _t.Optional[int] = None, seed: _t.Optional[int] = None,
+) -> _t.Iterator[int]:
+	"""
+	Indices of the combinations to generate: a slice of the product, in order - or of its seeded shuffle
+	(a sample without repetitions: the same seed gives the same order, so consecutive slices never overlap).
+	"""
+	start = max(int(start), 0)
+	stop = total if count is None else min(total, start + max(int(count), 0))
+	if seed is None:
+		return iter(range(start, stop))
+	shuffle = _Shuffle(total, int(seed))
+	return (shuffle[i] for i in range(start, stop))
+
+
+class Expansion:
+	"""
+	A template prepared to be formatted with the combinations of the alternatives it uses:
+	the template is compiled, the dict is validated and its axes are found only once - for any number of batches.
+
+	Only the distinct combinations are counted: in recursive mode, the alternatives of a key referenced
+	only by some alternatives of another key are combined only with those (see ``_CombinationTree``).
+	"""
+	__slots__ = ('template', 'format_dict', 'recursive', 'safe', 'axes', 'total', '_tree')
+
+	def __init__(
+		self,
+		template: _t.Union[str, _Template],
+		format_dict: _t.Optional[_t.Mapping[str, _t.Any]] = None,
+		recursive: bool = False,
+		safe: bool = True,
+	):
+		if format_dict is None:
+			format_dict = dict()
+		_verify_input_dict(format_dict)
+		if not isinstance(format_dict, _FormatDict):
+			format_dict = _FormatDict.from_mapping(format_dict, keys_validated=True)
+		self.template = template if isinstance(template, _Template) else _Template.from_text(template)
+		self.format_dict: _FormatDict = format_dict
+		self.recursive = bool(recursive)
+		self.safe = bool(safe)
+		self.axes = alternative_axes(self.template, format_dict, recursive=recursive, safe=safe)
+		self._tree = _combination_tree(self.template, format_dict, self.axes, self.recursive, self.safe)
+		self.total = self._tree.count()
+
+	def strings_gen(self, start: int = 0, count: _t.Optional[int] = None, seed: _t.Optional[int] = None) -> _t.Iterator[str]:
+		"""
+		Format the template with each of the selected combinations (see ``combination_indices()``), one at a time.
+		Each combination's dict shares its structure with the original one: only the chosen alternatives are added.
+		"""
+		format_dict = self.format_dict
+		tree = self._tree
+		for index in combination_indices(self.total, start, count, seed):
+			combination_dict = format_dict.updated(tree.combination(index), keys_validated=True)
+			yield _Formatter(
+				format_dict=combination_dict, recursive=self.recursive, safe=self.safe, show_status=False,
+			)(self.template)
+
+
+def expanded_gen(
+	template: _t.Union[str, _Template],
+	format_dict: _t.Optional[_t.Mapping[str, _t.Any]] = None,
+	recursive: bool = False,
+	safe: bool = True,
+	start: int = 0,
+	count: _t.Optional[int] = None,
+	seed: _t.Optional[int] = None,
+) -> _t.Iterator[str]:
+	"""
+	Format the template with each combination of the alternatives it uses, one at a time
+	(see ``combination_indices()`` for the arguments selecting the combinations).
+	"""
+	return Expansion(template, format_dict, recursive=recursive, safe=safe).strings_gen(start, count, seed)
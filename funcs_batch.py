@@ -0,0 +1,196 @@
+# encoding: utf-8
+"""
+Parallel batch formatting: huge batches of template/dict pairs are split into chunks
+and formatted in a pool of worker processes.
+
+Can be used both from the batch-formatter node and from plain python::
+
+	strings = format_batch(templates, dicts, recursive=True, parallel=True)
+
+Small batches are formatted in the current process anyway - starting up a process pool costs much more
+than the formatting itself. The same fallback happens if the pool can't be used at all
+(e.g., the worker processes can't import this module) - or if the dicts can't be sent to another process
+(e.g., they contain local functions, lambdas or locks).
+
+The worker processes are never forked from the current one: ComfyUI is a multi-threaded server (with CUDA state),
+and a plain ``fork()`` of it could deadlock - or leave the workers with an unusable copy of that state.
+So they're started by a fork-server (on POSIX) or spawned (on Windows): from a clean interpreter, once per pool.
+"""
+
+import typing as _t
+
+from concurrent.futures import ProcessPoolExecutor as _ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool as _BrokenProcessPool
+import multiprocessing as _mp
+import os as _os
+from pathlib import Path as _Path
+from pickle import HIGHEST_PROTOCOL as _HIGHEST_PROTOCOL, Pickler as _Pickler, PicklingError as _PicklingError
+from threading import Lock as _Lock
+
+from .node_formatter import _broadcast_batch_size, _formatted_batch
+
+
+_PARALLEL_MIN_BATCH_SIZE = 5000  # Below this number of strings, the batch is always formatted in-process
+_CHUNKS_PER_WORKER = 4  # Smaller chunks balance the load better, but cost more on inter-process communication
+_MIN_CHUNK_SIZE = 256
+
+_pool: _t.Optional[_ProcessPoolExecutor] = None
+_pool_workers: int = 0
+_pool_unusable = False  # Set once the pool is broken - not to re-try it (and fail again) on every call
+_pool_lock = _Lock()
+
+# Executed in each worker process before anything else. ComfyUI loads the node pack from its folder,
+# not from ``sys.path`` - so a fresh interpreter can't import it by name: the package (and its parents, if any)
+# is registered as a bare namespace, without running its ``__init__.py``. Passed as a code string to ``exec()``,
+# since no function of this package can be unpickled in the worker before that.
+_WORKER_INIT_CODE = """
+import sys, types
+parts = package_name.split('.')
+for i in range(1, len(parts) + 1):
+	name = '.'.join(parts[:i])
+	if name not in sys.modules:
+		module = types.ModuleType(name)
+		module.__path__ = [package_dir] if i == len(parts) else []
+		module.__package__ = name
+		sys.modules[name] = module
+"""
+
+
+def _mp_context():
+	start_methods = _mp.get_all_start_methods()
+	return _mp.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+
+
+def _get_pool(workers: int) -> _ProcessPoolExecutor:
+	"""The pool is started on the first parallel batch and then re-used - unless a different size is requested."""
+	global _pool, _pool_workers
+	with _pool_lock:
+		if _pool is None or _pool_workers != workers:
+			if _pool is not None:
+				_pool.shutdown(wait=False)
+			_pool = _ProcessPoolExecutor(
+				max_workers=workers, mp_context=_mp_context(), initializer=exec, initargs=(
+					_WORKER_INIT_CODE, {'package_name': __package__, 'package_dir': str(_Path(__file__).parent)},
+				),
+			)
+			_pool_workers = workers
+		return _pool
+
+
+def _shutdown_pool():
+	global _pool, _pool_workers
+	with _pool_lock:
+		if _pool is not None:
+			_pool.shutdown(wait=False)
+		_pool = None
+		_pool_workers = 0
+
+
+class _DiscardingWriter:
+	"""A file-like sink for a pickler: only to check that something pickles, without keeping the pickled bytes."""
+	__slots__ = ()
+
+	@staticmethod
+	def write(data) -> int:
+		return len(data)
+
+
+def _is_picklable(obj) -> bool:
+	"""
+	Whether the object can be sent to a worker process. Pickling errors aren't always ``PicklingError``:
+	local functions and lambdas give ``AttributeError``, and locks (or other C objects) give ``TypeError``.
+	"""
+	try:
+		_Pickler(_DiscardingWriter(), protocol=_HIGHEST_PROTOCOL).dump(obj)
+	except (_PicklingError, AttributeError, TypeError):
+		return False
+	return True
+
+
+def _format_chunk(
+	args: _t.Tuple[_t.Sequence[str], _t.Sequence[_t.Optional[_t.Dict[str, _t.Any]]], bool, bool]
+) -> _t.List[str]:
+	"""Executed in a worker process."""
+	templates, dicts, recursive, safe = args
+	return _formatted_batch(templates, dicts, recursive=recursive, safe=safe)
+
+
+def _chunks_gen(
+	templates: _t.Sequence[str],
+	dicts: _t.Sequence[_t.Optional[_t.Dict[str, _t.Any]]],
+	batch_size: int,
+	chunk_size: int,
+	recursive: bool,
+	safe: bool,
+):
+	"""Split the batch into chunks, each being a smaller batch - with the same pairing of templates and dicts."""
+	n_templates = len(templates)
+	n_dicts = len(dicts)
+	for start in range(0, batch_size, chunk_size):
+		end = min(start + chunk_size, batch_size)
+		yield (
+			templates[start:end] if n_templates > 1 else templates,
+			dicts[start:end] if n_dicts > 1 else dicts,
+			recursive, safe,
+		)
+
+
+def format_batch(
+	templates: _t.Sequence[str],
+	dicts: _t.Sequence[_t.Optional[_t.Dict[str, _t.Any]]],
+	recursive: bool = False,
+	safe: bool = True,
+	parallel: bool = True,
+	workers: int = None,
+	chunk_size: int = None,
+	min_parallel_size: int = None,
+) -> _t.List[str]:
+	"""
+	Format a batch of strings: a single template with each dict, each template with a single dict,
+	or templates and dicts paired one-to-one. The output order always matches the input one.
+
+	:param parallel: Allow formatting in multiple processes (for big enough batches).
+	:param workers: The number of worker processes. Default: the number of CPUs.
+	:param chunk_size: How many strings to send to a worker process at once. Default: split evenly between workers.
+	:param min_parallel_size:
+		Batches smaller than this are formatted in-process. Default: ``_PARALLEL_MIN_BATCH_SIZE``.
+	"""
+	global _pool_unusable
+
+	templates = list(templates)
+	dicts = list(dicts) if dicts else [None]
+	batch_size = _broadcast_batch_size(len(templates), len(dicts))
+
+	if min_parallel_size is None:
+		min_parallel_size = _PARALLEL_MIN_BATCH_SIZE
+	if workers is None:
+		workers = _os.cpu_count() or 1
+	workers = max(int(workers), 1)
+
+	if not parallel or _pool_unusable or workers < 2 or batch_size < max(int(min_parallel_size), 2):
+		return _formatted_batch(templates, dicts, recursive=recursive, safe=safe)
+	# Checked before anything is sent: a pickling error raised from the pool would look just like
+	# an error in the formatting itself. The same dict used by many strings is pickled only once here.
+	if not _is_picklable((templates, dicts)):
+		return _formatted_batch(templates, dicts, recursive=recursive, safe=safe)
+
+	if chunk_size is None:
+		chunk_size = max(batch_size // (workers * _CHUNKS_PER_WORKER), _MIN_CHUNK_SIZE)
+	chunk_size = max(int(chunk_size), 1)
+
+	chunks = _chunks_gen(templates, dicts, batch_size, chunk_size, recursive, safe)
+	try:
+		formatted_chunks = list(_get_pool(workers).map(_format_chunk, chunks))
+	except (_BrokenProcessPool, _PicklingError, ImportError, OSError) as e:
+		# The pool itself doesn't work. Any errors in the formatting itself aren't caught here:
+		# they'd be raised in-process, too. Only a broken pool is given up on for good:
+		# other errors (e.g., out of file descriptors) might be transient - so the pool is re-built next time.
+		if isinstance(e, _BrokenProcessPool):
+			_pool_unusable = True
+		_shutdown_pool()
+		return _formatted_batch(templates, dicts, recursive=recursive, safe=safe)
+
+	out_strings: _t.List[str] = list()
+	for chunk in formatted_chunks:
+		out_strings.extend(chunk)
+	return out_strings
@@ -5,24 +5,27 @@
 
 import typing as _t
 
+from collections import OrderedDict as _OrderedDict
+from dataclasses import fields as _dataclass_fields, is_dataclass as _is_dataclass
 import re as _re
+from threading import Lock as _Lock
 
-from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
-
-from server import PromptServer as _PromptServer
+from frozendict import frozendict as _frozendict
 
 from .enums import T as _T, T2 as _T2
+from .format_dict import FormatDict as _FormatDict, is_plain_value as _is_plain_value, _is_mergeable, _SCALAR_TYPES
+from .funcs_stats import count_cache as _count_cache, timed as _timed
+from .funcs_status import show_status as _show_status, status_enabled as _status_enabled
 
 
 def _show_text_on_node(text: str = None, unique_id: str = None):
+	"""Queue the text to be shown on the node (it's sent asynchronously - see ``funcs_status``)."""
 	if not text:
 		# TODO: Planned for the future - currently, there's no point removing the text since it's box is shown anyway
 		# An odd workaround since `send_progress_text()` doesn't want to update text when '' passed
 		text = '<span></span>'
 	# print(f"{unique_id} text: {text!r}")
-
-	# Snatched from: https://github.com/comfyanonymous/ComfyUI/blob/27870ec3c30e56be9707d89a120eb7f0e2836be1/comfy_extras/nodes_images.py#L581-L582
-	_PromptServer.instance.send_progress_text(text, unique_id)
+	_show_status(text, unique_id)
 
 
 _re_valid_key_match = _re.compile("[a-zA-Z_][a-zA-Z_0-9]*$").match
@@ -65,12 +68,18 @@ def _raise_from_errors_dict(
 def _verify_input_dict(input_dict: _t.Dict[str, _T] = None, error_if_none=False):
 	"""
 	Verify input dict to have only valid keys. Raises errors if invalid ones found.
+
+	Dicts built by this node pack are already validated (see ``FormatDict.keys_validated``) - so only the ones
+	coming from elsewhere are actually checked.
 	"""
 	if input_dict is None:
 		if error_if_none:
 			raise TypeError("No input-dict")
 		return
 
+	if isinstance(input_dict, _FormatDict) and input_dict.keys_validated:
+		return
+
 	# In py3.10, frozendict isn't a dict, but is a `typing.Mapping`.
 	# So, this many types to check against:
 	if not isinstance(input_dict, (dict, _frozendict, _t.Mapping)):
@@ -97,30 +106,104 @@ def _verify_input_dict_into_new(input_dict: _t.Dict[str, _T] = None) -> _t.Dict[
 	return dict(input_dict)
 
 
+def _has_lazy_layers(format_dict: _FormatDict) -> bool:
+	# noinspection PyProtectedMember
+	return not all(_is_mergeable(layer) for layer in format_dict._layers_bottom_up())
+
+
+def _items_iter(dict_or_pairs: _t.Union[_t.Mapping[str, _T], _t.Iterable[_t.Tuple[str, _T]]]):
+	if isinstance(dict_or_pairs, _t.Mapping):
+		return dict_or_pairs.items()
+	return dict_or_pairs
+
+
+@_timed('merge_dicts', sized_args=('input_dict', ))
 def _new_updated_dict(
-	input_dict: _t.Union[_t.Dict[str, _T], None], *updating_dicts: _t.Dict[str, _T2],
+	input_dict: _t.Union[_t.Dict[str, _T], None],
+	*updating_dicts: _t.Union[_t.Dict[str, _T2], _t.Iterable[_t.Tuple[str, _T2]]],
 	sort=True, frozen=True, validate_new_keys=True
 ) -> _t.Dict[str, _t.Union[_T, _T2]]:
-	"""Return a new dict being a union of the input one and the new (updating) ones."""
-	out_dict: _t.Dict[str, _t.Union[_T, _T2]] = _verify_input_dict_into_new(input_dict)
-
-	if validate_new_keys:
-		errors_dict: _t.Dict[_t.Any, str] = dict()
-		for upd_d in updating_dicts:
-			upd_d = dict(upd_d)
-			for key in list(upd_d.keys()):
-				val = upd_d.pop(key)
+	"""
+	Return a new dict being a union of the input one and the new (updating) ones.
+
+	Each updating dict could also be an iterable of key-value pairs (even a generator): then, its items are merged
+	into the output one by one, without building an intermediate dict first.
+
+	A frozen dict is returned as ``FormatDict``, which shares its structure with the input one (if it's a ``FormatDict``
+	itself) - so only the new items are actually added. Its keys are always sorted,
+	thus ``sort`` only matters for a non-frozen dict.
+	"""
+	_verify_input_dict(input_dict)
+
+	if frozen and len(updating_dicts) == 1 and isinstance(updating_dicts[0], _FormatDict):
+		# A whole frozen dict on top of another one: its layers are re-used as-is (lazy ones aren't loaded)
+		updating_dict: _FormatDict = updating_dicts[0]
+		if validate_new_keys:
+			_verify_input_dict(updating_dict)
+		if not isinstance(input_dict, _FormatDict):
+			input_dict = _FormatDict.from_mapping(input_dict, keys_validated=True)
+		return updating_dict.rebased(input_dict, keys_validated=validate_new_keys or updating_dict.keys_validated)
+
+	if frozen and not isinstance(input_dict, _FormatDict):
+		input_dict = _FormatDict.from_mapping(input_dict, keys_validated=True)  # It's just been verified
+
+	new_items: _t.Dict[str, _T2] = dict()
+	values_frozen = True  # As long as all the new items come from other frozen dicts
+	errors_dict: _t.Dict[_t.Any, str] = dict()
+	for upd_d in updating_dicts:
+		if isinstance(upd_d, _FormatDict):
+			if _has_lazy_layers(upd_d):
+				if frozen:
+					# Its lazy layers are carried over as-is (not loaded) - on top of everything merged before it:
+					_raise_from_errors_dict(errors_dict)
+					if validate_new_keys:
+						_verify_input_dict(upd_d)
+					input_dict = upd_d.rebased(
+						input_dict.updated(new_items, keys_validated=validate_new_keys, values_frozen=values_frozen),
+						keys_validated=validate_new_keys or upd_d.keys_validated,
+					)
+					new_items = dict()
+					values_frozen = True
+					continue
+			elif upd_d.keys_validated or not validate_new_keys:
+				# Already validated items are merged as they are - layer by layer (each one in a single C-level call):
+				# noinspection PyProtectedMember
+				for layer in upd_d._layers_bottom_up():
+					new_items.update(layer)
+				continue
+		values_frozen = False
+		if validate_new_keys:
+			for key, val in _items_iter(upd_d):
 				key = _validate_key(key, errors_dict)
-				upd_d[key] = val
-			out_dict.update(upd_d)
-		_raise_from_errors_dict(errors_dict)
-	else:
-		for upd_d in updating_dicts:
-			out_dict.update(upd_d)
+				new_items[key] = val
+		else:
+			new_items.update(_items_iter(upd_d))
+	_raise_from_errors_dict(errors_dict)
+
+	if frozen:
+		return input_dict.updated(new_items, keys_validated=validate_new_keys, values_frozen=values_frozen)
 
+	out_dict: _t.Dict[str, _t.Union[_T, _T2]] = dict() if input_dict is None else dict(input_dict)
+	out_dict.update(new_items)
 	if sort:
 		out_dict = {k: v for k, v in sorted(out_dict.items())}  # rely on implied ordered dicts in newer py3 versions
-	return _deepfreeze(out_dict) if frozen else out_dict
+	return out_dict
+
+
+def _merged_dicts(
+	dicts: _t.Sequence[_t.Optional[_t.Mapping[str, _T]]], last_wins: bool = True,
+) -> _t.Dict[str, _T]:
+	"""
+	Merge any number of dicts into a single frozen one - in one go, instead of a chain of pairwise updates:
+	the lowest-precedence dict is re-used as the base, and the items of all the others are collected into
+	a single layer on top of it (the keys of already validated dicts aren't re-validated).
+	"""
+	dicts = [d for d in dicts if d is not None]
+	if not last_wins:
+		dicts.reverse()
+	if not dicts:
+		return _new_updated_dict(None)
+	return _new_updated_dict(dicts[0], *dicts[1:])
 
 
 def _new_dict_with_updated_key(
@@ -130,3 +213,143 @@ def _new_dict_with_updated_key(
 	return _new_updated_dict(
 		input_dict, {key: value}, sort=sort, frozen=frozen, validate_new_keys=validate_key
 	)
+
+
+_RESULTS_CACHE_SIZE = 64
+_EXACT_SCALAR_TYPES = _SCALAR_TYPES - {float, complex}  # Equal values of these types always format the same
+
+
+class _DictCacheKey:
+	"""
+	Wraps a ``FormatDict`` in cache keys: it's hashed by its incrementally-updated fingerprint,
+	which is much cheaper to get for a freshly derived dict than the regular hash (going through all the items).
+	"""
+	__slots__ = ('format_dict', )
+
+	def __init__(self, format_dict: _FormatDict):
+		self.format_dict = format_dict
+
+	def __hash__(self):
+		return self.format_dict.fingerprint
+
+	def __eq__(self, other):
+		if not isinstance(other, _DictCacheKey):
+			return NotImplemented
+		return self.format_dict is other.format_dict or self.format_dict == other.format_dict
+
+
+def _cache_key(inputs: tuple) -> tuple:
+	return tuple(
+		_DictCacheKey(x) if (isinstance(x, _FormatDict) and x.fingerprint is not None) else x
+		for x in inputs
+	)
+
+
+def _formats_same(stored, new) -> bool:
+	"""
+	Equal values might still format differently: ``1 == 1.0 == True`` and ``0.0 == -0.0``,
+	but ``'{}'.format()`` gives different strings for them. So, for the inputs found equal, the types are checked
+	all the way down (and floats are compared by their ``repr()``). A value of any other type (which could
+	have its own ``__format__()``) is a match only if it's the very same object.
+	"""
+	if stored is new:
+		return True
+	value_type = type(stored)
+	if value_type is not type(new):
+		return False
+	if value_type is float or value_type is complex:
+		return repr(stored) == repr(new)
+	if value_type in _EXACT_SCALAR_TYPES:
+		return True
+
+	if value_type is tuple or value_type is list:
+		stored_types = list(map(type, stored))
+		if stored_types != list(map(type, new)):
+			return False
+		if _EXACT_SCALAR_TYPES.issuperset(stored_types):  # Checked in C - for huge lists of numbers or strings
+			return True
+		return all(map(_formats_same, stored, new))
+	if isinstance(stored, _t.Mapping):
+		# Lazy layers of a ``FormatDict`` are skipped: checking them would load all their values
+		stored_items = stored._eager_items() if isinstance(stored, _FormatDict) else stored.items()
+		return all(key in new and _formats_same(value, new[key]) for key, value in stored_items)
+	if _is_dataclass(stored) and stored.__dataclass_params__.frozen:  # E.g., ``Template`` or ``Alternatives``
+		return all(
+			_formats_same(getattr(stored, field.name), getattr(new, field.name))
+			for field in _dataclass_fields(stored) if field.compare
+		)
+	return False
+
+
+class _ResultsCache:
+	"""
+	A small LRU cache of node results, keyed by the node's inputs (compared by value, not by identity).
+
+	ComfyUI itself re-uses node outputs only if the node's inputs come from the very same upstream outputs.
+	But whenever an upstream node is re-executed for any reason, it produces a new (but often identical) dict -
+	and every node downstream is re-executed, too. This cache catches such cases: identical inputs
+	(with frozen dicts compared by their cached fingerprint first) give the very same output object,
+	so the nodes further down the chain hit their own caches even cheaper - by identity.
+
+	Only the inputs of plain data are cached (see ``format_dict.is_plain_value()``). Opaque objects - like images,
+	latents or models - are released by ComfyUI as soon as nothing needs them: the cache mustn't keep them alive.
+	"""
+	__slots__ = ('maxsize', 'name', '_cache', '_lock')
+
+	def __init__(self, maxsize: int = _RESULTS_CACHE_SIZE, name: str = 'results'):
+		self.maxsize = max(int(maxsize), 1)
+		self.name = name  # For the hit-rate stats (see ``funcs_stats``)
+		self._cache: _t.Dict[_t.Any, _t.Any] = _OrderedDict()
+		self._lock = _Lock()
+
+	def get(self, key: tuple) -> _t.Any:
+		"""The cached result for the given inputs, or ``None`` (also, if any of the inputs is unhashable)."""
+		result = self._get(key)
+		_count_cache(self.name, result is not None)
+		return result
+
+	def _get(self, key: tuple) -> _t.Any:
+		cache_key = _cache_key(key)
+		try:
+			with self._lock:
+				stored_key, result = self._cache.get(cache_key, (None, None))
+				if result is None:
+					return None
+				self._cache.move_to_end(cache_key)
+		except TypeError:  # unhashable
+			return None
+		except (ValueError, RuntimeError):  # Equal hashes, but values can't be compared (like tensors or arrays)
+			return None
+		return result if all(map(_formats_same, stored_key, key)) else None
+
+	def put(self, key: tuple, result: _t.Any):
+		"""Remember the result for the given inputs. Unhashable or opaque inputs are silently ignored."""
+		if not all(map(_is_plain_value, key)):
+			return
+		cache_key = _cache_key(key)
+		try:
+			hash(cache_key)
+		except TypeError:
+			return
+		cache = self._cache
+		with self._lock:
+			cache[cache_key] = (key, result)
+			cache.move_to_end(cache_key)
+			if len(cache) > self.maxsize:
+				cache.popitem(last=False)
+
+	def get_or_compute(self, key: tuple, compute: _t.Callable[[], _T]) -> _T:
+		"""
+		Return the cached result for the given inputs, or compute (and cache) it.
+		If any of the inputs is unhashable or opaque, the result is just computed - with no caching at all.
+		If computing throws, nothing is cached.
+		"""
+		result = self.get(key)
+		if result is None:
+			result = compute()
+			self.put(key, result)
+		return result
+
+	def clear(self):
+		with self._lock:
+			self._cache.clear()
@@ -0,0 +1,240 @@
+# encoding: utf-8
+"""
+Format-dicts loaded from files on disk - parsed only once, and re-parsed only when the file actually changes.
+
+The parsed dicts are kept in a small process-level cache. On every run, the file is only ``stat()``-ed:
+if its size and modification time are the same, the cached dict is returned as-is (the very same object -
+so the nodes down the chain hit their own caches, too). If they differ, the content hash is checked before
+re-parsing: a file which is just touched (or re-saved with the same content) isn't parsed again.
+In the "content hash" mode, the hash is checked on every run - in case the file system has a coarse mtime resolution.
+The file is still hashed only once per run: the hash computed for ComfyUI's ``IS_CHANGED`` is re-used on load.
+
+Big files are memory-mapped: both hashing and parsing go through the mapped file, without reading it into memory
+as a whole.
+
+A text file could also be loaded lazily (see ``funcs_file_index``): then, only the index of the entries is built,
+and the values are read from the file on access.
+"""
+
+import typing as _t
+
+from codecs import getincrementaldecoder as _getincrementaldecoder
+from collections import OrderedDict as _OrderedDict
+from dataclasses import dataclass as _dataclass
+import hashlib as _hashlib
+import json as _json
+import mmap as _mmap
+import os as _os
+import sys as _sys
+from threading import Lock as _Lock
+
+from .format_dict import FormatDict as _FormatDict
+from .funcs_common import _new_updated_dict
+from .funcs_file_index import indexed_text_file_dict as _indexed_text_file_dict
+from .funcs_stats import count_cache as _count_cache
+from .node_dict_from_text import _parsed_kv_pairs_gen, _READ_BLOCK_SIZE
+
+
+_FILE_CACHE_SIZE = 16  # How many parsed files to keep
+_MMAP_MIN_SIZE = 1 << 20  # Files at least this big are memory-mapped
+_ENCODING = 'utf-8-sig'  # UTF-8, with an optional BOM (some windows editors still add it)
+
+FORMAT_AUTO = 'auto'
+FORMAT_TEXT = 'text'
+FORMAT_JSON = 'json'
+FORMATS = (FORMAT_AUTO, FORMAT_TEXT, FORMAT_JSON)
+_JSON_EXTENSIONS = frozenset(('.json', ))
+
+CHECK_MTIME = 'mtime and size'
+CHECK_HASH = 'content hash'
+CHECKS = (CHECK_MTIME, CHECK_HASH)
+
+__dataclass_slots_args = dict() if _sys.version_info < (3, 10) else dict(slots=True)
+
+
+class _MMapTextReader:
+	"""A minimal read-only text "file" over a memory-mapped one: the bytes are decoded block by block."""
+	__slots__ = ('_mapped', '_decoder', '_pos')
+
+	def __init__(self, mapped: _mmap.mmap, encoding: str = _ENCODING):
+		self._mapped = mapped
+		self._decoder = _getincrementaldecoder(encoding)()
+		self._pos = 0
+
+	def read(self, size: int = -1) -> str:
+		mapped = self._mapped
+		n = len(mapped)
+		if size is None or size < 0:
+			size = n
+		size = max(size, 4)  # So that a multibyte character always has a chance to be decoded
+		while self._pos < n:
+			end = min(self._pos + size, n)
+			text = self._decoder.decode(mapped[self._pos:end], final=end >= n)
+			self._pos = end
+			if text:
+				return text
+		return ''
+
+
+def _resolved_path(path: str, base_dir: str = None) -> str:
+	"""
+	The real (symlink-free) absolute path to the file.
+
+	If ``base_dir`` is given, a relative path is relative to it - and the file must be inside it
+	(no ``..`` or symlinks leading out of it, and no absolute paths elsewhere). Otherwise, ``ValueError`` is raised.
+	"""
+	path = _os.path.expandvars(_os.path.expanduser(str(path).strip().strip('"')))
+	if not base_dir:
+		return _os.path.normcase(_os.path.realpath(path))
+
+	base_dir = _os.path.normcase(_os.path.realpath(base_dir))
+	path = _os.path.normcase(_os.path.realpath(_os.path.join(base_dir, path)))
+	try:
+		is_inside = _os.path.commonpath((base_dir, path)) == base_dir
+	except ValueError:  # Different drives on Windows
+		is_inside = False
+	if not is_inside:
+		raise ValueError(f"The dict file must be inside the directory: {base_dir!r}")
+	return path
+
+
+def _file_format(path: str, file_format: str = FORMAT_AUTO) -> str:
+	if file_format not in FORMATS:
+		raise ValueError(f"Unknown file format: {file_format!r}. Expected one of: {', '.join(FORMATS)}")
+	if file_format != FORMAT_AUTO:
+		return file_format
+	return FORMAT_JSON if _os.path.splitext(path)[1].lower() in _JSON_EXTENSIONS else FORMAT_TEXT
+
+
+def _content_hash(path: str, size: int) -> str:
+	digest = _hashlib.blake2b(digest_size=20)
+	with open(path, 'rb') as file:
+		if size >= _MMAP_MIN_SIZE:
+			with _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ) as mapped:
+				digest.update(mapped)
+		else:
+			for block in iter(lambda: file.read(_READ_BLOCK_SIZE), b''):
+				digest.update(block)
+	return digest.hexdigest()
+
+
+def _text_file_pairs(path: str, size: int, cleanup: bool) -> _FormatDict:
+	if size >= _MMAP_MIN_SIZE:
+		with open(path, 'rb') as file, _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ) as mapped:
+			return _new_updated_dict(None, _parsed_kv_pairs_gen(_MMapTextReader(mapped), strip_lines=cleanup))
+	with open(path, 'r', encoding=_ENCODING, newline='') as file:
+		# With ``newline=''``, line breaks are kept as-is - to be split exactly the same way as the text in the widget.
+		return _new_updated_dict(None, _parsed_kv_pairs_gen(file, strip_lines=cleanup))
+
+
+def _json_file_pairs(path: str) -> _FormatDict:
+	with open(path, 'r', encoding=_ENCODING) as file:
+		try:
+			loaded = _json.load(file)
+		except ValueError as e:
+			raise ValueError(f"Invalid JSON in the dict file: {path!r}\n{e}") from e
+	if not isinstance(loaded, dict):
+		raise TypeError(f"A JSON dict file must contain a single object (dict) at the top level. Got: {type(loaded)}")
+	return _new_updated_dict(None, loaded)
+
+
+def _parsed_file(path: str, size: int, file_format: str, cleanup: bool, lazy: bool = False) -> _FormatDict:
+	if file_format == FORMAT_JSON:
+		return _json_file_pairs(path)
+	if lazy:
+		return _indexed_text_file_dict(path, cleanup)
+	return _text_file_pairs(path, size, cleanup)
+
+
+@_dataclass(**__dataclass_slots_args)
+class _CachedFile:
+	size: int
+	mtime_ns: int
+	content_hash: str
+	format_dict: _FormatDict
+
+
+_cache: _t.Dict[_t.Tuple[str, str, bool, bool], _CachedFile] = _OrderedDict()
+_cache_lock = _Lock()
+
+# The hashes computed by ``file_signature()`` - handed over to the very next ``load_file_dict()`` on the same file,
+# so that in the "content hash" mode the file is read only once per run: path -> (size, mtime_ns, content_hash)
+_signature_hashes: _t.Dict[str, _t.Tuple[int, int, str]] = _OrderedDict()
+
+
+def file_signature(path: str, check: str = CHECK_MTIME) -> _t.Tuple[_t.Any, ...]:
+	"""
+	What identifies the current state of the file for the given check mode (changes whenever the file does).
+	It's meant for ComfyUI's ``IS_CHANGED`` - to re-execute the node whenever the file is modified.
+	"""
+	stat = _os.stat(path)
+	if check != CHECK_HASH:
+		return stat.st_size, stat.st_mtime_ns
+	content_hash = _content_hash(path, stat.st_size)
+	with _cache_lock:
+		_signature_hashes[path] = (stat.st_size, stat.st_mtime_ns, content_hash)
+		_signature_hashes.move_to_end(path)
+		while len(_signature_hashes) > _FILE_CACHE_SIZE:
+			_signature_hashes.popitem(last=False)
+	return (content_hash, )
+
+
+def _signature_hash(path: str, size: int, mtime_ns: int) -> _t.Optional[str]:
+	"""The hash left by ``file_signature()`` - if the file hasn't changed since. Each one is used only once."""
+	with _cache_lock:
+		stored = _signature_hashes.pop(path, None)
+	if stored is None or stored[:2] != (size, mtime_ns):
+		return None
+	return stored[2]
+
+
+def load_file_dict(
+	path: str, file_format: str = FORMAT_AUTO, cleanup: bool = True, check: str = CHECK_MTIME, lazy: bool = False,
+) -> _FormatDict:
+	"""
+	Load a format-dict from a file - either in the same text format as ``Dict from Text`` node takes, or a JSON object.
+
+	The parsed dict is cached per (file, format, cleanup, lazy) - and it's re-used until the file changes
+	(see the module docstring for how it's detected).
+
+	:param lazy: Text format only: load the values from the file only when they're accessed.
+		A JSON file is always loaded as a whole.
+	"""
+	if check not in CHECKS:
+		raise ValueError(f"Unknown file-change check: {check!r}. Expected one of: {', '.join(CHECKS)}")
+	file_format = _file_format(path, file_format)
+	lazy = bool(lazy) and file_format == FORMAT_TEXT
+	cache_key = (path, file_format, bool(cleanup), lazy)
+
+	stat = _os.stat(path)
+	size, mtime_ns = stat.st_size, stat.st_mtime_ns
+	with _cache_lock:
+		cached = _cache.get(cache_key)
+		if cached is not None:
+			_cache.move_to_end(cache_key)
+
+	if cached is not None and check != CHECK_HASH and (cached.size, cached.mtime_ns) == (size, mtime_ns):
+		_count_cache('file_dicts', True)
+		return cached.format_dict
+
+	content_hash = _signature_hash(path, size, mtime_ns) or _content_hash(path, size)
+	if cached is not None and cached.content_hash == content_hash:
+		# The file is touched, but its content is the same:
+		cached.size, cached.mtime_ns = size, mtime_ns
+		_count_cache('file_dicts', True)
+		return cached.format_dict
+
+	_count_cache('file_dicts', False)
+	format_dict = _parsed_file(path, size, file_format, cleanup, lazy)
+	with _cache_lock:
+		_cache[cache_key] = _CachedFile(size, mtime_ns, content_hash, format_dict)
+		_cache.move_to_end(cache_key)
+		while len(_cache) > _FILE_CACHE_SIZE:
+			_cache.popitem(last=False)
+	return format_dict
+
+
+def _clear_cache():
+	with _cache_lock:
+		_cache.clear()
+		_signature_hashes.clear()
@@ -0,0 +1,235 @@
+# encoding: utf-8
+"""
+An indexed prompt library: a text file (in the ``Dict from Text`` format) is scanned once to build an index
+of byte offsets of each chunk - and then, the values are loaded from disk only when they're actually accessed.
+
+Only the index (names + offsets) is kept in memory for the whole library. The loaded values go into a single
+process-wide LRU cache of a limited size - so, the memory stays flat no matter how big the library is.
+
+The file is scanned directly as UTF-8 bytes (memory-mapped). That's possible because in UTF-8, each of the line
+breaks recognized by ``str.splitlines()`` is encoded as a unique sequence of bytes, which can't appear
+as a part of any other character.
+"""
+
+import typing as _t
+
+from collections import OrderedDict as _OrderedDict
+import mmap as _mmap
+import os as _os
+import re as _re
+from threading import Lock as _Lock
+
+from .format_dict import FormatDict as _FormatDict, LazyLayer as _LazyLayer, _FINGERPRINT_MASK, _item_fingerprint
+from .funcs_common import _validate_key, _raise_from_errors_dict
+from .funcs_stats import count_cache as _count_cache
+
+
+_VALUES_CACHE_SIZE = 4096  # How many loaded values to keep (for all the libraries combined)
+
+_SCAN_BLOCK_SIZE = 1 << 20  # The library is scanned in blocks of (about) this many bytes
+
+_BOM = b'\xef\xbb\xbf'
+# Line breaks recognized by `str.splitlines()`, which `bytes.splitlines()` doesn't split at:
+_RARE_LINE_BREAKS = (b'\x0b', b'\x0c', b'\x1c', b'\x1d', b'\x1e', b'\xc2\x85', b'\xe2\x80\xa8', b'\xe2\x80\xa9')
+# All the line breaks recognized by `str.splitlines()`, as UTF-8 bytes:
+_re_line_break_finditer = _re.compile(
+	b'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]'
+).finditer
+
+# The value of each entry is at [start:end] bytes of the file (line breaks in-between included):
+_Index = _t.Dict[str, _t.Tuple[int, int]]
+
+_values_cache: _t.Dict[_t.Tuple['_LazyTextFileDict', str], str] = _OrderedDict()
+_values_cache_lock = _Lock()
+
+
+def _line_spans_gen(data: _t.Union[bytes, _mmap.mmap], start: int = 0) -> _t.Iterator[_t.Tuple[int, int]]:
+	"""The (start, end) offsets of each line, without the line break. The same lines as ``str.splitlines()`` gives."""
+	if not any(data.find(line_break, start) >= 0 for line_break in _RARE_LINE_BREAKS):
+		yield from _line_spans_gen_common_breaks(data, start)
+		return
+
+	pos = start
+	for match in _re_line_break_finditer(data, start):
+		yield pos, match.start()
+		pos = match.end()
+	if pos < len(data):
+		yield pos, len(data)
+
+
+def _line_spans_gen_common_breaks(
+	data: _t.Union[bytes, _mmap.mmap], start: int = 0,
+) -> _t.Iterator[_t.Tuple[int, int]]:
+	"""
+	A much faster version of ``_line_spans_gen()`` for a text with only ``\n``, ``\r`` and ``\r\n`` line breaks:
+	the data is split into lines by ``bytes.splitlines()`` (in C), one block at a time.
+	"""
+	n = len(data)
+	pos = start
+	while pos < n:
+		block_end = min(pos + _SCAN_BLOCK_SIZE, n)
+		if block_end < n:
+			# A block always ends right after '\n' - to never cut a line (or a '\r\n' pair) in two:
+			next_lf = data.find(b'\n', block_end - 1)
+			block_end = n if next_lf < 0 else next_lf + 1
+		for line in data[pos:block_end].splitlines(keepends=True):
+			line_end = pos + len(line)
+			if line.endswith(b'\r\n'):
+				yield pos, line_end - 2
+			elif line.endswith((b'\n', b'\r')):
+				yield pos, line_end - 1
+			else:
+				yield pos, line_end
+			pos = line_end
+
+
+def _joined_value_lines(lines: _t.Iterable[str], cleanup: bool) -> str:
+	"""The same as ``_parsed_kv_pairs_gen()`` makes a value from the lines of a chunk."""
+	return '\n'.join(line.strip() for line in lines) if cleanup else '\n'.join(lines)
+
+
+def _built_index(data: _t.Union[bytes, _mmap.mmap], cleanup: bool) -> _t.Tuple[_Index, int]:
+	"""
+	Scan the whole library - the same way ``_parsed_kv_pairs_gen()`` parses it - and get the offsets of each value.
+	Also returns the fingerprint of all the items: each value is hashed during the scan and dropped right away.
+	"""
+	index: _Index = dict()
+	item_fingerprints: _t.Dict[str, int] = dict()
+	errors_dict: _t.Dict[_t.Any, str] = dict()
+
+	key: _t.Optional[str] = None
+	value_lines: _t.List[str] = list()
+	value_start = value_end = 0
+
+	def add_entry():
+		valid_key = _validate_key(key, errors_dict)
+		if valid_key is None:
+			return
+		index[valid_key] = (value_start, value_end)
+		item_fingerprints[valid_key] = _item_fingerprint(valid_key, _joined_value_lines(value_lines, cleanup))
+
+	for line_start, line_end in _line_spans_gen(data, len(_BOM) if data[:len(_BOM)] == _BOM else 0):
+		line = data[line_start:line_end].decode('utf-8')
+		line_stripped = line.strip()
+		if not line_stripped:
+			if key is not None:
+				add_entry()
+				key = None
+			continue
+
+		if key is None:
+			key = line_stripped
+			value_lines = list()
+			value_start = value_end = line_end
+			continue
+		if not value_lines:
+			value_start = line_start
+		value_lines.append(line)
+		value_end = line_end
+
+	if key is not None:
+		add_entry()
+	_raise_from_errors_dict(errors_dict)
+
+	return index, sum(item_fingerprints.values()) & _FINGERPRINT_MASK
+
+
+class _LazyTextFileDict(_LazyLayer):
+	"""
+	A read-only mapping over an indexed library file: only the index is in memory, the values are read on access.
+	"""
+	__slots__ = ('path', 'cleanup', '_signature', '_index', '_fingerprint')
+
+	def __init__(self, path: str, cleanup: bool, signature: _t.Tuple[int, int], index: _Index, fingerprint: int):
+		self.path = path
+		self.cleanup = cleanup
+		self._signature = signature
+		self._index = index
+		self._fingerprint = fingerprint
+
+	@property
+	def fingerprint(self) -> _t.Optional[int]:
+		return self._fingerprint
+
+	def same_items(self, other: _LazyLayer) -> bool:
+		"""The same file (not changed since), parsed the same way - e.g., loaded again by another node."""
+		return self is other or (
+			type(other) is type(self)
+			and (other.path, other.cleanup, other._signature, other._fingerprint)
+			== (self.path, self.cleanup, self._signature, self._fingerprint)
+		)
+
+	def __len__(self) -> int:
+		return len(self._index)
+
+	def __iter__(self) -> _t.Iterator[str]:
+		return iter(self._index)
+
+	def __contains__(self, key) -> bool:
+		try:
+			return key in self._index
+		except TypeError:  # Unhashable key
+			return False
+
+	def _load(self, start: int, end: int) -> str:
+		stat = _os.stat(self.path)
+		if (stat.st_size, stat.st_mtime_ns) != self._signature:
+			raise RuntimeError(
+				f"The library file has changed since it was indexed: {self.path!r}\n"
+				f"Re-run the node which loads it."
+			)
+		with open(self.path, 'rb') as file:
+			file.seek(start)
+			data = file.read(end - start)
+		return _joined_value_lines(data.decode('utf-8').splitlines(), self.cleanup)
+
+	def __getitem__(self, key: str) -> str:
+		cache_key = (self, key)
+		with _values_cache_lock:
+			value = _values_cache.get(cache_key)
+			if value is not None:
+				_values_cache.move_to_end(cache_key)
+		_count_cache('library_values', value is not None)
+		if value is not None:
+			return value
+
+		start, end = self._index[key]
+		value = self._load(start, end) if end > start else ''
+		with _values_cache_lock:
+			_values_cache[cache_key] = value
+			_values_cache.move_to_end(cache_key)
+			while len(_values_cache) > _VALUES_CACHE_SIZE:
+				_values_cache.popitem(last=False)
+		return value
+
+	def get(self, key: str, default=None):
+		if key not in self:
+			return default
+		return self[key]
+
+	def __repr__(self) -> str:
+		return f'{type(self).__name__}({self.path!r}, {len(self)} entries)'
+
+
+def indexed_text_file_dict(path: str, cleanup: bool = True) -> _FormatDict:
+	"""
+	A format-dict with the values from a text file (in the ``Dict from Text`` format) loaded only on access.
+	The file is scanned once to build the index (memory-mapped, so it's never read into memory as a whole).
+	"""
+	stat = _os.stat(path)
+	signature = (stat.st_size, stat.st_mtime_ns)
+	if not stat.st_size:
+		return _FormatDict.from_mapping(None)
+
+	with open(path, 'rb') as file, _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ) as mapped:
+		index, fingerprint = _built_index(mapped, bool(cleanup))
+	if not index:
+		return _FormatDict.from_mapping(None)
+
+	lazy_dict = _LazyTextFileDict(path, bool(cleanup), signature, index, fingerprint)
+	return _FormatDict.from_mapping(None).updated_lazy(lazy_dict, keys_validated=True)
+
+
+def _clear_values_cache():
+	with _values_cache_lock:
+		_values_cache.clear()
@@ -0,0 +1,166 @@
+# encoding: utf-8
+"""
+Static analysis of templates: which dict keys a template actually references.
+
+In recursive mode, the analysis is transitive: the strings from the dict referenced by the template are analyzed, too,
+and the ones they reference, etc. Only the non-string values reached this way are actually formatted (to see if they
+bring any new curly brackets) - the template itself is never formatted, and lazy values are never computed.
+
+The analysis is exact for a single formatting pass. For recursive formatting, it's only exact if no new
+``{pieces}`` could appear from the brackets combined over multiple passes - e.g., escaped brackets, literal brackets
+next to a formatted value, or a value formatted into a text with brackets. If any of those is found,
+the result is marked as not ``complete``: then, any other key in the dict might be referenced, too.
+"""
+
+import typing as _t
+
+from dataclasses import dataclass as _dataclass
+import _string
+
+from .format_dict import FormatDict as _FormatDict, LazyValue as _LazyValue
+from .funcs_common import _verify_input_dict
+from .funcs_template import _compiled_template, _field_formatter
+
+
+# What a single formatting pass of a text references: the key, a function formatting the value the way the piece does
+# (if it's known), and whether the value is used at all (an escaped piece only needs the key to be in the dict) ...
+_Piece = _t.Tuple[str, _t.Optional[_t.Callable[[_t.Mapping[str, _t.Any]], str]], bool]
+# ... + whether brackets in the text itself could produce new pieces in the next pass:
+_TextReferences = _t.Tuple[_t.List[_Piece], bool]
+
+
+@_dataclass(frozen=True)
+class KeyUsage:
+	"""The keys a template references."""
+	keys: _t.FrozenSet[str]  # Referenced keys which are in the dict
+	missing: _t.FrozenSet[str]  # Referenced keys which aren't
+	complete: bool  # If not, some references can't be found statically - and any other key might be used, too
+
+
+def _has_brackets(text: str) -> bool:
+	return '{' in text or '}' in text
+
+
+def _safe_text_references(text: str) -> _TextReferences:
+	"""The references as safe-mode formatting sees them (see ``funcs_template``)."""
+	pieces: _t.List[_Piece] = list()
+	plain = True
+	for segment in _compiled_template(text, True).segments:
+		if segment.__class__ is str:
+			plain = plain and not _has_brackets(segment)
+			continue
+		if not segment.is_plain:
+			plain = False  # The brackets remain in the formatted text
+		if segment.formatter is not None:
+			# An escaped piece is still formatted - to check that it can be. But its value isn't used:
+			pieces.append((segment.key, segment.formatter, not segment.pre_escaped))
+	return pieces, plain
+
+
+def _unsafe_spec_keys_gen(format_spec: str) -> _t.Iterator[str]:
+	"""The keys referenced by the fields nested in a format spec: ``{value:{width}}``."""
+	for literal, field_name, _, _ in _string.formatter_parser(format_spec):
+		if field_name is not None:
+			key, _ = _string.formatter_field_name_split(field_name)
+			if isinstance(key, str) and key:
+				yield key
+
+
+def _unsafe_text_references(text: str) -> _TextReferences:
+	"""The references as python's own ``str.format_map()`` sees them."""
+	pieces: _t.List[_Piece] = list()
+	plain = True
+	try:
+		for literal, field_name, format_spec, conversion in _string.formatter_parser(text):
+			# Escaped brackets are already turned into single ones here:
+			plain = plain and not _has_brackets(literal)
+			if field_name is None:
+				continue
+			key, _ = _string.formatter_field_name_split(field_name)
+			if not (isinstance(key, str) and key):
+				continue  # A positional field: formatting fails anyway
+			if format_spec and _has_brackets(format_spec):
+				pieces.extend((spec_key, None, True) for spec_key in _unsafe_spec_keys_gen(format_spec))
+				pieces.append((key, None, True))
+				continue
+			conversion = f'!{conversion}' if conversion else ''
+			format_spec = f':{format_spec}' if format_spec else ''
+			pieces.append((key, _field_formatter(f'{{{field_name}{conversion}{format_spec}}}'), True))
+	except ValueError:
+		return pieces, False  # Formatting of such a text fails anyway
+	return pieces, plain
+
+
+def template_key_usage(
+	template: str, format_dict: _t.Optional[_t.Mapping[str, _t.Any]] = None, recursive: bool = False, safe: bool = True,
+) -> KeyUsage:
+	"""
+	Find the keys of the dict the template references (in the same formatting mode as ``String Formatter`` node).
+	In recursive mode - also, the keys referenced by the referenced strings, etc.
+	"""
+	if format_dict is None:
+		format_dict = dict()
+	text_references = _safe_text_references if safe else _unsafe_text_references
+
+	keys: _t.Set[str] = set()
+	missing: _t.Set[str] = set()
+	pieces, complete = text_references(str(template))
+	if not recursive:
+		complete = True  # Brackets left in the formatted text don't matter: there's no next pass
+
+	pending: _t.List[_t.List[_Piece]] = [pieces]
+	checked: _t.Set[_Piece] = set()
+	traversed_texts: _t.Set[str] = set()  # The keys of string values
+	while pending:
+		for piece in pending.pop():
+			if piece in checked:
+				continue
+			checked.add(piece)
+			key, formatter, value_used = piece
+			if key in missing:
+				continue
+			if key not in keys:
+				if key not in format_dict:
+					missing.add(key)
+					continue
+				keys.add(key)
+			if not (recursive and value_used):
+				continue
+
+			value = format_dict[key]
+			if type(value) is str:
+				if key in traversed_texts:
+					continue
+				traversed_texts.add(key)
+				value_pieces, value_plain = text_references(value)
+				complete = complete and value_plain
+				pending.append(value_pieces)
+				continue
+			if isinstance(value, _LazyValue) or formatter is None:
+				complete = False  # Unknown until it's formatted for real
+				continue
+			# A non-string value is formatted right away - the only thing that matters is whether it brings any brackets
+			# noinspection PyBroadException
+			try:
+				formatted = formatter(format_dict)
+			except Exception:
+				continue  # The piece stays intact
+			if _has_brackets(formatted):
+				complete = False
+
+	return KeyUsage(frozenset(keys), frozenset(missing), complete)
+
+
+def pruned_dict(
+	format_dict: _t.Mapping[str, _t.Any], keys: _t.Iterable[str], keys_validated: bool = False,
+) -> _t.Mapping[str, _t.Any]:
+	"""
+	A frozen dict with only the given keys (the ones not in the dict are ignored). Lazy values are kept lazy.
+	If it'd have all the same keys anyway, the original dict is returned as-is.
+	"""
+	used_items = {key: format_dict[key] for key in sorted(keys) if key in format_dict}
+	if len(used_items) == len(format_dict):
+		return format_dict
+	if not keys_validated:
+		_verify_input_dict(format_dict)
+	return _FormatDict.from_mapping(used_items, keys_validated=True)
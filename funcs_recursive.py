@@ -0,0 +1,224 @@
+# encoding: utf-8
+"""
+Recursive formatting, resolved as a dependency graph of dict keys - instead of re-formatting the whole string
+over and over until it stops changing.
+
+Each dict entry referenced (directly or indirectly) by the template is expanded only once and memoized.
+A cyclic reference is detected without going through all the iterations, with the whole chain of keys reported.
+
+The graph approach only applies to "plain" strings, for which it's guaranteed to give exactly the same result
+as the iterative (fixpoint) formatting:
+- literal text has no curly brackets at all;
+- each ``{piece}`` is wrapped into a single pair of brackets;
+- a piece either references a string from the dict by its name (an edge in the graph),
+  or it's something more complex (like ``{value:.3f}``), which formats right away into text without brackets.
+
+Anything else (escaped brackets, keys built dynamically from other keys, missing keys, etc.) can change
+in-between the iterations in non-trivial ways. For such strings, ``None`` is returned,
+and the caller needs to fall back to the iterative formatting.
+"""
+
+import typing as _t
+
+import re as _re
+
+from .funcs_template import _compiled_template, _CompiledTemplate
+
+
+_re_identifier_match = _re.compile("[a-zA-Z_][a-zA-Z_0-9]*$").match
+
+# Kinds of parts in an expansion plan:
+_LITERAL = 0  # Text which stays as-is
+_CONSTANT = 1  # Text produced by formatting a piece (during the first iteration)
+_REFERENCE = 2  # The name of a string entry in the dict, which itself needs to be expanded
+
+_Plan = _t.List[_t.Tuple[int, str]]
+_Cycle = _t.Optional[_t.Tuple[str, ...]]
+# The fully expanded text + the number of formatting iterations it takes + a chain of keys if it references a cycle:
+_Expansion = _t.Tuple[str, int, _Cycle]
+
+
+def _has_brackets(text: str) -> bool:
+	return '{' in text or '}' in text
+
+
+class _Frame:
+	"""A key being expanded - one level of the (iterative) depth-first traversal."""
+	__slots__ = ('key', 'plan', 'i', 'parts', 'depth', 'cycle')
+
+	def __init__(self, key: str, plan: _Plan):
+		self.key = key
+		self.plan = plan
+		self.i = 0
+		self.parts: _t.List[str] = list()
+		self.depth = 0
+		self.cycle: _Cycle = None
+
+	def add_expansion(self, expansion: _Expansion):
+		text, depth, cycle = expansion
+		self.parts.append(text)
+		self.depth = max(self.depth, depth + 1)
+		if self.cycle is None:
+			self.cycle = cycle
+		self.i += 1
+
+
+class _RecursiveExpander:
+	"""
+	Memoized expansion of templates against a single format-dict.
+
+	The same instance can expand any number of templates: each dict entry is still resolved only once.
+	"""
+	__slots__ = ('format_dict', '_expanded')
+
+	def __init__(self, format_dict: _t.Mapping[str, _t.Any]):
+		self.format_dict = format_dict
+		self._expanded: _t.Dict[str, _t.Optional[_Expansion]] = dict()
+
+	def _plan(self, text: str, compiled: _t.Optional[_CompiledTemplate] = None) -> _t.Optional[_Plan]:
+		"""
+		Split the string into parts. ``None`` if it isn't a "plain" one (see the module docstring).
+		The string could also be passed already compiled (in safe mode).
+		"""
+		format_dict = self.format_dict
+		plan: _Plan = list()
+		if compiled is None:
+			compiled = _compiled_template(text, True)
+		for segment in compiled.segments:
+			if segment.__class__ is str:
+				if _has_brackets(segment):
+					return None
+				plan.append((_LITERAL, segment))
+				continue
+
+			if segment.prefix or segment.suffix:
+				return None
+
+			piece_template = segment.piece_template
+			key = piece_template[1:-1]
+			if _re_identifier_match(key) and key in format_dict:
+				value = format_dict[key]
+				if type(value) is str:
+					if value == piece_template:
+						# A string referencing only itself: formatting leaves it intact, no matter how many times
+						plan.append((_LITERAL, value))
+					else:
+						plan.append((_REFERENCE, key))
+					continue
+
+			formatted_piece = segment.formatted(format_dict)
+			if formatted_piece is None or _has_brackets(formatted_piece):
+				return None
+			plan.append((_CONSTANT, formatted_piece))
+
+		return plan
+
+	def _fail(self, frames: _t.List[_Frame]) -> None:
+		"""Mark all the keys in the current chain as non-expandable (they all depend on the last one)."""
+		for frame in frames:
+			self._expanded[frame.key] = None
+		return None
+
+	def _expansion(self, root_key: str) -> _t.Optional[_Expansion]:
+		"""
+		Expand a single dict entry, with all its dependencies.
+		It's not actually recursive - the traversal is done with an explicit stack of frames,
+		so that it works with chains of any depth.
+		"""
+		expanded = self._expanded
+		if root_key in expanded:
+			return expanded[root_key]
+
+		format_dict = self.format_dict
+
+		plan = self._plan(format_dict[root_key])
+		if plan is None:
+			expanded[root_key] = None
+			return None
+		frames: _t.List[_Frame] = [_Frame(root_key, plan)]
+		chain_indices: _t.Dict[str, int] = {root_key: 0}
+
+		while frames:
+			frame = frames[-1]
+			if frame.i >= len(frame.plan):
+				# The frame is done:
+				frames.pop()
+				del chain_indices[frame.key]
+				expansion = (''.join(frame.parts), frame.depth, frame.cycle)
+				expanded[frame.key] = expansion
+				if frames:
+					frames[-1].add_expansion(expansion)
+				continue
+
+			kind, payload = frame.plan[frame.i]
+			if kind != _REFERENCE:
+				frame.parts.append(payload)
+				if kind == _CONSTANT:
+					frame.depth = max(frame.depth, 1)
+				frame.i += 1
+				continue
+
+			if payload in expanded:
+				expansion = expanded[payload]
+				if expansion is None:
+					return self._fail(frames)
+				frame.add_expansion(expansion)
+				continue
+
+			if payload in chain_indices:
+				# A cycle. Don't report it right away: if any string it's mixed with isn't a "plain" one,
+				# it's still up to the iterative formatting to decide what happens. So, keep traversing.
+				if frame.cycle is None:
+					cycle = [f.key for f in frames[chain_indices[payload]:]]
+					cycle.append(payload)
+					frame.cycle = tuple(cycle)
+				frame.i += 1
+				continue
+
+			plan = self._plan(format_dict[payload])
+			if plan is None:
+				expanded[payload] = None
+				return self._fail(frames)
+			chain_indices[payload] = len(frames)
+			frames.append(_Frame(payload, plan))
+
+		return expanded[root_key]
+
+	def expand(
+		self, template: str, iterations_limit: int, compiled: _t.Optional[_CompiledTemplate] = None,
+	) -> _t.Optional[str]:
+		"""
+		Fully expand the template. Raises ``RecursionError`` if it references a cycle.
+
+		Returns ``None`` if it needs to be done by the iterative formatting instead
+		(including the case when the iterative formatting would hit the ``iterations_limit``,
+		so that it throws the exact same error).
+		"""
+		plan = self._plan(template, compiled)
+		if plan is None:
+			return None
+
+		parts: _t.List[str] = list()
+		depth = 0
+		cycle: _Cycle = None
+		for kind, payload in plan:
+			if kind == _REFERENCE:
+				expansion = self._expansion(payload)
+				if expansion is None:
+					return None
+				payload, key_depth, key_cycle = expansion
+				depth = max(depth, key_depth + 1)
+				if cycle is None:
+					cycle = key_cycle
+			elif kind == _CONSTANT:
+				depth = max(depth, 1)
+			parts.append(payload)
+
+		if cycle is not None:
+			# Everything the template reaches is "plain", so the iterative formatting would never stop changing it.
+			raise RecursionError("Cyclic reference between dict entries: {}".format(' → '.join(cycle)))
+
+		# The iterative formatting needs one extra iteration to see that the string doesn't change anymore:
+		if depth + 1 >= iterations_limit:
+			return None
+		return ''.join(parts)
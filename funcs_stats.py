@@ -0,0 +1,277 @@
+# encoding: utf-8
+"""
+Opt-in instrumentation: call counts, latencies, input sizes and cache hit rates of the pack's hot paths.
+
+Turned off by default - then, each instrumented call costs just a single flag check. It's turned on by
+``STRING_CONSTRUCTOR_STATS=1`` environment variable (or ``set_stats_enabled()`` at runtime).
+
+While ComfyUI runs, the collected stats are available as JSON:
+- ``GET /string_constructor/stats`` - the stats collected since the last reset;
+- ``POST /string_constructor/stats/reset`` - reset them.
+"""
+
+import typing as _t
+
+from collections import deque as _deque
+from functools import wraps as _wraps
+from inspect import signature as _signature
+from logging import getLogger as _getLogger
+import os as _os
+from threading import Lock as _Lock
+import time as _time
+
+
+_SAMPLES_SIZE = 1024  # The latest latencies kept per timed function - to compute the percentiles from
+_PERCENTILES = (50, 90, 99)
+_ENV_VAR = 'STRING_CONSTRUCTOR_STATS'
+_ENV_VALUES_ON = frozenset(('1', 'on', 'yes', 'true', 'enable', 'enabled'))
+
+ROUTE = '/string_constructor/stats'
+ROUTE_RESET = f'{ROUTE}/reset'
+
+_logger = _getLogger(__name__)
+
+_F = _t.TypeVar('_F', bound=_t.Callable)
+
+
+class _SizeStats:
+	__slots__ = ('count', 'total', 'max')
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0
+		self.max = 0
+
+	def add(self, size: int):
+		self.count += 1
+		self.total += size
+		if size > self.max:
+			self.max = size
+
+	def as_dict(self) -> _t.Dict[str, _t.Any]:
+		return {'mean': self.total / self.count if self.count else 0.0, 'max': self.max}
+
+
+class _Timing:
+	__slots__ = ('count', 'errors', 'total', 'max', 'samples', 'sizes')
+
+	def __init__(self):
+		self.count = 0
+		self.errors = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.samples: _t.Deque[float] = _deque(maxlen=_SAMPLES_SIZE)
+		self.sizes: _t.Dict[str, _SizeStats] = dict()
+
+	def add(self, duration: float, failed: bool, sizes: _t.Optional[_t.Dict[str, int]]):
+		self.count += 1
+		if failed:
+			self.errors += 1
+		self.total += duration
+		if duration > self.max:
+			self.max = duration
+		self.samples.append(duration)
+		if sizes:
+			for size_name, size in sizes.items():
+				size_stats = self.sizes.get(size_name)
+				if size_stats is None:
+					size_stats = self.sizes[size_name] = _SizeStats()
+				size_stats.add(size)
+
+	def as_dict(self) -> _t.Dict[str, _t.Any]:
+		out_dict = {
+			'count': self.count,
+			'errors': self.errors,
+			'total_ms': self.total * 1e3,
+			'mean_ms': self.total * 1e3 / self.count if self.count else 0.0,
+			'max_ms': self.max * 1e3,
+		}
+		samples = sorted(self.samples)
+		for percentile in _PERCENTILES:
+			# Nearest-rank percentile (over the latest samples only):
+			out_dict[f'p{percentile}_ms'] = (
+				samples[max(-(-len(samples) * percentile // 100) - 1, 0)] * 1e3 if samples else 0.0
+			)
+		if self.sizes:
+			out_dict['sizes'] = {k: v.as_dict() for k, v in sorted(self.sizes.items())}
+		return out_dict
+
+
+class _CacheCounter:
+	__slots__ = ('hits', 'misses')
+
+	def __init__(self):
+		self.hits = 0
+		self.misses = 0
+
+
+def _enabled_by_env() -> bool:
+	return _os.environ.get(_ENV_VAR, '').strip().lower() in _ENV_VALUES_ON
+
+
+_enabled = _enabled_by_env()
+_lock = _Lock()
+_since = _time.time()
+_timings: _t.Dict[str, _Timing] = dict()
+_cache_counters: _t.Dict[str, _CacheCounter] = dict()
+# `functools.lru_cache` functions keep their own counters - only their `cache_info()` is registered:
+_cache_infos: _t.Dict[str, _t.Callable[[], _t.Any]] = dict()
+
+
+def stats_enabled() -> bool:
+	return _enabled
+
+
+def set_stats_enabled(enabled: bool = True):
+	"""The global switch - the same as ``STRING_CONSTRUCTOR_STATS`` environment variable, but at runtime."""
+	global _enabled
+	_enabled = bool(enabled)
+
+
+def _size(value) -> _t.Optional[int]:
+	"""The length of a string/dict/list, or ``None`` for anything else (generators aren't consumed)."""
+	if isinstance(value, (str, bytes, _t.Mapping, list, tuple, set, frozenset)):
+		return len(value)
+	return None
+
+
+def _arg_sizes_func(func: _t.Callable, sized_args: _t.Sequence[str]) -> _t.Callable[..., _t.Dict[str, int]]:
+	"""
+	A function getting the sizes of the given arguments of ``func`` from the actual call arguments.
+	An argument could be a dotted path to an attribute (e.g., ``'self.format_dict'``).
+	"""
+	func_signature = _signature(func)
+	paths = [(arg.split('.')[-1], arg.split('.')) for arg in sized_args]
+
+	def arg_sizes(*args, **kwargs) -> _t.Dict[str, int]:
+		arguments = func_signature.bind_partial(*args, **kwargs).arguments
+		sizes: _t.Dict[str, int] = dict()
+		for arg, (arg_name, *attrs) in paths:
+			value = arguments.get(arg_name)
+			for attr in attrs:
+				value = getattr(value, attr, None)
+			size = _size(value)
+			if size is not None:
+				sizes[arg] = size
+		return sizes
+
+	return arg_sizes
+
+
+def _record(name: str, duration: float, failed: bool, sizes: _t.Optional[_t.Dict[str, int]]):
+	with _lock:
+		timing = _timings.get(name)
+		if timing is None:
+			timing = _timings[name] = _Timing()
+		timing.add(duration, failed, sizes)
+
+
+def timed(name: str, sized_args: _t.Sequence[str] = tuple()) -> _t.Callable[[_F], _F]:
+	"""
+	Decorator: record the number of calls and latencies of the function (when the stats are enabled).
+
+	:param name: The name of the stats entry.
+	:param sized_args: Names of the arguments (strings/dicts/lists) whose lengths are recorded, too.
+	"""
+	def decorator(func: _F) -> _F:
+		arg_sizes = _arg_sizes_func(func, sized_args) if sized_args else None
+		perf_counter = _time.perf_counter
+
+		@_wraps(func)
+		def wrapper(*args, **kwargs):
+			if not _enabled:
+				return func(*args, **kwargs)
+
+			sizes = None
+			if arg_sizes is not None:
+				try:
+					sizes = arg_sizes(*args, **kwargs)
+				except Exception:  # Stats must never break the actual call - e.g., with wrong arguments
+					pass
+			failed = True
+			start = perf_counter()
+			try:
+				result = func(*args, **kwargs)
+				failed = False
+				return result
+			finally:
+				_record(name, perf_counter() - start, failed, sizes)
+
+		return wrapper
+
+	return decorator
+
+
+def count_cache(name: str, hit: bool):
+	"""Record a hit/miss of the named cache (when the stats are enabled)."""
+	if not _enabled:
+		return
+	with _lock:
+		counter = _cache_counters.get(name)
+		if counter is None:
+			counter = _cache_counters[name] = _CacheCounter()
+		if hit:
+			counter.hits += 1
+		else:
+			counter.misses += 1
+
+
+def register_cache_info(name: str, cache_info: _t.Callable[[], _t.Any]):
+	"""Include the stats of a ``functools.lru_cache`` function: pass its ``cache_info`` method."""
+	_cache_infos[name] = cache_info
+
+
+def _cache_dict(hits: int, misses: int, **extra) -> _t.Dict[str, _t.Any]:
+	total = hits + misses
+	return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else None, **extra}
+
+
+def stats_snapshot() -> _t.Dict[str, _t.Any]:
+	"""All the collected stats, as a JSON-serializable dict."""
+	with _lock:
+		timings = {name: timing.as_dict() for name, timing in sorted(_timings.items())}
+		caches = {name: _cache_dict(c.hits, c.misses) for name, c in sorted(_cache_counters.items())}
+		since = _since
+	for name, cache_info in sorted(_cache_infos.items()):
+		info = cache_info()
+		# Their counters aren't reset with ours - so they're always since the start:
+		caches[name] = _cache_dict(info.hits, info.misses, maxsize=info.maxsize, size=info.currsize, since_start=True)
+	return {
+		'enabled': _enabled,
+		'since': since,
+		'duration_s': _time.time() - since,
+		'timings': timings,
+		'caches': caches,
+	}
+
+
+def reset_stats():
+	global _since
+	with _lock:
+		_timings.clear()
+		_cache_counters.clear()
+		_since = _time.time()
+
+
+def register_routes():
+	"""Add the stats routes to ComfyUI's server. Does nothing if the server isn't running (e.g., in a script)."""
+	try:
+		from aiohttp import web
+		from server import PromptServer
+	except ImportError:
+		return
+	prompt_server = getattr(PromptServer, 'instance', None)
+	routes = getattr(prompt_server, 'routes', None)
+	if routes is None:
+		return
+
+	@routes.get(ROUTE)
+	async def get_stats(request):
+		return web.json_response(stats_snapshot())
+
+	@routes.post(ROUTE_RESET)
+	async def post_reset_stats(request):
+		reset_stats()
+		return web.json_response(stats_snapshot())
+
+	_logger.debug(f"String Constructor stats routes registered: {ROUTE}, {ROUTE_RESET}")
@@ -0,0 +1,123 @@
+# encoding: utf-8
+"""
+Status texts shown at the bottom of the nodes - sent to the frontend asynchronously.
+
+Nodes don't send their status right away. Instead, it's queued, and a background thread sends all the queued
+statuses in batches, at most once per ``_FLUSH_INTERVAL``:
+- only the latest status for each node is sent - the ones superseded in-between are dropped;
+- each status is capped in size;
+- the execution thread never waits for the message to be serialized and sent.
+
+Status messages can be turned off entirely (e.g., for a headless server, where nobody sees them anyway)
+by setting ``STRING_CONSTRUCTOR_STATUS=0`` environment variable.
+"""
+
+import typing as _t
+
+from logging import getLogger as _getLogger
+import os as _os
+from threading import Condition as _Condition, Thread as _Thread
+import time as _time
+
+from .funcs_stats import timed as _timed
+
+
+_FLUSH_INTERVAL = 0.1  # Seconds. Statuses queued within this time are sent together (and the superseded ones - not at all)
+_MAX_STATUS_BYTES = 1 << 18  # A longer status is truncated
+_ENV_VAR = 'STRING_CONSTRUCTOR_STATUS'
+_ENV_VALUES_OFF = frozenset(('0', 'off', 'no', 'false', 'disable', 'disabled'))
+
+_logger = _getLogger(__name__)
+
+
+def _capped(text: str, max_bytes: int = _MAX_STATUS_BYTES) -> str:
+	if not max_bytes or len(text) * 4 <= max_bytes:  # Even if all the characters are 4-byte ones, it fits
+		return text
+	encoded = text.encode('utf-8')
+	if len(encoded) <= max_bytes:
+		return text
+	return encoded[:max_bytes].decode('utf-8', 'ignore') + f"\n… [truncated: {len(encoded)} bytes in total]"
+
+
+@_timed('status.send', sized_args=('text', ))
+def _send_progress_text(text: str, unique_id: str):
+	# Snatched from: https://github.com/comfyanonymous/ComfyUI/blob/27870ec3c30e56be9707d89a120eb7f0e2836be1/comfy_extras/nodes_images.py#L581-L582
+	from server import PromptServer as _PromptServer
+
+	_PromptServer.instance.send_progress_text(text, unique_id)
+
+
+class _StatusDispatcher:
+	"""Collects the latest status per node and sends them all from a background thread."""
+
+	def __init__(
+		self,
+		send: _t.Callable[[str, str], None] = _send_progress_text,
+		interval: float = _FLUSH_INTERVAL,
+		max_bytes: int = _MAX_STATUS_BYTES,
+		enabled: bool = True,
+	):
+		self.send = send
+		self.interval = max(float(interval), 0.0)
+		self.max_bytes = max(int(max_bytes), 0)
+		self.enabled = bool(enabled)
+		self._pending: _t.Dict[str, str] = dict()
+		self._condition = _Condition()
+		self._thread: _t.Optional[_Thread] = None
+
+	def show(self, text: str, unique_id: str):
+		"""Queue the status for the node. Any status queued earlier for the same node (and not sent yet) is dropped."""
+		if not self.enabled:
+			return
+		text = _capped(text, self.max_bytes)
+		with self._condition:
+			self._pending.pop(unique_id, None)  # Re-inserted at the end: to keep the order of the latest updates
+			self._pending[unique_id] = text
+			if self._thread is None:
+				self._thread = _Thread(target=self._run, name='StringConstructorStatus', daemon=True)
+				self._thread.start()
+			self._condition.notify()
+
+	def _take_pending(self) -> _t.Dict[str, str]:
+		with self._condition:
+			pending = self._pending
+			self._pending = dict()
+		return pending
+
+	def flush(self):
+		"""Send all the queued statuses right now, in the current thread."""
+		for unique_id, text in self._take_pending().items():
+			try:
+				self.send(text, unique_id)
+			except Exception:
+				_logger.exception(f"Failed to send the status of node {unique_id!r}")
+
+	def _run(self):
+		while True:
+			with self._condition:
+				while not self._pending:
+					self._condition.wait()
+			_time.sleep(self.interval)  # Let more updates queue up (and supersede each other)
+			self.flush()
+
+
+def _enabled_by_env() -> bool:
+	return _os.environ.get(_ENV_VAR, '').strip().lower() not in _ENV_VALUES_OFF
+
+
+_dispatcher = _StatusDispatcher(enabled=_enabled_by_env())
+
+
+def status_enabled() -> bool:
+	"""Whether status messages are sent at all. If not, there's no point in even building the status text."""
+	return _dispatcher.enabled
+
+
+def set_status_enabled(enabled: bool = True):
+	"""The global switch - the same as ``STRING_CONSTRUCTOR_STATUS`` environment variable, but at runtime."""
+	_dispatcher.enabled = bool(enabled)
+
+
+@_timed('status.queue')
+def show_status(text: str, unique_id: str):
+	_dispatcher.show(text, unique_id)
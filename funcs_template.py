@@ -0,0 +1,360 @@
+# encoding: utf-8
+"""
+Template compilation: parsing a formatting template once into a sequence of literal/field segments.
+
+The compiled templates are cached, so re-formatting the same template (with the same or a different dict)
+only does field lookups and a single join - without re-scanning the whole template text again.
+A ``Template`` holds its compiled form by itself - to be passed between nodes.
+"""
+
+import typing as _t
+
+from dataclasses import dataclass as _dataclass, field as _field
+from functools import lru_cache as _lru_cache
+import re as _re
+import sys as _sys
+import _string
+
+from .funcs_stats import register_cache_info as _register_cache_info
+
+
+_TEMPLATE_CACHE_SIZE = 1024  # How many compiled templates to keep (per safe/unsafe mode)
+_FIELD_FORMATTERS_CACHE_SIZE = 4096  # How many parsed ``{pieces}`` to keep (for all the templates combined)
+
+__dataclass_slots_args = dict() if _sys.version_info < (3, 10) else dict(slots=True)
+
+# Pre-compiled regex matches for the individual parts of a ``{keyword}`` pattern.
+# They're only ever matched at a given offset, so the template itself is never sliced/copied during the scan:
+_re_open_brackets_match = _re.compile(r'\{+').match
+_re_inside_brackets_match = _re.compile(r'[^{}]+').match
+_re_closed_brackets_match = _re.compile(r'\}+').match
+_CONVERSIONS: _t.Dict[str, _t.Callable[[_t.Any], str]] = {'r': repr, 's': str, 'a': ascii}
+
+_FieldFormatter = _t.Callable[[_t.Mapping[str, _t.Any]], str]
+
+# The dict key a formatting piece looks up - everything before an attribute/index access, conversion or format spec:
+_re_field_key_match = _re.compile(r'[^.\[!:]*').match
+
+
+def _safe_tokens_gen(template: str) -> _t.Generator[_t.Union[str, _t.Tuple[str, str, str]], None, None]:
+	"""
+	Split the template into pieces as the safe mode sees them:
+	- literal text is yielded as a string;
+	- each ``{formatting piece}`` is yielded as a tuple of ``(open_brackets, inside_brackets, closed_brackets)``.
+
+	A single pass over the template, which only moves offsets forward - so it's linear in the template length.
+
+	A piece is a run of opening brackets, followed by some text without any brackets, followed by a run of closing
+	brackets. The piece is only recognized if it's NOT immediately followed by another opening bracket
+	(i.e., in ``{a}{b}``, only the ``{b}`` part is a piece). This matches the regex-based parsing
+	of the earlier versions of the node - to keep the output of the existing templates the same.
+	"""
+	n = len(template)
+	find = template.find
+	literal_start = 0
+	pos = 0
+	while True:
+		open_start = find('{', pos)
+		if open_start < 0:
+			break
+
+		inside_start = _re_open_brackets_match(template, open_start).end()
+		inside_match = _re_inside_brackets_match(template, inside_start)
+		if not inside_match:
+			# Either the end of the template or a closing bracket right after the opening ones:
+			pos = inside_start
+			continue
+
+		closed_start = inside_match.end()
+		if closed_start >= n or template[closed_start] != '}':
+			# Another opening bracket (or the end of the template) instead of a closing one:
+			pos = closed_start
+			continue
+
+		closed_end = _re_closed_brackets_match(template, closed_start).end()
+		if closed_end < n and template[closed_end] == '{':
+			# The piece is immediately followed by another one - then, it's not treated as a piece itself:
+			pos = closed_end
+			continue
+
+		if open_start > literal_start:
+			yield template[literal_start:open_start]
+		yield template[open_start:inside_start], template[inside_start:closed_start], template[closed_start:closed_end]
+		literal_start = pos = closed_end
+
+	if literal_start < n:
+		yield template[literal_start:]
+
+
+@_lru_cache(maxsize=_FIELD_FORMATTERS_CACHE_SIZE)
+def _field_formatter(piece_template: str) -> _t.Optional[_FieldFormatter]:
+	"""
+	A function formatting a single ``{piece}`` exactly the way ``piece_template.format_map(format_dict)`` does,
+	but with the piece parsed only once: into the key, a chain of attribute/index accessors, a conversion and
+	a format spec. Cached - so a piece repeated anywhere (in other templates, too) is never parsed again.
+
+	``None`` if the piece can't be formatted with any dict at all: a syntax error, a positional field, etc.
+	"""
+	try:
+		parsed = list(_string.formatter_parser(piece_template))
+		if len(parsed) != 1:
+			return None
+		literal, field_name, format_spec, conversion = parsed[0]
+		if literal or field_name is None:
+			return None
+		key, chain = _string.formatter_field_name_split(field_name)
+		chain: _t.Tuple[_t.Tuple[bool, _t.Union[str, int]], ...] = tuple(chain)
+	except ValueError:
+		return None
+
+	if not isinstance(key, str) or not key:
+		return None  # A positional field: ``{0}``, ``{[0]}``, etc.
+	if conversion is not None and conversion not in _CONVERSIONS:
+		return None
+	convert = _CONVERSIONS[conversion] if conversion is not None else None
+
+	if not (chain or convert or format_spec):
+		def format_field(format_dict: _t.Mapping[str, _t.Any]) -> str:
+			value = format_dict[key]
+			return value if value.__class__ is str else format(value)
+
+		return format_field
+
+	def format_field(format_dict: _t.Mapping[str, _t.Any]) -> str:
+		value = format_dict[key]
+		for is_attr, name in chain:
+			value = getattr(value, name) if is_attr else value[name]
+		if convert is not None:
+			value = convert(value)
+		return format(value, format_spec)
+
+	return format_field
+
+
+@_dataclass(frozen=True, **__dataclass_slots_args)
+class _FieldSegment:
+	"""
+	A single ``{formatting piece}`` of a safe-mode template, with everything needed for rendering pre-computed.
+	"""
+	piece_template: str  # The piece with exactly one set of brackets - the one actually passed to ``format_map()``
+	intact: str  # Returned if the piece can't be formatted
+	prefix: str  # Brackets remaining before the formatted value (formatting "eats" one set of them)
+	suffix: str  # ... and after it
+	pre_escaped: str  # Not empty if the piece is escaped: then, it's returned instead of the formatted value
+	key: str  # The dict key looked up by the piece
+	# Formats the piece, with no parsing (``None`` if it can't be formatted at all):
+	formatter: _t.Optional[_FieldFormatter] = _field(default=None, compare=False, repr=False)
+
+	@classmethod
+	def from_brackets(cls, open_brackets: str, inside_brackets: str, closed_brackets: str) -> '_FieldSegment':
+		prefix = open_brackets[:-1]
+		suffix = closed_brackets[:-1]
+		piece_template = f'{{{inside_brackets}}}'
+		return cls(
+			piece_template=piece_template,
+			intact=f'{open_brackets}{inside_brackets}{closed_brackets}',
+			prefix=prefix,
+			suffix=suffix,
+			pre_escaped=inside_brackets if (prefix and suffix) else '',
+			key=_re_field_key_match(inside_brackets).group(),
+			formatter=_field_formatter(piece_template),
+		)
+
+	def formatted(self, format_dict: _t.Mapping[str, _t.Any]) -> _t.Optional[str]:
+		"""The piece formatted with the dict (just the formatted value, no brackets), or ``None`` if it can't be."""
+		formatter = self.formatter
+		if formatter is None:
+			return None
+		# noinspection PyBroadException
+		try:
+			return formatter(format_dict)
+		except Exception:
+			return None
+
+	@property
+	def is_plain(self) -> bool:
+		"""The piece is wrapped into a single pair of brackets - so, python's own formatting sees it the same way."""
+		return not (self.prefix or self.suffix)
+
+
+@_dataclass(frozen=True, **__dataclass_slots_args)
+class _CompiledTemplate:
+	"""
+	A template parsed into segments: literal strings and ``_FieldSegment`` instances.
+
+	In unsafe mode, there's nothing to pre-parse: python's own ``str.format_map()`` already does it in a single pass
+	(and in C). So an unsafe compiled template has no segments and simply delegates to it.
+
+	A safe template is ``one_shot`` if python sees exactly the same pieces in it: its literal text has no curly brackets
+	at all, and each piece is wrapped into a single pair of them. Then, if the whole template formats natively
+	(in a single ``str.format_map()`` call) without errors, the result is the same as formatting it piece by piece.
+	So it's tried first - and only if it fails, the template is formatted piece by piece.
+
+	The pieces which failed the last time are remembered - to go straight to the piece-by-piece formatting
+	while they still can't be formatted (e.g., their keys are still missing from the dict).
+	"""
+	template: str
+	safe: bool
+	segments: _t.Tuple[_t.Union[str, _FieldSegment], ...] = tuple()
+	one_shot: bool = False
+	# A single-item list: a mutable slot in the frozen instance. Holds the failures of the last piece-by-piece run:
+	# the keys missing from the dict + whether any of the pieces failed for any other reason.
+	_last_failures: _t.List[_t.Tuple[_t.Tuple[str, ...], bool]] = _field(
+		default_factory=lambda: [(tuple(), False)], compare=False, repr=False,
+	)
+
+	def _worth_one_shot(self, format_dict: _t.Mapping[str, _t.Any]) -> bool:
+		missing_keys, other_errors = self._last_failures[0]
+		if other_errors:
+			return False
+		# noinspection PyBroadException
+		try:
+			return all(key in format_dict for key in missing_keys)
+		except Exception:
+			return False
+
+	def render(self, format_dict: _t.Mapping[str, _t.Any]) -> str:
+		if not self.safe:
+			return self.template.format_map(format_dict)
+
+		if self.one_shot and self._worth_one_shot(format_dict):
+			# noinspection PyBroadException
+			try:
+				return self.template.format_map(format_dict)
+			except Exception:
+				pass
+		return self._render_pieces(format_dict)
+
+	def _render_pieces(self, format_dict: _t.Mapping[str, _t.Any]) -> str:
+		"""
+		Format the template piece by piece. Each piece is formatted by its pre-parsed formatter,
+		and the same piece repeated in the template is formatted only once.
+		"""
+		parts: _t.List[str] = list()
+		append = parts.append
+		formatted_pieces: _t.Dict[str, _t.Optional[str]] = dict()
+		missing_keys: _t.List[str] = list()
+		other_errors = False
+		for segment in self.segments:
+			if segment.__class__ is str:
+				append(segment)
+				continue
+
+			piece_template = segment.piece_template
+			if piece_template in formatted_pieces:
+				formatted_piece = formatted_pieces[piece_template]
+			else:
+				formatted_piece = formatted_pieces[piece_template] = segment.formatted(format_dict)
+			if formatted_piece is None:
+				# If, for ANY reason, we're unable to format the piece, return the template piece intact:
+				append(segment.intact)
+				if self.one_shot:
+					# noinspection PyBroadException
+					try:
+						key_missing = segment.key not in format_dict
+					except Exception:
+						key_missing = False
+					if key_missing:
+						missing_keys.append(segment.key)
+					else:
+						other_errors = True
+				continue
+
+			# The key is found. Treat the piece as the actual formatting pattern.
+			# Even though we've succeeded, the template might've been pre-escaped - then, it's returned intact:
+			append(segment.prefix)
+			append(segment.pre_escaped or formatted_piece)
+			append(segment.suffix)
+
+		if self.one_shot:
+			self._last_failures[0] = (tuple(missing_keys), other_errors)
+		return ''.join(parts)
+
+
+@_lru_cache(maxsize=_FIELD_FORMATTERS_CACHE_SIZE)
+def _field_segment(open_brackets: str, inside_brackets: str, closed_brackets: str) -> _FieldSegment:
+	"""Segments are immutable - so the same piece is re-used as-is in any template (and recursive iteration)."""
+	return _FieldSegment.from_brackets(open_brackets, inside_brackets, closed_brackets)
+
+
+def _compile_template(template: str, safe: bool = True) -> _CompiledTemplate:
+	"""Parse the template into segments. Not cached - use ``_compiled_template()`` for anything re-used."""
+	template = str(template)
+	if not safe:
+		return _CompiledTemplate(template, False)
+
+	segments: _t.List[_t.Union[str, _FieldSegment]] = list()
+	pending_literals: _t.List[str] = list()
+	for token in _safe_tokens_gen(template):
+		if isinstance(token, str):
+			pending_literals.append(token)
+			continue
+		if pending_literals:
+			segments.append(''.join(pending_literals))
+			pending_literals = list()
+		segments.append(_field_segment(*token))
+	if pending_literals:
+		segments.append(''.join(pending_literals))
+
+	one_shot = all(
+		segment.is_plain if isinstance(segment, _FieldSegment) else not ('{' in segment or '}' in segment)
+		for segment in segments
+	)
+	return _CompiledTemplate(template, True, tuple(segments), one_shot)
+
+
+@_lru_cache(maxsize=_TEMPLATE_CACHE_SIZE)
+def _compiled_template(template: str, safe: bool = True) -> _CompiledTemplate:
+	"""
+	Cached version of ``_compile_template()``: the same template (in the same mode) is parsed only once,
+	as long as it's among the most recently used ones.
+	"""
+	return _compile_template(template, bool(safe))
+
+
+@_dataclass(frozen=True, **__dataclass_slots_args)
+class Template:
+	"""
+	A template compiled once - the value passed through ``TEMPLATE`` sockets (see ``Compile Template`` node).
+
+	Unlike ``_compiled_template()``, it doesn't depend on the cache: any number of formatters (with any dicts) use
+	the same pre-parsed segments, no matter how many other templates were formatted in between.
+	Two templates with the same text are equal - only the text matters for the caches of the nodes' results.
+	"""
+	text: str
+	safe_compiled: _CompiledTemplate = _field(compare=False, repr=False)
+	unsafe_compiled: _CompiledTemplate = _field(compare=False, repr=False)
+	# The keys a single formatting pass looks up (in safe mode; unsafe one throws on anything else):
+	keys: _t.FrozenSet[str] = _field(compare=False, default=frozenset())
+	# Any escaped (or just unpaired) curly brackets - i.e., the text of the template itself isn't "plain":
+	has_escapes: bool = _field(compare=False, default=False)
+
+	@classmethod
+	def from_text(cls, text: str) -> 'Template':
+		text = str(text)
+		safe_compiled = _compile_template(text, True)
+		segments = safe_compiled.segments
+		return cls(
+			text=text,
+			safe_compiled=safe_compiled,
+			unsafe_compiled=_compile_template(text, False),
+			keys=frozenset(
+				segment.key for segment in segments
+				if segment.__class__ is not str and segment.formatter is not None
+			),
+			has_escapes=not safe_compiled.one_shot,
+		)
+
+	def compiled(self, safe: bool = True) -> _CompiledTemplate:
+		return self.safe_compiled if safe else self.unsafe_compiled
+
+	def __str__(self) -> str:
+		return self.text
+
+	def __len__(self) -> int:
+		return len(self.text)
+
+
+_register_cache_info('compiled_templates', _compiled_template.cache_info)
+_register_cache_info('field_segments', _field_segment.cache_info)
+_register_cache_info('field_formatters', _field_formatter.cache_info)
@@ -4,44 +4,57 @@
 
 import typing as _t
 
-from inspect import cleandoc as _cleandoc
+from functools import lru_cache as _lru_cache
 
-from frozendict import deepfreeze as _deepfreeze
-
-from comfy.comfy_types.node_typing import IO as _IO
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
 
 from . import _meta
-from .docstring_formatter import format_docstring as _format_docstring
+from .docstring_formatter import LazyDescription as _LazyDescription
 from .enums import DataTypes as _DataTypes
-from .funcs_common import _new_dict_with_updated_key
+from .format_dict import LazyValue as _LazyValue
+from .funcs_common import _new_dict_with_updated_key, _ResultsCache
+from .funcs_stats import timed as _timed
 from .node_dict_add_string import _input_types as _input_types_str
 
 
 _dict = dict
 
-# A tiny optimization by reusing the same immutable dict:
-_input_types = _deepfreeze({
-	'required': {
-		'name': (_IO.STRING, {'tooltip': (
-			"Name (key) of the non-string item inserted into the dict. "
-			"It must comprise only of latin letters, digits and underscores + it can't start with a digit."
-		)}),
-	},
-	'optional': {
-		'dict': _input_types_str['optional']['dict'],
-		'value': (_IO.ANY, {"forceInput": True, 'tooltip': "The actual non-string item to add into the dict."}),
-	},
-	# 'hidden': {
-	# 	'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
-	# },
-})
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'name': (_IO.STRING, {'tooltip': (
+				"Name (key) of the non-string item inserted into the dict. "
+				"It must comprise only of latin letters, digits and underscores + it can't start with a digit."
+			)}),
+		},
+		'optional': {
+			'dict': _input_types_str()['optional']['dict'],
+			'value': (_IO.ANY, {"forceInput": True, 'tooltip': "The actual non-string item to add into the dict."}),
+			'lazy': (_IO.BOOLEAN, {'default': False, 'label_on': 'call when used', 'label_off': 'no', 'tooltip': (
+				"If the value is a function (or any other callable object), store it as a lazy value: "
+				"it's called (with no arguments) only when a formatted template actually uses it - "
+				"and only once per formatting run. Its result is the actual value.\n"
+				"Useful for expensive values which most of the templates don't need."
+			)}),
+		},
+		# 'hidden': {
+		# 	'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		# },
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorDictAddAny')
 
 
 class StringConstructorDictAddAny:
 	"""Add/update a non-string item to the Format-Dict - to do some advanced formatting."""
 	NODE_NAME = 'StringConstructorDictAddAny'
 	CATEGORY = _meta.category_dict
-	DESCRIPTION = _format_docstring(_cleandoc(__doc__))
+	DESCRIPTION = _LazyDescription()
 
 	FUNCTION = 'main'
 	RETURN_TYPES = (str(_DataTypes.DICT), )
@@ -50,11 +63,12 @@ class StringConstructorDictAddAny:
 
 	@classmethod
 	def INPUT_TYPES(cls):
-		return _input_types
+		return _input_types()
 
 	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('dict', ))
 	def main(
-		name: str, dict: _t.Dict[str, _t.Any] = None, value: _t.Any = None,
+		name: str, dict: _t.Dict[str, _t.Any] = None, value: _t.Any = None, lazy: bool = False,
 		# unique_id: str = None,
 	) -> _t.Tuple[_t.Dict[str, _t.Any]]:
 		"""Update/append an item of any type to the dict."""
@@ -62,4 +76,9 @@ def main(
 			if dict is None:
 				dict = _dict()
 			return (dict, )  # No need to create another dict instance if we add nothing
-		return (_new_dict_with_updated_key(dict, name, value), )
+		lazy = bool(lazy) and callable(value) and not isinstance(value, _LazyValue)
+		# Unhashable values (like lists) and opaque ones (like tensors) aren't cached - `_ResultsCache` handles it:
+		return (_results_cache.get_or_compute(
+			(name, type(value), value, lazy, dict),
+			lambda: _new_dict_with_updated_key(dict, name, _LazyValue(value) if lazy else value)
+		), )
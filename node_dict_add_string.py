@@ -4,44 +4,50 @@
 
 import typing as _t
 
-from inspect import cleandoc as _cleandoc
+from functools import lru_cache as _lru_cache
 
-from frozendict import deepfreeze as _deepfreeze
-
-from comfy.comfy_types.node_typing import IO as _IO
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
 
 from . import _meta
-from .docstring_formatter import format_docstring as _format_docstring
+from .docstring_formatter import LazyDescription as _LazyDescription
 from .enums import DataTypes as _DataTypes
-from .funcs_common import _new_dict_with_updated_key, _T
+from .funcs_common import _new_dict_with_updated_key, _ResultsCache, _T
+from .funcs_stats import timed as _timed
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'name': (_IO.STRING, {'tooltip': (
+				"Name (key) of the substring inserted into the dict. "
+				"It must comprise only of latin letters, digits and underscores + it can't start with a digit."
+			)}),
+			'cleanup': (_IO.BOOLEAN, {'default': True, 'label_on': 'leading/trailing spaces', 'label_off': 'no', 'tooltip': (
+				"When enabled, each line in the sub-string is stripped from any spaces at its start and end."
+			)}),
+			'string': (_IO.STRING, {'multiline': True, 'tooltip': "The actual sub-string to add into the dict."}),
+		},
+		'optional': {
+			'dict': _DataTypes.input_dict(tooltip="An optional Format-Dictionary to extend/update."),
+		},
+		# 'hidden': {
+		# 	'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		# },
+	})
 
 
-# A tiny optimization by reusing the same immutable dict:
-_input_types = _deepfreeze({
-	'required': {
-		'name': (_IO.STRING, {'tooltip': (
-			"Name (key) of the substring inserted into the dict. "
-			"It must comprise only of latin letters, digits and underscores + it can't start with a digit."
-		)}),
-		'cleanup': (_IO.BOOLEAN, {'default': True, 'label_on': 'leading/trailing spaces', 'label_off': 'no', 'tooltip': (
-			"When enabled, each line in the sub-string is stripped from any spaces at its start and end."
-		)}),
-		'string': (_IO.STRING, {'multiline': True, 'tooltip': "The actual sub-string to add into the dict."}),
-	},
-	'optional': {
-		'dict': _DataTypes.input_dict(tooltip="An optional Format-Dictionary to extend/update."),
-	},
-	# 'hidden': {
-	# 	'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
-	# },
-})
+_results_cache = _ResultsCache(name='results.StringConstructorDictAddString')
 
 
 class StringConstructorDictAddString:
 	"""Add/update a string to the Format-Dict."""
 	NODE_NAME = 'StringConstructorDictAddString'
 	CATEGORY = _meta.category_dict
-	DESCRIPTION = _format_docstring(_cleandoc(__doc__))
+	DESCRIPTION = _LazyDescription()
 
 	FUNCTION = 'main'
 	RETURN_TYPES = (str(_DataTypes.DICT), )
@@ -50,9 +56,10 @@ class StringConstructorDictAddString:
 
 	@classmethod
 	def INPUT_TYPES(cls):
-		return _input_types
+		return _input_types()
 
 	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('string', 'dict'))
 	def main(
 		name: str, cleanup: bool, string: str,
 		dict: _t.Dict[str, _T] = None,
@@ -64,4 +71,6 @@ def main(
 			string = '\n'.join(
 				x.strip() for x in string.splitlines()
 			)
-		return (_new_dict_with_updated_key(dict, name, string), )
+		return (_results_cache.get_or_compute(
+			(name, string, dict), lambda: _new_dict_with_updated_key(dict, name, string)
+		), )
@@ -0,0 +1,120 @@
+# encoding: utf-8
+"""
+Code for ``StringConstructorDictFromFile`` node.
+"""
+
+import typing as _t
+
+from functools import lru_cache as _lru_cache
+
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
+
+from . import _meta
+from . import funcs_file_dict as _file_dict
+from .docstring_formatter import LazyDescription as _LazyDescription
+from .enums import DataTypes as _DataTypes
+from .funcs_common import _show_text_on_node, _new_updated_dict, _ResultsCache, _T
+from .funcs_stats import timed as _timed
+from .node_dict_add_string import _input_types as _input_types_str
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'path': (_IO.STRING, {'default': '', 'tooltip': (
+				"Path to the file with the dict, relative to ComfyUI's input directory. "
+				"The file must be inside it: absolute paths elsewhere, '..' or symlinks leading out of it are rejected.\n"
+				"Only the path itself is saved into the workflow - not the file contents."
+			)}),
+			'file_format': (_file_dict.FORMATS, {'default': _file_dict.FORMAT_AUTO, 'tooltip': (
+				f"{_file_dict.FORMAT_TEXT}: the same format as in the 'Dict from Text' node - "
+				"the first line in each chunk is the name, chunks are separated by empty lines.\n"
+				f"{_file_dict.FORMAT_JSON}: a single JSON object.\n"
+				f"{_file_dict.FORMAT_AUTO}: JSON for *.json files, text for anything else."
+			)}),
+			'cleanup': (_IO.BOOLEAN, {'default': True, 'label_on': 'leading/trailing spaces', 'label_off': 'no', 'tooltip': (
+				"Text format only: when enabled, each line in each sub-string is stripped from any spaces at its start and end."
+			)}),
+			'lazy_load': (_IO.BOOLEAN, {'default': False, 'label_on': 'only used entries', 'label_off': 'whole file', 'tooltip': (
+				"Text format only. For huge prompt libraries: instead of loading the whole file, only build an index of "
+				"the entries - and read each entry from the file only when it's actually used in a template.\n"
+				"Recently used entries are kept in memory."
+			)}),
+			'check': (_file_dict.CHECKS, {'default': _file_dict.CHECK_MTIME, 'tooltip': (
+				"How to detect that the file has changed (and needs to be loaded again):\n"
+				f"{_file_dict.CHECK_MTIME}: by the file's modification time and size - the cheapest option.\n"
+				f"{_file_dict.CHECK_HASH}: by the file's contents - the file is read on every run (but not parsed)."
+			)}),
+			'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'number of entries', 'label_off': 'no', 'tooltip': (
+				"Show the number of entries loaded from the file on the node itself?"
+			)}),
+		},
+		'optional': {
+			'dict': _input_types_str()['optional']['dict'],
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorDictFromFile')
+
+
+def _resolved_path(path: str) -> str:
+	if not path or not str(path).strip():
+		raise ValueError("No dict file specified")
+	import folder_paths as _folder_paths
+
+	return _file_dict._resolved_path(path, _folder_paths.get_input_directory())
+
+
+class StringConstructorDictFromFile:
+	"""
+	Load a dict of named sub-strings from a file: either in the same text format as `Dict from Text` node, or JSON.
+
+	The file is parsed only once and re-used, until it changes.
+	"""
+	NODE_NAME = 'StringConstructorDictFromFile'
+	CATEGORY = _meta.category
+	DESCRIPTION = _LazyDescription()
+
+	OUTPUT_NODE = True  # Just to show the status message even if not connected to anything
+
+	FUNCTION = 'main'
+	RETURN_TYPES = (str(_DataTypes.DICT), )
+	RETURN_NAMES = (_DataTypes.DICT.lower(), )
+	# OUTPUT_TOOLTIPS = tuple()
+
+	@classmethod
+	def INPUT_TYPES(cls):
+		return _input_types()
+
+	@classmethod
+	def IS_CHANGED(cls, path: str = '', check: str = _file_dict.CHECK_MTIME, **kwargs):
+		"""Re-execute the node whenever the file changes - even if none of the node's inputs do."""
+		try:
+			return _file_dict.file_signature(_resolved_path(path), check)
+		except (OSError, ValueError) as e:
+			return f"{type(e).__name__}: {e}"  # Let `main()` report the actual error
+
+	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('dict', ))
+	def main(
+		path: str, file_format: str = _file_dict.FORMAT_AUTO, cleanup: bool = True, lazy_load: bool = False,
+		check: str = _file_dict.CHECK_MTIME, show_status: bool = False,
+		dict: _t.Dict[str, _T] = None, unique_id: str = None,
+	) -> _t.Tuple[_t.Dict[str, _t.Union[_T, str]]]:
+		file_dict = _file_dict.load_file_dict(_resolved_path(path), file_format, cleanup, check, lazy=lazy_load)
+		if dict is None:
+			out_dict = file_dict
+		else:
+			out_dict = _results_cache.get_or_compute((file_dict, dict), lambda: _new_updated_dict(dict, file_dict))
+
+		if show_status and unique_id:
+			_show_text_on_node(f"{len(file_dict)} entries loaded", unique_id)
+		return (out_dict, )
@@ -4,19 +4,28 @@
 
 import typing as _t
 
-from inspect import cleandoc as _cleandoc
+from functools import lru_cache as _lru_cache
+from itertools import chain as _chain
 
 from frozendict import frozendict as _frozendict, deepfreeze as _deepfreeze
 
-from comfy.comfy_types.node_typing import IO as _IO
-
 from . import _meta
-from .docstring_formatter import format_docstring as _format_docstring
+from .docstring_formatter import LazyDescription as _LazyDescription
 from .enums import DataTypes as _DataTypes
-from .funcs_common import _show_text_on_node, _new_updated_dict, _T
+from .funcs_alternatives import Alternatives as _Alternatives
+from .funcs_common import _show_text_on_node, _new_updated_dict, _ResultsCache, _T
+from .funcs_stats import timed as _timed
 from .node_dict_add_string import _input_types as _input_types_str
 
 
+_READ_BLOCK_SIZE = 1 << 16  # The text is scanned in blocks of this many characters
+
+# Everything `str.splitlines()` treats as a line boundary:
+_LINE_BREAKS = frozenset('\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029')
+
+_TextSource = _t.Union[str, _t.TextIO]
+
+
 def _return_line_raw(line_raw: str, line_stripped:str) -> str:
 	return line_raw
 
@@ -25,16 +34,73 @@ def _return_line_stripped(line_raw: str, line_stripped:str) -> str:
 	return line_stripped
 
 
-def _parsed_kv_pairs_gen(multiline_str: str, strip_lines=True):
+def _text_blocks_gen(source: _TextSource, block_size: int = _READ_BLOCK_SIZE) -> _t.Iterator[str]:
+	"""Split a string - or read a file-like object - into blocks of limited size."""
+	block_size = max(int(block_size), 1)
+	if isinstance(source, str):
+		for start in range(0, len(source), block_size):
+			yield source[start:start + block_size]
+		return
+
+	read = source.read
+	while True:
+		block = read(block_size)
+		if not block:
+			return
+		yield str(block)
+
+
+def _lines_gen(blocks: _t.Iterable[str]) -> _t.Iterator[str]:
+	"""
+	Lines from a stream of text blocks - the exact same ones ``str.splitlines()`` would give for the whole text,
+	but only a single block (and the unfinished line) is kept in memory at a time.
+	"""
+	pending_parts: _t.List[str] = list()  # The unfinished line, which continues in the next block
+	skip_lf = False  # The previous block ended with '\r' - then, '\n' at the start of the next one is the same line break
+	for block in blocks:
+		if skip_lf:
+			skip_lf = False
+			if block[:1] == '\n':
+				block = block[1:]
+		if not block:
+			continue
+
+		lines = block.splitlines()
+		last_char = block[-1]
+		unfinished_line: _t.Optional[str] = None
+		if last_char in _LINE_BREAKS:
+			skip_lf = last_char == '\r'
+		else:
+			unfinished_line = lines.pop()
+
+		if lines:
+			if pending_parts:
+				# The first line of this block finishes the one started earlier:
+				pending_parts.append(lines[0])
+				lines[0] = ''.join(pending_parts)
+				pending_parts = list()
+			yield from lines
+		if unfinished_line is not None:
+			pending_parts.append(unfinished_line)
+
+	if pending_parts:
+		yield ''.join(pending_parts)
+
+
+def _parsed_kv_pairs_gen(
+	text: _t.Optional[_TextSource], strip_lines=True, block_size: int = _READ_BLOCK_SIZE,
+) -> _t.Iterator[_t.Tuple[str, str]]:
 	"""
-	Given a multiline string, extract keywords (first non-empty line in each chunk)
+	Given a multiline string (or a file-like object with text), extract keywords (first non-empty line in each chunk)
 	and their substrings (all the following non-empty lines).
+
+	It's a streaming parser: the chunks are yielded as soon as they end, and only the lines of the current chunk
+	are kept in memory. So, it's fine to feed it with a huge prompt library.
 	"""
-	if not multiline_str:
-		return
-	multiline_str = str(multiline_str)
-	if not multiline_str.strip():
+	if not text:
 		return
+	if not isinstance(text, str) and not hasattr(text, 'read'):
+		text = str(text)
 
 	appended_line_f = _return_line_stripped if strip_lines else _return_line_raw
 	cur_chunk: _t.List[str] = list()
@@ -46,7 +112,7 @@ def dump_chunk():
 		# If there are no actual lines, join() would return an empty string:
 		return chunk_key.strip(), '\n'.join(cur_chunk_lines)
 
-	for line in multiline_str.splitlines():
+	for line in _lines_gen(_text_blocks_gen(text, block_size)):
 		line_stripped: str = line.strip()
 		if line_stripped:
 			cur_chunk.append(appended_line_f(line, line_stripped))
@@ -66,27 +132,81 @@ def dump_chunk():
 
 _dict = dict
 
-_input_types = _deepfreeze({
-	'required': {
-		'cleanup': (_IO.BOOLEAN, {'default': True, 'label_on': 'leading/trailing spaces', 'label_off': 'no', 'tooltip': (
-			"When enabled, each line in each sub-string is stripped from any spaces at its start and end."
-		)}),
-		'strings': (_IO.STRING, {'multiline': True, 'tooltip': (
-			"Sub-string names followed by their text. Different sub-string chunks are separated by empty lines. Example:\n\n"
-			"char1_short\n1boy, blond, short hair\n\n"
-			"char1_long\n1boy, smiling, blue eyes, blond, short hair,\nwearing a leather jacket, sitting on a bike"
-		)}),
-		'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'detected names', 'label_off': 'no', 'tooltip': (
-			"Show detected string names on the node itself?"
-		)}),
-	},
-	'optional': {
-		'dict': _input_types_str['optional']['dict'],
-	},
-	'hidden': {
-		'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
-	},
-})
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'cleanup': (_IO.BOOLEAN, {'default': True, 'label_on': 'leading/trailing spaces', 'label_off': 'no', 'tooltip': (
+				"When enabled, each line in each sub-string is stripped from any spaces at its start and end."
+			)}),
+			'strings': (_IO.STRING, {'multiline': True, 'tooltip': (
+				"Sub-string names followed by their text. Different sub-string chunks are separated by empty lines. Example:\n\n"
+				"char1_short\n1boy, blond, short hair\n\n"
+				"char1_long\n1boy, smiling, blue eyes, blond, short hair,\nwearing a leather jacket, sitting on a bike"
+			)}),
+			'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'detected names', 'label_off': 'no', 'tooltip': (
+				"Show detected string names on the node itself?"
+			)}),
+			'alternatives': (_IO.BOOLEAN, {'default': False, 'label_on': 'each line', 'label_off': 'no', 'tooltip': (
+				"Treat each line of a multi-line sub-string as a separate alternative value. "
+				"\"String Formatter (Combinations)\" node formats a template with each combination of them - "
+				"and a regular \"String Formatter\" uses the first one."
+			)}),
+		},
+		'optional': {
+			'dict': _input_types_str()['optional']['dict'],
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorDictFromText')
+
+
+def _with_alternatives_gen(
+	pairs: _t.Iterable[_t.Tuple[str, str]],
+) -> _t.Iterator[_t.Tuple[str, _t.Union[str, _Alternatives]]]:
+	"""Turn each multi-line value into alternatives: one per line."""
+	for name, value in pairs:
+		lines = value.split('\n')
+		yield name, (_Alternatives(tuple(lines)) if len(lines) > 1 else value)
+
+
+def _dict_from_text(
+	cleanup: bool, strings: str, dict: _t.Dict[str, _T] = None, alternatives: bool = False,
+) -> _t.Tuple[_t.Dict[str, _t.Union[_T, str]], str]:
+	"""
+	The output dict + the status text (names of the parsed sub-strings).
+
+	``strings`` could also be a file-like object. The parsed chunks are merged into the output dict right away,
+	as they're streamed from the text - without collecting them into an intermediate dict first.
+	"""
+	new_names: _t.Dict[str, None] = _dict()  # Only the names, in their order - for the status text
+
+	def named_pairs_gen():
+		for name, value in pairs_gen:
+			name = name.strip()
+			new_names.setdefault(f'{name}[{len(value)}]' if isinstance(value, _Alternatives) else name)
+			yield name, value
+
+	pairs_gen = _parsed_kv_pairs_gen(strings, strip_lines=cleanup)
+	if alternatives:
+		pairs_gen = _with_alternatives_gen(pairs_gen)
+	first_pair = next(pairs_gen, None)
+	if first_pair is None:
+		if dict is None:
+			dict = _dict()
+		return dict, ''  # No need to create another dict instance if we add nothing
+	pairs_gen = _chain((first_pair, ), pairs_gen)
+
+	out_dict = _new_updated_dict(dict, named_pairs_gen())
+	# These two ↑↓ must be in this specific order: `_new_updated_dict()` also checks both dicts
+	return out_dict, ','.join(new_names.keys())
 
 
 class StringConstructorDictFromText:
@@ -95,7 +215,7 @@ class StringConstructorDictFromText:
 	"""
 	NODE_NAME = 'StringConstructorDictFromText'
 	CATEGORY = _meta.category
-	DESCRIPTION = _format_docstring(_cleandoc(__doc__))
+	DESCRIPTION = _LazyDescription()
 
 	OUTPUT_NODE = True  # Just to show the status message even if not connected to anything
 
@@ -106,24 +226,18 @@ class StringConstructorDictFromText:
 
 	@classmethod
 	def INPUT_TYPES(cls):
-		return _input_types
+		return _input_types()
 
 	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('strings', 'dict'))
 	def main(
-		cleanup: bool, strings: str, show_status: bool = True,
+		cleanup: bool, strings: str, show_status: bool = True, alternatives: bool = False,
 		dict: _t.Dict[str, _T] = None, unique_id: str = None,
 	) -> _t.Tuple[_t.Dict[str, _t.Union[_T, str]]]:
-		new_dict = {k: v for k, v in _parsed_kv_pairs_gen(strings, strip_lines=cleanup)}
-
-		if not new_dict:
-			if dict is None:
-				dict = _dict()
-			return (dict, )  # No need to create another dict instance if we add nothing
-
-		out_dict = _new_updated_dict(dict, new_dict)
-		# These two ↑↓ must be in this specific order: `_new_updated_dict()` also checks both dicts
-		if show_status and unique_id:
-			status_text = ','.join(new_dict.keys()) if new_dict else ''
+		alternatives = bool(alternatives)
+		out_dict, status_text = _results_cache.get_or_compute(
+			(bool(cleanup), strings, alternatives, dict), lambda: _dict_from_text(cleanup, strings, dict, alternatives)
+		)
+		if show_status and unique_id and status_text:
 			_show_text_on_node(status_text, unique_id)
-
 		return (out_dict, )
@@ -4,54 +4,61 @@
 
 import typing as _t
 
-from inspect import cleandoc as _cleandoc
+from functools import lru_cache as _lru_cache
 
-from frozendict import deepfreeze as _deepfreeze
-
-from comfy.comfy_types.node_typing import IO as _IO
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
 
 from . import _meta
-from .docstring_formatter import format_docstring as _format_docstring
+from .docstring_formatter import LazyDescription as _LazyDescription
 from .enums import DataTypes as _DataTypes
+from .format_dict import LazyValue as _LazyValue
+from .funcs_alternatives import Alternatives as _Alternatives
 from .funcs_common import _show_text_on_node, _new_dict_with_updated_key, _T
+from .funcs_stats import timed as _timed
+
 
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
 
-_input_types = _deepfreeze({
-	'required': {
-		'name': (_IO.STRING, {'tooltip': (
-			"Name (key) of a string to extract from dictionary.\n"
-			"If the element with such key isn't a string, it will be turned to one.\n"
-			"If no such key exists in the dict, an empty string returned."
-		)}),
-		'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'value', 'label_off': 'no', 'tooltip': (
-			"Show the extracted string on the node itself?"
-		)}),
-	},
-	'optional': {
-		'dict': _DataTypes.input_dict(tooltip="The dictionary to extract the element from."),
-	},
-	'hidden': {
-		'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
-	},
-})
+	return _deepfreeze({
+		'required': {
+			'name': (_IO.STRING, {'tooltip': (
+				"Name (key) of a string to extract from dictionary.\n"
+				"If the element with such key isn't a string, it will be turned to one.\n"
+				"If no such key exists in the dict, an empty string returned."
+			)}),
+			'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'value', 'label_off': 'no', 'tooltip': (
+				"Show the extracted string on the node itself?"
+			)}),
+		},
+		'optional': {
+			'dict': _DataTypes.input_dict(tooltip="The dictionary to extract the element from."),
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
 
 
 class StringConstructorDictExtractString:
 	"""Extract a single string from the Format-Dict."""
 	NODE_NAME = 'StringConstructorDictExtractString'
 	CATEGORY = _meta.category_dict
-	DESCRIPTION = _format_docstring(_cleandoc(__doc__))
+	DESCRIPTION = _LazyDescription()
 
 	FUNCTION = 'main'
-	RETURN_TYPES = (_IO.STRING, )
+	RETURN_TYPES = ('STRING', )
 	RETURN_NAMES = ('string', )
 	# OUTPUT_TOOLTIPS = tuple()
 
 	@classmethod
 	def INPUT_TYPES(cls):
-		return _input_types
+		return _input_types()
 
 	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('dict', ))
 	def main(
 		name: str, show_status: bool = False, dict: _t.Dict[str, _T] = None,
 		unique_id: str = None,
@@ -62,6 +69,11 @@ def main(
 			string: str = dict.get(name, '')
 		except Exception:
 			string = ''
+		# The same as a template gets for "{name}": a lazy value is computed, alternatives give the first one
+		if isinstance(string, _LazyValue):
+			string = string()
+		if isinstance(string, _Alternatives):
+			string = format(string, '')
 		if string is None:
 			string = ''
 
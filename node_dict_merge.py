@@ -0,0 +1,97 @@
+# encoding: utf-8
+"""
+"""
+
+import typing as _t
+
+from functools import lru_cache as _lru_cache
+
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
+
+from . import _meta
+from .docstring_formatter import LazyDescription as _LazyDescription
+from .enums import DataTypes as _DataTypes
+from .funcs_common import _show_text_on_node, _merged_dicts, _ResultsCache, _T
+from .funcs_stats import timed as _timed
+
+
+_N_DICTS = 8
+_PRECEDENCE_LAST = 'last wins'
+_PRECEDENCE_FIRST = 'first wins'
+
+
+def _dict_inputs(dicts: _t.Dict[str, _t.Optional[_t.Dict[str, _T]]]) -> _t.List[_t.Optional[_t.Dict[str, _T]]]:
+	"""The connected dict inputs, in the order of their numbers: ``dict_1``, ``dict_2``, ..."""
+	return [dicts.get(f'dict_{i}') for i in range(1, _N_DICTS + 1)]
+
+
+def _status_message(out_dict: _t.Dict[str, _T], dicts: _t.Sequence[_t.Optional[_t.Dict[str, _T]]]) -> str:
+	n_dicts = sum(1 for d in dicts if d is not None)
+	n_items = sum(len(d) for d in dicts if d is not None)
+	return f"{len(out_dict)} keys from {n_dicts} dicts ({n_items - len(out_dict)} overridden)"
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'precedence': ((_PRECEDENCE_LAST, _PRECEDENCE_FIRST), {'default': _PRECEDENCE_LAST, 'tooltip': (
+				"Which dict's value is used when the same key is in multiple dicts: "
+				"the one connected to the input with the greater number (last wins) or with the smaller one (first wins)."
+			)}),
+			'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'number of keys', 'label_off': 'no', 'tooltip': (
+				"Show the number of keys in the merged dict on the node itself?"
+			)}),
+		},
+		'optional': {
+			f'dict_{i}': _DataTypes.input_dict(tooltip=f"Dictionary #{i} to merge. Any of the inputs could be left unconnected.")
+			for i in range(1, _N_DICTS + 1)
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorDictMerge')
+
+
+class StringConstructorDictMerge:
+	"""
+	Merge multiple Format-Dicts into one.
+
+	It's the same as a chain of nodes adding one dict to another - but all the dicts are merged in one go:
+	the keys are validated and the dict is built only once, no matter how many dicts are merged.
+	"""
+	NODE_NAME = 'StringConstructorDictMerge'
+	CATEGORY = _meta.category_dict
+	DESCRIPTION = _LazyDescription()
+
+	FUNCTION = 'main'
+	RETURN_TYPES = (str(_DataTypes.DICT), )
+	RETURN_NAMES = (_DataTypes.DICT.lower(), )
+	# OUTPUT_TOOLTIPS = tuple()
+
+	@classmethod
+	def INPUT_TYPES(cls):
+		return _input_types()
+
+	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('dicts', ))
+	def main(
+		precedence: str = _PRECEDENCE_LAST,
+		show_status: bool = False,
+		unique_id: str = None,
+		**dicts: _t.Optional[_t.Dict[str, _T]],
+	) -> _t.Tuple[_t.Dict[str, _T]]:
+		last_wins = precedence != _PRECEDENCE_FIRST
+		dict_inputs = _dict_inputs(dicts)
+		out_dict = _results_cache.get_or_compute(
+			(last_wins, *dict_inputs), lambda: _merged_dicts(dict_inputs, last_wins=last_wins)
+		)
+		if show_status and unique_id:
+			_show_text_on_node(_status_message(out_dict, dict_inputs), unique_id)
+		return (out_dict, )
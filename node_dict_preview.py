@@ -4,15 +4,32 @@
 
 import typing as _t
 
-from inspect import cleandoc as _cleandoc
+from collections import OrderedDict as _OrderedDict
+from functools import lru_cache as _lru_cache
 from pprint import pformat as _pformat
+from reprlib import Repr as _Repr
+from threading import Lock as _Lock
+from weakref import ref as _weakref
 
 from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
 
 from . import _meta
-from .docstring_formatter import format_docstring as _format_docstring
+from .docstring_formatter import LazyDescription as _LazyDescription
 from .enums import DataTypes as _DataTypes
-from .funcs_common import _show_text_on_node, _verify_input_dict_into_new
+from .format_dict import FormatDict as _FormatDict, is_plain_value as _is_plain_value, LazyLayer as _LazyLayer, _MISSING
+from .funcs_common import _show_text_on_node, _status_enabled, _verify_input_dict, _ResultsCache
+from .funcs_stats import timed as _timed
+
+
+_PFORMAT_MAX_ITEMS = 1000  # Bigger containers are shown in a shortened form: pretty-printing them fully is too slow
+_LAST_PREVIEWS_CACHE_SIZE = 64  # How many preview nodes remember what they've shown last time (for diffs)
+_ENTRIES_SEPARATOR = '\n\n'
+
+_short_repr = _Repr()
+_short_repr.maxlevel = 3
+_short_repr.maxlist = _short_repr.maxtuple = _short_repr.maxset = _short_repr.maxfrozenset = 50
+_short_repr.maxdict = 50
+_short_repr.maxstring = _short_repr.maxother = 200
 
 
 def _to_regular_dict_recursive_copy(input_dict: dict = None) -> dict:
@@ -35,33 +52,226 @@ def _to_regular_dict_recursive_copy(input_dict: dict = None) -> dict:
 	}
 
 
-def _preview_single_entry(key: str, value) -> str:
+def _truncated(text: str, max_length: int = 0) -> str:
+	if not max_length or len(text) <= max_length:
+		return text
+	return f"{text[:max_length]}… [+{len(text) - max_length} characters]"
+
+
+def _value_preview(value, max_length: int = 0) -> str:
 	if isinstance(value, str):
-		return f"{key}:\n{value}"
-	value_repr = _pformat(value)
-	return f"{key}:\n{value_repr}"
+		return _truncated(value, max_length)
+	try:
+		n_items = len(value)
+	except Exception:
+		n_items = 0
+	if n_items > _PFORMAT_MAX_ITEMS:
+		return _truncated(f"{_short_repr.repr(value)}  [{n_items} items]", max_length)
+	if isinstance(value, (dict, _frozendict, _t.Mapping)):
+		value = _to_regular_dict_recursive_copy(value)
+	return _truncated(_pformat(value), max_length)
+
 
+def _preview_single_entry(key: str, value, max_value_length: int = 0) -> str:
+	return f"{key}:\n{_value_preview(value, max_value_length)}"
+
+
+def _cut_to_budget(text: str, max_bytes: int = 0, max_lines: int = 0) -> str:
+	if max_lines:
+		text = '\n'.join(text.split('\n', max_lines)[:max_lines])
+	if max_bytes:
+		text = text.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore')
+	return text
+
+
+def _budgeted_message(
+	parts: _t.Iterable[str], n_parts: int, max_bytes: int = 0, max_lines: int = 0, header: str = '',
+) -> str:
+	"""
+	Join the parts, until the size limits are reached. The parts are only generated while there's room for them:
+	so, with a lazy iterable, nothing is formatted past the limits.
+	"""
+	out_parts: _t.List[str] = [header] if header else list()
+	bytes_left = max_bytes
+	lines_left = max_lines
+	n_shown = 0
+	for part in parts:
+		if out_parts:
+			part = _ENTRIES_SEPARATOR + part
+		part_bytes = len(part.encode('utf-8')) if max_bytes else 0
+		part_lines = part.count('\n') + (0 if out_parts else 1) if max_lines else 0
+		if (max_bytes and part_bytes > bytes_left) or (max_lines and part_lines > lines_left):
+			if not n_shown:
+				# Show at least the beginning of the first entry:
+				cut_part = _cut_to_budget(part, bytes_left, lines_left)
+				out_parts.append(cut_part if cut_part == part else f"{cut_part}…")
+				n_shown = 1
+			break
+		out_parts.append(part)
+		n_shown += 1
+		bytes_left -= part_bytes
+		lines_left -= part_lines
+
+	n_hidden = n_parts - n_shown
+	if n_hidden > 0:
+		out_parts.append(f"{_ENTRIES_SEPARATOR}… {n_hidden} more entries not shown (preview size limit)")
+	return ''.join(out_parts)
+
+
+def _preview_message(
+	input_dict: dict = None, max_bytes: int = 0, max_lines: int = 0, max_value_length: int = 0,
+) -> str:
+	if not input_dict:
+		return ''
+	_verify_input_dict(input_dict)
+	parts = (_preview_single_entry(k, v, max_value_length) for k, v in input_dict.items())
+	return _budgeted_message(parts, len(input_dict), max_bytes, max_lines)
+
+
+# What a preview node remembers about each entry it's shown - instead of the value itself, not to keep the whole
+# dict alive between runs (see ``_item_token()``): key -> token
+_Snapshot = _t.Dict[str, _t.Any]
+
+_TOKEN_HASH = 'hash'
+_TOKEN_REF = 'ref'
+_TOKEN_LAYER = 'layer'
+
+
+def _item_token(value, layer: _t.Optional[_t.Mapping[str, _t.Any]] = None) -> _t.Optional[tuple]:
+	"""
+	What's remembered about a single entry:
+	- for an item of a lazy layer (its value isn't loaded) - the layer itself: it's plain data, and only
+	  its keys are in memory anyway;
+	- for plain hashable data - only its hash;
+	- for anything else (tensors, lazy values...) - a weak reference: it's the same value only if it's the same object.
+	``None`` if nothing is known: then, the entry is always shown as changed.
+	"""
+	if value is _MISSING:
+		return _TOKEN_LAYER, layer
+	if _is_plain_value(value) and not isinstance(value, (_FormatDict, _LazyLayer)):
+		# (Format-dicts are hashed by their items: it would load the values of their lazy layers)
+		try:
+			return _TOKEN_HASH, type(value), hash(value)
+		except TypeError:
+			return None
+	try:
+		return _TOKEN_REF, _weakref(value)
+	except TypeError:
+		return None
 
-def _preview_message(input_dict: dict = None):
-	input_dict = _to_regular_dict_recursive_copy(_verify_input_dict_into_new(input_dict))
-	parts: _t.List[str] = [
-		_preview_single_entry(k, v) for k, v in input_dict.items()
+
+def _tokens_match(old_token: _t.Optional[tuple], new_token: _t.Optional[tuple]) -> bool:
+	if old_token is None or new_token is None or old_token[0] != new_token[0]:
+		return False
+	kind = old_token[0]
+	if kind == _TOKEN_HASH:
+		return old_token == new_token
+	if kind == _TOKEN_REF:
+		old_value = old_token[1]()
+		return old_value is not None and old_value is new_token[1]()
+	old_layer, new_layer = old_token[1], new_token[1]
+	return old_layer is new_layer or old_layer.same_items(new_layer)
+
+
+def _sourced_items(input_dict: _t.Mapping[str, _t.Any]) -> _t.Iterator[_t.Tuple[str, _t.Any, _t.Any]]:
+	"""(key, value, layer) - the values of lazy layers aren't loaded (see ``FormatDict._sourced_items()``)."""
+	if isinstance(input_dict, _FormatDict):
+		return input_dict._sourced_items()
+	return ((key, value, None) for key, value in input_dict.items())
+
+
+def _snapshot(input_dict: _t.Mapping[str, _t.Any]) -> _Snapshot:
+	return {key: _item_token(value, layer) for key, value, layer in _sourced_items(input_dict)}
+
+
+def _changed_keys(
+	old_snapshot: _Snapshot, new_dict: _t.Mapping[str, _t.Any],
+) -> _t.Tuple[_t.List[str], _t.List[str], _Snapshot]:
+	"""
+	Keys which are added/changed + the removed ones + the snapshot of the new dict.
+	Nothing is formatted, and no values of lazy layers are loaded: only their layers are compared.
+	"""
+	new_snapshot = _snapshot(new_dict)
+	changed = [
+		key for key in new_dict  # In the dict's own order
+		if key not in old_snapshot or not _tokens_match(old_snapshot[key], new_snapshot[key])
 	]
-	return '\n\n'.join(parts)
+	removed = [key for key in old_snapshot if key not in new_snapshot]
+	return changed, removed, new_snapshot
+
+
+def _diff_message(
+	old_snapshot: _t.Optional[_Snapshot], new_dict: _t.Mapping[str, _t.Any],
+	max_bytes: int = 0, max_lines: int = 0, max_value_length: int = 0,
+) -> _t.Tuple[str, _Snapshot]:
+	"""The message + the snapshot of the new dict (to be remembered for the next run)."""
+	if old_snapshot is None:
+		return _preview_message(new_dict, max_bytes, max_lines, max_value_length), _snapshot(new_dict)
+	_verify_input_dict(new_dict)
+	changed, removed, new_snapshot = _changed_keys(old_snapshot, new_dict)
+	if not (changed or removed):
+		return "No changes since the last run.", new_snapshot
+
+	header = f"Changed since the last run: {len(changed)} added/modified, {len(removed)} removed."
+	if removed:
+		header += "\nRemoved: " + _cut_to_budget(', '.join(removed), max_bytes // 4, 1)
+	parts = (_preview_single_entry(k, new_dict[k], max_value_length) for k in changed)
+	return _budgeted_message(parts, len(changed), max_bytes, max_lines, header=header), new_snapshot
+
+
+_last_previews: _t.Dict[str, _Snapshot] = _OrderedDict()
+_last_previews_lock = _Lock()
+
+
+def _pop_last_preview(unique_id: str) -> _t.Optional[_Snapshot]:
+	"""The snapshot of the dict shown by the node the last time (if any)."""
+	with _last_previews_lock:
+		return _last_previews.pop(unique_id, None)
+
+
+def _remember_preview(unique_id: str, snapshot: _Snapshot):
+	with _last_previews_lock:
+		_last_previews.pop(unique_id, None)
+		_last_previews[unique_id] = snapshot
+		while len(_last_previews) > _LAST_PREVIEWS_CACHE_SIZE:
+			_last_previews.popitem(last=False)
 
 # --------------------------------------
 
 _dict = dict
 
-_input_types = _deepfreeze({
-	'required': {},
-	'optional': {
-		'dict': _DataTypes.input_dict(tooltip="A Format-Dictionary."),
-	},
-	'hidden': {
-		'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
-	},
-})
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'max_size': (_IO.INT, {'default': 65536, 'min': 0, 'max': 1 << 26, 'step': 1024, 'tooltip': (
+				"The maximum size of the preview text, in bytes. 0 - no limit.\n"
+				"Previewing huge dicts in full could freeze the UI."
+			)}),
+			'max_lines': (_IO.INT, {'default': 1000, 'min': 0, 'max': 1 << 20, 'tooltip': (
+				"The maximum number of lines in the preview text. 0 - no limit."
+			)}),
+			'max_value_length': (_IO.INT, {'default': 2000, 'min': 0, 'max': 1 << 26, 'tooltip': (
+				"Each value is shortened to this many characters. 0 - no limit."
+			)}),
+			'only_changed': (_IO.BOOLEAN, {'default': False, 'label_on': 'since the last run', 'label_off': 'all entries', 'tooltip': (
+				"Show only the entries which are added, modified or removed since the last run of this node.\n"
+				"The first run with this option enabled shows all of them."
+			)}),
+		},
+		'optional': {
+			'dict': _DataTypes.input_dict(tooltip="A Format-Dictionary."),
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorDictPreview')
 
 
 class StringConstructorDictPreview:
@@ -70,7 +280,7 @@ class StringConstructorDictPreview:
 	"""
 	NODE_NAME = 'StringConstructorDictPreview'
 	CATEGORY = _meta.category_dict
-	DESCRIPTION = _format_docstring(_cleandoc(__doc__))
+	DESCRIPTION = _LazyDescription()
 
 	OUTPUT_NODE = True
 
@@ -81,16 +291,26 @@ class StringConstructorDictPreview:
 
 	@classmethod
 	def INPUT_TYPES(cls):
-		return _input_types
+		return _input_types()
 
 	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('dict', ))
 	def main(
+		max_size: int = 0, max_lines: int = 0, max_value_length: int = 0, only_changed: bool = False,
 		dict: _t.Dict[str, _t.Any] = None,
 		unique_id: str = None,
 	):
 		if dict is None:
 			dict = _dict()
-		if unique_id:
-			status_text = _preview_message(dict)
-			_show_text_on_node(status_text, unique_id)
+		if not (unique_id and _status_enabled()):
+			return (dict, )
+
+		limits = (max(int(max_size), 0), max(int(max_lines), 0), max(int(max_value_length), 0))
+		old_snapshot = _pop_last_preview(unique_id)
+		if only_changed:
+			status_text, new_snapshot = _diff_message(old_snapshot, dict, *limits)
+			_remember_preview(unique_id, new_snapshot)
+		else:
+			status_text = _results_cache.get_or_compute((dict, *limits), lambda: _preview_message(dict, *limits))
+		_show_text_on_node(status_text, unique_id)
 		return (dict, )
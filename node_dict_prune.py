@@ -0,0 +1,130 @@
+# encoding: utf-8
+"""
+"""
+
+import typing as _t
+
+from functools import lru_cache as _lru_cache
+
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
+
+from . import _meta
+from .docstring_formatter import LazyDescription as _LazyDescription
+from .enums import DataTypes as _DataTypes
+from .funcs_common import _show_text_on_node, _verify_input_dict, _ResultsCache, _T
+from .funcs_key_usage import (
+	KeyUsage as _KeyUsage, _has_brackets, pruned_dict as _pruned_dict, template_key_usage as _template_key_usage,
+)
+from .funcs_stats import timed as _timed
+from .node_formatter import _input_types as _input_types_formatter
+
+
+_dict = dict
+
+
+def _status_message(usage: _KeyUsage, n_keys: int) -> str:
+	lines = [f"Used keys: {len(usage.keys)} / {n_keys}"]
+	if usage.keys:
+		lines.append(', '.join(sorted(usage.keys)))
+	if usage.missing:
+		lines.append(f"Missing keys: {', '.join(sorted(usage.missing))}")
+	if not usage.complete:
+		lines.append(
+			"⚠️ Some keys might be built dynamically during recursive formatting - the dict is passed through unpruned."
+		)
+	return '\n'.join(lines)
+
+
+def _pruned_with_status(
+	template: str, recursive: bool, safe: bool, format_dict: _t.Dict[str, _T],
+) -> _t.Tuple[_t.Dict[str, _T], str]:
+	usage = _template_key_usage(template, format_dict, recursive=recursive, safe=safe)
+	out_dict = format_dict
+	# "String Formatter" returns the template intact if the dict is empty. In unsafe mode, it's not the same
+	# as formatting it with a dict with no referenced keys (escaped brackets are un-escaped, or an error is thrown):
+	if usage.complete and (usage.keys or safe or not _has_brackets(template)):
+		# The dict is already verified by the node:
+		out_dict = _pruned_dict(format_dict, usage.keys, keys_validated=True)
+	return out_dict, _status_message(usage, len(format_dict))
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	formatter_required = _input_types_formatter()['required']
+	return _deepfreeze({
+		'required': {
+			'template': (_IO.STRING, {'multiline': True, 'tooltip': (
+				"The text template - the same one you pass to \"String Formatter\" node. "
+				"Only the dict keys it references are kept."
+			)}),
+			'recursive_format': (_IO.BOOLEAN, {'default': True, 'label_on': 'yes', 'label_off': 'no', 'tooltip': (
+				"Also keep the keys referenced by the kept strings, and so on - as recursive formatting needs them.\n"
+				"Should match the option in \"String Formatter\" node."
+			)}),
+			'safe_format': formatter_required['safe_format'],
+			'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'used keys', 'label_off': 'no', 'tooltip': (
+				"Show the kept (and missing) keys on the node itself?"
+			)}),
+		},
+		'optional': {
+			'dict': _DataTypes.input_dict(tooltip="The dictionary to prune."),
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorDictPrune')
+
+
+class StringConstructorDictPrune:
+	"""
+	Remove all the entries a template doesn't reference from a Format-Dict.
+
+	The output dict gives the exact same formatted string, but it's smaller: faster to pass around, preview
+	and compare (for caching). In recursive mode, the strings referenced by the kept ones are kept, too.
+	If some references can't be known before the actual formatting (e.g., a key built from escaped brackets),
+	the dict is passed through intact.
+	"""
+	NODE_NAME = 'StringConstructorDictPrune'
+	CATEGORY = _meta.category_dict
+	DESCRIPTION = _LazyDescription()
+
+	OUTPUT_NODE = True  # Just to show the status message even if not connected to anything
+
+	FUNCTION = 'main'
+	RETURN_TYPES = (str(_DataTypes.DICT), )
+	RETURN_NAMES = (_DataTypes.DICT.lower(), )
+	# OUTPUT_TOOLTIPS = tuple()
+
+	@classmethod
+	def INPUT_TYPES(cls):
+		return _input_types()
+
+	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('template', 'dict'))
+	def main(
+		template: str,
+		recursive_format: bool = True,
+		safe_format: bool = True,
+		show_status: bool = False,
+		dict: _t.Dict[str, _T] = None,
+		unique_id: str = None,
+	) -> _t.Tuple[_t.Dict[str, _T]]:
+		if dict is None:
+			dict = _dict()
+		_verify_input_dict(dict)
+
+		recursive_format = bool(recursive_format)
+		safe_format = bool(safe_format)
+		out_dict, status_text = _results_cache.get_or_compute(
+			(template, recursive_format, safe_format, dict),
+			lambda: _pruned_with_status(template, recursive_format, safe_format, dict),
+		)
+		if show_status and unique_id:
+			_show_text_on_node(status_text, unique_id)
+		return (out_dict, )
@@ -6,35 +6,25 @@
 import typing as _t
 
 from dataclasses import dataclass as _dataclass, field as _field
-from inspect import cleandoc as _cleandoc
-import re as _re
+from functools import lru_cache as _lru_cache
 import sys as _sys
 
-from frozendict import deepfreeze as _deepfreeze
-
-from comfy.comfy_types.node_typing import IO as _IO
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
 
 from . import _meta
-from .docstring_formatter import format_docstring as _format_docstring
+from .docstring_formatter import LazyDescription as _LazyDescription
 from .enums import DataTypes as _DataTypes
-from .funcs_common import _show_text_on_node, _verify_input_dict
+from .format_dict import ResolvedDict as _ResolvedDict
+from .funcs_common import _show_text_on_node, _verify_input_dict, _ResultsCache
+from .funcs_recursive import _RecursiveExpander
+from .funcs_stats import timed as _timed
+from .funcs_template import _compile_template, _compiled_template, Template as _Template
 
 
 _RECURSION_LIMIT = max(int(_sys.getrecursionlimit()), 1)  # You can externally monkey-patch it... but if it blows up, your fault 🤷🏻‍♂️single
 
 __dataclass_slots_args = dict() if _sys.version_info < (3, 10) else dict(slots=True)
 
-_re_formatting_keyword_match = _re.compile(  # Pre-compiled regex match to extract ``{keyword}`` patterns
-	r'(?P<prefix>.*?)'
-	r'(?P<open_brackets>\{+)'
-	r'(?P<inside_brackets>[^{}]+)'
-	r'(?P<closed_brackets>\}+)'
-	r'(?P<suffix>[^{}].*)?$',
-	# flags=_re.DOTALL | _re.IGNORECASE,
-	flags = _re.DOTALL,  # We need dot to match new lines, too
-).match
-
-
 @_dataclass(**__dataclass_slots_args)
 class _Formatter:
 	"""
@@ -56,20 +46,33 @@ class _Formatter:
 	unique_node_id: str = None
 
 	__format_single: _t.Callable[[str], str] = _field(init=False, repr=False, compare=False, default=lambda x: x)
+	__format_single_intermediate: _t.Callable[[str], str] = _field(init=False, repr=False, compare=False, default=lambda x: x)
 	_format: _t.Callable[[str], str] = _field(init=False, repr=False, compare=False, default=lambda x: x)
+	__format_compiled: _t.Callable[[_Template], str] = _field(init=False, repr=False, compare=False, default=str)
+	__expander: _t.Optional[_RecursiveExpander] = _field(init=False, repr=False, compare=False, default=None)
 
 	def __post_init__(self):  # called by dataclass init
 		if self.format_dict is None:
 			self.format_dict = dict()
 
-		format_dict = self.format_dict
-		_verify_input_dict(format_dict)
+		_verify_input_dict(self.format_dict)
+		# Lazy values are computed only when referenced - and then, only once for all the formatting passes:
+		format_dict = self.format_dict = _ResolvedDict.wrap(self.format_dict)
 		self.__format_single = self.__format_single_safe if self.safe else self.__format_single_unsafe
+		self.__format_single_intermediate = (
+			self.__format_single_safe_uncached if self.safe else self.__format_single_unsafe
+		)
 
 		if format_dict:
 			self._format = self.__format_recursive if self.recursive else self.__format_single
+			self.__format_compiled = (
+				self.__format_compiled_recursive if self.recursive else self.__format_compiled_single
+			)
+			if self.recursive:
+				self.__expander = _RecursiveExpander(format_dict)
 		else:
 			self._format = self.__dummy_return_intact
+			self.__format_compiled = str
 
 	@staticmethod
 	def __dummy_return_intact(template: str) -> str:
@@ -78,142 +81,187 @@ def __dummy_return_intact(template: str) -> str:
 	def __format_single_unsafe(self, template: str):
 		return template.format_map(self.format_dict)
 
-	def __format_single_safe_parts_gen(self, template: str) -> _t.Generator[str, None, None]:
+	def __format_single_safe(self, template: str) -> str:
 		"""
+		Format the pattern (single iteration of formatting) in the safe mode.
+		Safe mode preserves any unknown ``{text patterns}`` inside curly brackets if they cannot be formatted.
+		Correctly handles any formatting patterns natively supported by python
+		(even the most fancy ones, involving ':', '!', attribute or index access, etc.).
+
+		Useful when JSON/CSS-like code is in the formatted template.
+
 		EAFP: https://docs.python.org/3/glossary.html#term-EAFP
 
 		Instead of pre-escaping the whole template
 		(which would require basically re-implementing the entire format-parsing logic),
-		let's extract individual formatted pieces, actually try formatting them one by one,
-		and return anything that cannot be formatted as-is - without any processing at all.
+		the template is split into individual formatted pieces (see ``funcs_template``), which are actually
+		formatted one by one - and anything that cannot be formatted is returned as-is, without any processing at all.
 
-		This generator returns such pieces - formatted or intact.
+		The template is parsed only once - the compiled result is cached. A well-formed template is first formatted
+		natively, in one go - and only if that fails, piece by piece (see ``_CompiledTemplate``).
 		"""
-		format_dict = self.format_dict
-		to_piece_template = '{{{}}}'.format
-
-		suffix: str = template
-		while suffix:
-			match = _re_formatting_keyword_match(suffix)
-			if not match:
-				break
-
-			prefix = match.group('prefix')
-			open_brackets = match.group('open_brackets')
-			inside_brackets = match.group('inside_brackets')
-			closed_brackets = match.group('closed_brackets')
-			suffix = match.group('suffix')
-
-			if prefix:
-				yield prefix
-
-			piece_template = to_piece_template(inside_brackets)
-			# noinspection PyBroadException
-			try:
-				formatted_piece = piece_template.format_map(format_dict)
-			except Exception:
-				# If, for ANY reason, we're unable to format the piece, return the template piece intact:
-				yield open_brackets
-				yield inside_brackets
-				yield closed_brackets
-				continue
-
-			# The key is found. Treat the piece as the actual formatting pattern.
-			# Formatting "eats" one set of brackets either way:
-			open_brackets = open_brackets[:-1]
-			closed_brackets = closed_brackets[:-1]
-
-			# Now, even though we've succeeded, the template might've been pre-escaped.
-			if open_brackets and closed_brackets:
-				# The keyword is already pre-escaped. Return it intact:
-				formatted_piece = inside_brackets
-
-			yield open_brackets
-			yield formatted_piece
-			yield closed_brackets
-
-		if suffix:
-			yield suffix
+		return _compiled_template(template, True).render(self.format_dict)
 
-	def __format_single_safe(self, template: str) -> str:
+	def __format_single_safe_uncached(self, template: str) -> str:
 		"""
-		Format the pattern (single iteration of formatting) in the safe mode.
-		Safe mode preserves any unknown ``{text patterns}`` inside curly brackets if they cannot be formatted.
-		Correctly handles any formatting patterns natively supported by python
-		(even the most fancy ones, involving ':', '!', attribute or index access, etc.).
-
-		Useful when JSON/CSS-like code is in the formatted template.
+		The same as ``__format_single_safe()``, but for one-off strings, which aren't worth caching
+		(like intermediate results of recursive formatting): they'd only push the actual templates out of the cache.
 		"""
-		return ''.join(self.__format_single_safe_parts_gen(template))
+		return _compile_template(template, True).render(self.format_dict)
+
+	def __format_compiled_single(self, template: _Template) -> str:
+		"""The same as ``__format_single()``, but with the template already compiled - so no cache lookup at all."""
+		return template.compiled(self.safe).render(self.format_dict)
 
-	def __format_recursive(self, template: str) -> str:
+	def __format_compiled_recursive(self, template: _Template) -> str:
+		return self.__format_recursive(template.text, template)
+
+	def __raise_recursion_error(self, msg: str):
+		if self.show_status and self.unique_node_id:
+			_show_text_on_node(msg, self.unique_node_id)
+		raise RecursionError(msg)
+
+	def __format_recursive(self, template: str, compiled: _t.Optional[_Template] = None) -> str:
 		"""
 		It's not actually recursive - because, you know, any recursion could be turned into iteration,
 		and good boys do that. 😊
+
+		First, the template is resolved as a graph of dict entries referencing each other
+		(see ``funcs_recursive``): each entry is expanded only once, and a cycle is reported immediately.
+		Only if it can't be done this way (escaped brackets, dynamically built keys, etc.), the template is
+		re-formatted as a whole, until it stops changing.
 		"""
 		assert isinstance(_RECURSION_LIMIT, int) and _RECURSION_LIMIT > 0
 
-		format_single_func = self.__format_single
-
-		prev: str = ''
-		new: str = template
-		for i in range(_RECURSION_LIMIT):
+		try:
+			expanded = self.__expander.expand(
+				template, _RECURSION_LIMIT, None if compiled is None else compiled.safe_compiled
+			)
+		except RecursionError as e:
+			self.__raise_recursion_error(f"{e}\nOn attempt to format a string: {template!r}")
+			# noinspection PyUnreachableCode
+			return ''  # just to be extra-safe, if RecursionError is treated as warning
+		if expanded is not None:
+			return expanded
+
+		format_single_func = self.__format_single_intermediate
+
+		prev: str = template
+		# Only the template itself is worth caching:
+		new: str = self.__format_single(template) if compiled is None else self.__format_compiled_single(compiled)
+		for i in range(_RECURSION_LIMIT - 1):
 			if prev == new:
 				return new
 			prev = new
 			new = format_single_func(new)
 
-		msg = (
+		self.__raise_recursion_error(
 			f"Recursion limit ({_RECURSION_LIMIT}) reached on attempt to format a string: {template!r}\n"
 			f"Last two formatting attempts:\n{prev!r}\n{new!r}"
 		)
-		if self.show_status and self.unique_node_id:
-			_show_text_on_node(msg, self.unique_node_id)
-		raise RecursionError(msg)
 		# noinspection PyUnreachableCode
 		return ''  # just to be extra-safe, if RecursionError is treated as warning
 
-	def __call__(self, template: str) -> str:
-		if not isinstance(template, str):
+	@_timed('formatter', sized_args=('template', 'self.format_dict'))
+	def __call__(self, template: _t.Union[str, _Template]) -> str:
+		if isinstance(template, _Template):
+			out_text = self.__format_compiled(template) if template.text else ''
+		elif isinstance(template, str):
+			out_text = self._format(template) if template else ''
+		else:
 			raise TypeError(f"Not a string: {template!r}")
 
-		out_text = self._format(template) if template else ''
 		if self.show_status and self.unique_node_id:
 			_show_text_on_node(out_text, self.unique_node_id)
 		return out_text
 
+
+def _broadcast_batch_size(n_templates: int, n_dicts: int) -> int:
+	"""
+	The number of strings in a batch: templates and dicts are paired one-to-one,
+	or a single one is paired with every item from the other list.
+	"""
+	if n_templates == n_dicts or n_dicts == 1:
+		return n_templates
+	if n_templates == 1:
+		return n_dicts
+	raise ValueError(
+		f"Batch formatting needs either a single template, or a single dict, or the same number of both. "
+		f"Got: {n_templates} templates and {n_dicts} dicts."
+	)
+
+
+def _formatted_batch(
+	templates: _t.Sequence[str],
+	dicts: _t.Sequence[_t.Optional[_t.Dict[str, _t.Any]]],
+	recursive: bool = False,
+	safe: bool = True,
+) -> _t.List[str]:
+	"""
+	Format multiple strings in one go: see ``_broadcast_batch_size()`` for how templates and dicts are paired.
+
+	Each dict is validated only once - no matter how many templates it's used with, and each template is compiled
+	only once - no matter how many dicts it's used with.
+	"""
+	if not dicts:
+		dicts = [None]
+	n_templates = len(templates)
+	n_dicts = len(dicts)
+	batch_size = _broadcast_batch_size(n_templates, n_dicts)
+
+	formatters = [
+		_Formatter(format_dict=d, recursive=recursive, safe=safe, show_status=False)
+		for d in dicts
+	]
+	return [
+		formatters[i if n_dicts > 1 else 0](templates[i if n_templates > 1 else 0])
+		for i in range(batch_size)
+	]
+
 # --------------------------------------
 
-_input_types = _deepfreeze({
-	'required': {
-		'template': (_IO.STRING, {'multiline': True, 'tooltip': (
-			"Type the text template. "
-			"To reference named substrings from format-dictionary, use this syntax: {substring_name}. For example:\n\n"
-			"score_9, score_8_up, score_7_up, {char1_short}, standing next to {char2_short},\n"
-			"{char1_long}\n{char2_long}"
-		)}),
-		'recursive_format': (_IO.BOOLEAN, {'default': False, 'label_on': '❗ yes', 'label_off': 'no', 'tooltip': (
-			"Do recursive format - i.e., allow the chunks from the dictionary to reference other chunks."
-		)}),
-		'safe_format': (_IO.BOOLEAN, {'default': True, 'label_on': 'yes', 'label_off': 'no', 'tooltip': (
-			"If template contains an invalid {text pattern} which can't be formatted - leave it as-is "
-			"(instead of throwing an error).\n"
-			"Safe mode is recommended for templates with JSON, CSS, or other literal curly brackets."
-		)}),
-		'show_status': (_IO.BOOLEAN, {'default': True, 'label_on': 'formatted string', 'label_off': 'no', 'tooltip': (
-			"Show the final string constructed from the text-template and format-dictionary?"
-		)}),
-	},
-	'optional': {
-		'dict': _DataTypes.input_dict(tooltip=(  # It's not actually optional, but is here since there's no dict-widget
-			"The dictionary to take named sub-strings from. It could be left unconnected, if the pattern doesn't reference "
-			"any sub-strings - then, this node acts exactly the same as a regular string-primitive node."
-		)),
-	},
-	'hidden': {
-		'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
-	},
-})
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'template': (_IO.STRING, {'multiline': True, 'tooltip': (
+				"Type the text template. "
+				"To reference named substrings from format-dictionary, use this syntax: {substring_name}. For example:\n\n"
+				"score_9, score_8_up, score_7_up, {char1_short}, standing next to {char2_short},\n"
+				"{char1_long}\n{char2_long}"
+			)}),
+			'recursive_format': (_IO.BOOLEAN, {'default': False, 'label_on': '❗ yes', 'label_off': 'no', 'tooltip': (
+				"Do recursive format - i.e., allow the chunks from the dictionary to reference other chunks."
+			)}),
+			'safe_format': (_IO.BOOLEAN, {'default': True, 'label_on': 'yes', 'label_off': 'no', 'tooltip': (
+				"If template contains an invalid {text pattern} which can't be formatted - leave it as-is "
+				"(instead of throwing an error).\n"
+				"Safe mode is recommended for templates with JSON, CSS, or other literal curly brackets."
+			)}),
+			'show_status': (_IO.BOOLEAN, {'default': True, 'label_on': 'formatted string', 'label_off': 'no', 'tooltip': (
+				"Show the final string constructed from the text-template and format-dictionary?"
+			)}),
+		},
+		'optional': {
+			'dict': _DataTypes.input_dict(tooltip=(  # It's not actually optional, but is here since there's no dict-widget
+				"The dictionary to take named sub-strings from. It could be left unconnected, if the pattern doesn't reference "
+				"any sub-strings - then, this node acts exactly the same as a regular string-primitive node."
+			)),
+			'compiled_template': _DataTypes.input_template(tooltip=(
+				"A template from \"Compile Template\" node. If connected, it's used instead of the text template above - "
+				"already parsed, so it isn't parsed again by each formatter it's connected to."
+			)),
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorFormatter')
 
 
 class StringConstructorFormatter:
@@ -222,32 +270,44 @@ class StringConstructorFormatter:
 	"""
 	NODE_NAME = 'StringConstructorFormatter'
 	CATEGORY = _meta.category
-	DESCRIPTION = _format_docstring(_cleandoc(__doc__))
+	DESCRIPTION = _LazyDescription()
 
 	OUTPUT_NODE = True
 
 	FUNCTION = 'main'
-	RETURN_TYPES = (_IO.STRING, )
+	RETURN_TYPES = ('STRING', )
 	RETURN_NAMES = ('string', )
 	# OUTPUT_TOOLTIPS = tuple()
 
 	@classmethod
 	def INPUT_TYPES(cls):
-		return _input_types
+		return _input_types()
 
 	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('template', 'dict'))
 	def main(
 		template: str,
 		recursive_format: bool = False,
 		safe_format: bool = True,
 		show_status: bool = False,
 		dict: _t.Dict[str, _t.Any] = None,  #actually, required - but it's here to keep the declared params order
+		compiled_template: _Template = None,
 		unique_id: str = None
 	) -> _t.Tuple[str]:
+		if compiled_template is not None:
+			template = compiled_template
+		cache_key = (template, bool(recursive_format), bool(safe_format), dict)
+		out_text = _results_cache.get(cache_key)
+		if out_text is not None:
+			if show_status and unique_id:
+				_show_text_on_node(out_text, unique_id)
+			return (out_text, )
+
 		formatter = _Formatter(
 			format_dict=dict,
 			recursive=recursive_format, safe=safe_format,
 			show_status=show_status, unique_node_id=unique_id,
 		)
 		out_text = formatter(template)
+		_results_cache.put(cache_key, out_text)
 		return (out_text, )
@@ -0,0 +1,106 @@
+# encoding: utf-8
+"""
+Code for ``StringConstructorFormatterBatch`` node.
+"""
+
+import typing as _t
+
+from functools import lru_cache as _lru_cache
+
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
+
+from . import _meta
+from .docstring_formatter import LazyDescription as _LazyDescription
+from .enums import DataTypes as _DataTypes
+from .funcs_common import _show_text_on_node, _status_enabled
+from .funcs_stats import timed as _timed
+from .node_formatter import _input_types as _input_types_single
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'template': (_IO.STRING, {'multiline': True, 'tooltip': (
+				"The text template (or a list of them, if connected). "
+				'The syntax is the same as in the regular "String Formatter" node.'
+			)}),
+			'recursive_format': _input_types_single()['required']['recursive_format'],
+			'safe_format': _input_types_single()['required']['safe_format'],
+			'show_status': (_IO.BOOLEAN, {'default': True, 'label_on': 'formatted strings', 'label_off': 'no', 'tooltip': (
+				"Show all the final strings constructed from the text-templates and format-dictionaries?"
+			)}),
+			'parallel': (_IO.BOOLEAN, {'default': False, 'label_on': 'yes', 'label_off': 'no', 'tooltip': (
+				"Split huge batches (thousands of strings) between multiple processes. "
+				"Smaller batches are formatted in a single process anyway."
+			)}),
+		},
+		'optional': {
+			'dict': _DataTypes.input_dict(tooltip=(
+				"The dictionary (or a list of them) to take named sub-strings from.\n"
+				"A single template is formatted with each dict, or each template is formatted with a single dict, "
+				"or they're paired one-to-one if there's the same number of both."
+			)),
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+def _first_or_default(values: _t.Optional[_t.List[_t.Any]], default=None):
+	"""With ``INPUT_IS_LIST``, even widget values come as lists."""
+	if not values:
+		return default
+	return values[0]
+
+
+class StringConstructorFormatterBatch:
+	"""
+	Construct a list of formatted strings in one go: from a single template and a list of format-dictionaries,
+	or from a list of templates and a single format-dictionary.
+	"""
+	NODE_NAME = 'StringConstructorFormatterBatch'
+	CATEGORY = _meta.category
+	DESCRIPTION = _LazyDescription()
+
+	OUTPUT_NODE = True
+
+	INPUT_IS_LIST = True
+	OUTPUT_IS_LIST = (True, )
+
+	FUNCTION = 'main'
+	RETURN_TYPES = ('STRING', )
+	RETURN_NAMES = ('strings', )
+	# OUTPUT_TOOLTIPS = tuple()
+
+	@classmethod
+	def INPUT_TYPES(cls):
+		return _input_types()
+
+	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('template', 'dict'))
+	def main(
+		template: _t.List[str],
+		recursive_format: _t.List[bool] = None,
+		safe_format: _t.List[bool] = None,
+		show_status: _t.List[bool] = None,
+		parallel: _t.List[bool] = None,
+		dict: _t.List[_t.Dict[str, _t.Any]] = None,
+		unique_id: _t.List[str] = None,
+	) -> _t.Tuple[_t.List[str]]:
+		# Imported only when actually used: it brings in the whole `multiprocessing` machinery
+		from .funcs_batch import format_batch as _format_batch
+
+		out_strings = _format_batch(
+			template, dict,
+			recursive=_first_or_default(recursive_format, False), safe=_first_or_default(safe_format, True),
+			parallel=_first_or_default(parallel, False),
+		)
+		unique_id = _first_or_default(unique_id)
+		if _first_or_default(show_status, False) and unique_id and _status_enabled():
+			_show_text_on_node('\n\n'.join(out_strings), unique_id)
+		return (out_strings, )
@@ -0,0 +1,121 @@
+# encoding: utf-8
+"""
+Code for ``StringConstructorFormatterCombinations`` node.
+"""
+
+import typing as _t
+
+from functools import lru_cache as _lru_cache
+
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
+
+from . import _meta
+from .docstring_formatter import LazyDescription as _LazyDescription
+from .funcs_alternatives import Expansion as _Expansion
+from .funcs_common import _show_text_on_node, _status_enabled, _ResultsCache
+from .funcs_stats import timed as _timed
+from .node_formatter import _input_types as _input_types_single
+
+
+_MAX_BATCH_SIZE = 1024  # The most strings output by a single run
+_MAX_SEED = 0xFFFFFFFFFFFFFFFF
+
+
+def _combinations_batch(
+	template: str, format_dict: _t.Optional[_t.Dict[str, _t.Any]],
+	recursive: bool, safe: bool, shuffle: bool, seed: int, offset: int, batch_size: int,
+) -> _t.Tuple[_t.List[str], int]:
+	"""The formatted strings of a single batch + the total number of combinations."""
+	expansion = _Expansion(template, format_dict, recursive=recursive, safe=safe)
+	out_strings = list(expansion.strings_gen(offset, batch_size, seed if shuffle else None))
+	return out_strings, expansion.total
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	single_required = _input_types_single()['required']
+	return _deepfreeze({
+		'required': {
+			'template': single_required['template'],
+			'recursive_format': single_required['recursive_format'],
+			'safe_format': single_required['safe_format'],
+			'shuffle': (_IO.BOOLEAN, {'default': False, 'label_on': 'seeded', 'label_off': 'in order', 'tooltip': (
+				"Go through the combinations in a random (but seeded, thus repeatable) order - to get a random sample "
+				"of them with no repetitions. Otherwise, they're in order: the last key changes first."
+			)}),
+			'seed': (_IO.INT, {'default': 0, 'min': 0, 'max': _MAX_SEED, 'tooltip': (
+				"The seed for the shuffled order."
+			)}),
+			'offset': (_IO.INT, {'default': 0, 'min': 0, 'max': _MAX_SEED, 'tooltip': (
+				"The index of the first combination to output - to go through all of them in multiple runs."
+			)}),
+			'batch_size': (_IO.INT, {'default': 16, 'min': 1, 'max': _MAX_BATCH_SIZE, 'tooltip': (
+				"The most strings to output in a single run."
+			)}),
+			'show_status': (_IO.BOOLEAN, {'default': True, 'label_on': 'formatted strings', 'label_off': 'no', 'tooltip': (
+				"Show the output strings (and the total number of combinations) on the node itself?"
+			)}),
+		},
+		'optional': {
+			'dict': _input_types_single()['optional']['dict'],
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorFormatterCombinations')
+
+
+class StringConstructorFormatterCombinations:
+	"""
+	Format the template with each combination of the alternative values it uses
+	(see the "alternatives" option of "Dict from Text" node) - and output them as a list.
+
+	The combinations are generated one by one, only the ones in the current batch: so there could be millions of them.
+	To go through all of them, increment the offset by the batch size on each run.
+	"""
+	NODE_NAME = 'StringConstructorFormatterCombinations'
+	CATEGORY = _meta.category
+	DESCRIPTION = _LazyDescription()
+
+	OUTPUT_NODE = True
+
+	OUTPUT_IS_LIST = (True, False)
+
+	FUNCTION = 'main'
+	RETURN_TYPES = ('STRING', 'INT')
+	RETURN_NAMES = ('strings', 'total')
+	# OUTPUT_TOOLTIPS = tuple()
+
+	@classmethod
+	def INPUT_TYPES(cls):
+		return _input_types()
+
+	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('template', 'dict'))
+	def main(
+		template: str,
+		recursive_format: bool = False,
+		safe_format: bool = True,
+		shuffle: bool = False,
+		seed: int = 0,
+		offset: int = 0,
+		batch_size: int = 16,
+		show_status: bool = True,
+		dict: _t.Dict[str, _t.Any] = None,
+		unique_id: str = None,
+	) -> _t.Tuple[_t.List[str], int]:
+		args = (
+			template, dict, bool(recursive_format), bool(safe_format), bool(shuffle),
+			int(seed), max(int(offset), 0), min(max(int(batch_size), 1), _MAX_BATCH_SIZE),
+		)
+		out_strings, total = _results_cache.get_or_compute(args, lambda: _combinations_batch(*args))
+		if show_status and unique_id and _status_enabled():
+			status_text = '\n\n'.join(out_strings)
+			_show_text_on_node(f"{len(out_strings)} of {total} combinations\n\n{status_text}", unique_id)
+		return (out_strings, total)
@@ -0,0 +1,117 @@
+# encoding: utf-8
+"""
+Code for ``StringConstructorFormatterMulti`` node.
+"""
+
+import typing as _t
+
+from functools import lru_cache as _lru_cache
+
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
+
+from . import _meta
+from .docstring_formatter import LazyDescription as _LazyDescription
+from .funcs_common import _show_text_on_node, _status_enabled, _ResultsCache
+from .funcs_stats import timed as _timed
+from .node_formatter import _Formatter, _input_types as _input_types_single
+
+
+_N_TEMPLATES = 4
+
+
+def _formatted_many(
+	templates: _t.Sequence[str],
+	format_dict: _t.Optional[_t.Dict[str, _t.Any]] = None,
+	recursive: bool = False,
+	safe: bool = True,
+) -> _t.Tuple[str, ...]:
+	"""
+	Format several templates with the same dict, by a single formatter: the dict is validated only once,
+	its lazy values are computed only once, and (in recursive mode) each of its entries is expanded only once -
+	for all the templates together.
+	"""
+	formatter = _Formatter(format_dict=format_dict, recursive=recursive, safe=safe, show_status=False)
+	return tuple(formatter(template) for template in templates)
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	single_required = _input_types_single()['required']
+	single_optional = _input_types_single()['optional']
+	templates = {
+		f'template_{i}': (_IO.STRING, {'multiline': True, 'tooltip': (
+			f"Text template #{i}. "
+			'The syntax is the same as in the regular "String Formatter" node. Leave it empty if not needed.'
+		)})
+		for i in range(1, _N_TEMPLATES + 1)
+	}
+	return _deepfreeze({
+		'required': {
+			**templates,
+			'recursive_format': single_required['recursive_format'],
+			'safe_format': single_required['safe_format'],
+			'show_status': (_IO.BOOLEAN, {'default': True, 'label_on': 'formatted strings', 'label_off': 'no', 'tooltip': (
+				"Show all the final strings constructed from the text-templates and format-dictionary?"
+			)}),
+		},
+		'optional': {
+			'dict': single_optional['dict'],
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorFormatterMulti')
+
+
+class StringConstructorFormatterMulti:
+	"""
+	Construct several formatted strings from the same format-dictionary at once
+	(e.g., a positive prompt, a negative one and a file name).
+
+	It's the same as multiple "String Formatter" nodes with the same dict, but the dict is prepared only once
+	for all the templates: with recursive formatting, each sub-string referenced by many templates is expanded once.
+	"""
+	NODE_NAME = 'StringConstructorFormatterMulti'
+	CATEGORY = _meta.category
+	DESCRIPTION = _LazyDescription()
+
+	OUTPUT_NODE = True
+
+	FUNCTION = 'main'
+	RETURN_TYPES = ('STRING', ) * _N_TEMPLATES
+	RETURN_NAMES = tuple(f'string_{i}' for i in range(1, _N_TEMPLATES + 1))
+	# OUTPUT_TOOLTIPS = tuple()
+
+	@classmethod
+	def INPUT_TYPES(cls):
+		return _input_types()
+
+	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('dict', ))
+	def main(
+		template_1: str = '',
+		template_2: str = '',
+		template_3: str = '',
+		template_4: str = '',
+		recursive_format: bool = False,
+		safe_format: bool = True,
+		show_status: bool = False,
+		dict: _t.Dict[str, _t.Any] = None,
+		unique_id: str = None,
+	) -> _t.Tuple[str, ...]:
+		templates = (template_1, template_2, template_3, template_4)
+		recursive_format = bool(recursive_format)
+		safe_format = bool(safe_format)
+		out_strings = _results_cache.get_or_compute(
+			(templates, recursive_format, safe_format, dict),
+			lambda: _formatted_many(templates, dict, recursive=recursive_format, safe=safe_format),
+		)
+		if show_status and unique_id and _status_enabled():
+			_show_text_on_node('\n\n'.join(s for s in out_strings if s), unique_id)
+		return out_strings
@@ -0,0 +1,73 @@
+# encoding: utf-8
+"""
+"""
+
+import typing as _t
+
+from functools import lru_cache as _lru_cache
+
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
+
+from . import _meta
+from .docstring_formatter import LazyDescription as _LazyDescription
+from .enums import DataTypes as _DataTypes
+from .funcs_common import _show_text_on_node, _ResultsCache
+from .funcs_stats import timed as _timed
+from .funcs_template import Template as _Template
+from .node_formatter import _input_types as _input_types_formatter
+
+
+def _status_message(template: _Template) -> str:
+	lines = [f"Keys: {', '.join(sorted(template.keys)) or '-'}"]
+	if template.has_escapes:
+		lines.append("Has escaped/unpaired curly brackets")
+	return '\n'.join(lines)
+
+
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	from comfy.comfy_types.node_typing import IO as _IO
+
+	return _deepfreeze({
+		'required': {
+			'template': _input_types_formatter()['required']['template'],
+			'show_status': (_IO.BOOLEAN, {'default': False, 'label_on': 'referenced keys', 'label_off': 'no', 'tooltip': (
+				"Show the dict keys referenced by the template on the node itself?"
+			)}),
+		},
+		'hidden': {
+			'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		},
+	})
+
+
+_results_cache = _ResultsCache(name='results.StringConstructorTemplateCompile')
+
+
+class StringConstructorTemplateCompile:
+	"""
+	Parse the text template once - and pass it to any number of "String Formatter" nodes, already compiled.
+	"""
+	NODE_NAME = 'StringConstructorTemplateCompile'
+	CATEGORY = _meta.category
+	DESCRIPTION = _LazyDescription()
+
+	FUNCTION = 'main'
+	RETURN_TYPES = (str(_DataTypes.TEMPLATE), )
+	RETURN_NAMES = (_DataTypes.TEMPLATE.lower(), )
+	# OUTPUT_TOOLTIPS = tuple()
+
+	@classmethod
+	def INPUT_TYPES(cls):
+		return _input_types()
+
+	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('template', ))
+	def main(template: str, show_status: bool = False, unique_id: str = None) -> _t.Tuple[_Template]:
+		template = str(template)
+		# The same text gives the very same object - so the formatters' own caches hit it by identity:
+		compiled = _results_cache.get_or_compute((template, ), lambda: _Template.from_text(template))
+		if show_status and unique_id:
+			_show_text_on_node(_status_message(compiled), unique_id)
+		return (compiled, )
@@ -4,25 +4,29 @@
 
 import typing as _t
 
-from inspect import cleandoc as _cleandoc
+from functools import lru_cache as _lru_cache
 
-from frozendict import deepfreeze as _deepfreeze
+from frozendict import deepfreeze as _deepfreeze, frozendict as _frozendict
 
 from . import _meta
-from .docstring_formatter import format_docstring as _format_docstring
+from .docstring_formatter import LazyDescription as _LazyDescription
 from .enums import DataTypes as _DataTypes
 from .funcs_common import _verify_input_dict, _show_text_on_node, _T
+from .funcs_stats import timed as _timed
 
 
-_input_types = _deepfreeze({
-	'required': {
-		'dict': _DataTypes.input_dict(),
-	},
-	# 'optional': {},
-	# 'hidden': {
-	# 	'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
-	# },
-})
+@_lru_cache(maxsize=None)
+def _input_types() -> _frozendict:
+	"""Built only on the first access - and then, the same frozen dict is re-used."""
+	return _deepfreeze({
+		'required': {
+			'dict': _DataTypes.input_dict(),
+		},
+		# 'optional': {},
+		# 'hidden': {
+		# 	'unique_id': 'UNIQUE_ID',  # used for text display at the bottom of the node
+		# },
+	})
 
 
 class StringConstructorValidateKeys:
@@ -32,7 +36,7 @@ class StringConstructorValidateKeys:
 	"""
 	NODE_NAME = 'StringConstructorValidateKeys'
 	CATEGORY = _meta.category_dict
-	DESCRIPTION = _format_docstring(_cleandoc(__doc__))
+	DESCRIPTION = _LazyDescription()
 
 	OUTPUT_NODE = True
 
@@ -43,9 +47,10 @@ class StringConstructorValidateKeys:
 
 	@classmethod
 	def INPUT_TYPES(cls):
-		return _input_types
+		return _input_types()
 
 	@staticmethod
+	@_timed(f'node.{NODE_NAME}', sized_args=('dict', ))
 	def main(
 		dict: _t.Dict[str, _T],
 		# unique_id: str = None,
@@ -0,0 +1,12 @@
+# encoding: utf-8
+"""
+The tests import the node-pack modules the same way the benchmarks do (see ``benchmarks/_bootstrap.py``):
+as a bare package, with ComfyUI stand-ins used only if ComfyUI itself isn't importable.
+"""
+
+from pathlib import Path as _Path
+import sys as _sys
+
+_BENCHMARKS_DIR = str(_Path(__file__).resolve().parent.parent / 'benchmarks')
+if _BENCHMARKS_DIR not in _sys.path:
+	_sys.path.append(_BENCHMARKS_DIR)
@@ -0,0 +1,89 @@
+# encoding: utf-8
+"""
+``Dict from Text`` parses its text as a stream of blocks: the result must be the same as parsing
+the whole text split with ``str.splitlines()`` - no matter where the block boundaries fall.
+"""
+
+import io
+import random
+
+import pytest
+
+from _bootstrap import pack_module
+
+node_dict_from_text = pack_module('node_dict_from_text')
+
+_BLOCK_SIZES = [1, 2, 3, 5, 8]
+
+
+def _reference_pairs(text: str, strip_lines: bool):
+	"""The parser of the earlier versions: the whole text is split into lines at once."""
+	pairs = list()
+	chunk = list()
+	for line in text.splitlines():
+		if line.strip():
+			chunk.append(line.strip() if strip_lines else line)
+			continue
+		if chunk:
+			pairs.append((chunk[0].strip(), '\n'.join(chunk[1:])))
+			chunk = list()
+	if chunk:
+		pairs.append((chunk[0].strip(), '\n'.join(chunk[1:])))
+	return pairs
+
+
+def _parsed(text, strip_lines: bool, block_size: int, alternatives: bool = False):
+	pairs = node_dict_from_text._parsed_kv_pairs_gen(text, strip_lines=strip_lines, block_size=block_size)
+	if alternatives:
+		pairs = node_dict_from_text._with_alternatives_gen(pairs)
+	return list(pairs)
+
+
+_TEXTS = [
+	'a\r\nA1\r\nA2\r\n\r\nb\r\nB\r\n',  # '\r\n' pairs and blank-line separators at every possible offset
+	'a\rA\r\rb\rB',
+	'a\nA\n\n\n\nb\nB\n\n',
+	'a\n  A1  \n\t\n b \n B \r\n \r\n',
+	'a A\x0b\x0cb\x1cB\x1d\x1e\x85c C',
+	'key only\n\nb\nB',
+	'',
+	'\r\n\r\n',
+]
+
+
+@pytest.mark.parametrize('block_size', _BLOCK_SIZES)
+@pytest.mark.parametrize('text', _TEXTS)
+def test_lines_across_blocks(text, block_size):
+	lines = node_dict_from_text._lines_gen(node_dict_from_text._text_blocks_gen(text, block_size))
+	assert list(lines) == text.splitlines()
+
+
+@pytest.mark.parametrize('block_size', _BLOCK_SIZES)
+@pytest.mark.parametrize('text', _TEXTS)
+@pytest.mark.parametrize('strip_lines', [True, False])
+def test_chunks_across_blocks(text, block_size, strip_lines):
+	assert _parsed(text, strip_lines, block_size) == _reference_pairs(text, strip_lines)
+	assert _parsed(io.StringIO(text, newline=''), strip_lines, block_size) == _reference_pairs(text, strip_lines)
+
+
+@pytest.mark.parametrize('block_size', _BLOCK_SIZES)
+def test_alternatives_across_blocks(block_size):
+	text = 'hair\r\nblond\r\nred\r\n\r\npose\rsitting\r\n\r\nsingle\r\nvalue\r\nline\r\n'
+	alternatives_class = node_dict_from_text._Alternatives
+	expected = [
+		('hair', alternatives_class(('blond', 'red'))),
+		('pose', 'sitting'),
+		('single', alternatives_class(('value', 'line'))),
+	]
+	assert _parsed(text, True, block_size, alternatives=True) == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_texts(seed):
+	rnd = random.Random(seed)
+	alphabet = ['a', 'b', ' ', '\n', '\r', '\r\n', '\n\n', '\r\n\r\n', '\x0b', ' ', '\x85']
+	for _ in range(500):
+		text = ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+		block_size = rnd.randint(1, 8)
+		for strip_lines in (True, False):
+			assert _parsed(text, strip_lines, block_size) == _reference_pairs(text, strip_lines), (text, block_size)
@@ -0,0 +1,80 @@
+# encoding: utf-8
+
+import gc
+import weakref
+
+from _bootstrap import pack_module
+
+format_dict = pack_module('format_dict')
+node_dict_preview = pack_module('node_dict_preview')
+
+
+class _CountingLayer(format_dict.LazyLayer):
+	__slots__ = ('items', 'loaded')
+
+	def __init__(self, items):
+		self.items = dict(items)
+		self.loaded = list()
+
+	def __getitem__(self, key):
+		value = self.items[key]
+		self.loaded.append(key)
+		return value
+
+	def __len__(self):
+		return len(self.items)
+
+	def __iter__(self):
+		return iter(self.items)
+
+	def __contains__(self, key):
+		return key in self.items
+
+
+class _Opaque:
+	pass
+
+
+def _diff(old_snapshot, new_dict):
+	return node_dict_preview._diff_message(old_snapshot, new_dict)
+
+
+def test_changed_entries():
+	old = format_dict.FormatDict.from_mapping({'a': 'A', 'b': 'B', 'c': (1, 2)})
+	new = old.updated({'b': 'B2', 'd': 'D'}).delete('a')
+	_, snapshot = _diff(None, old)
+	assert node_dict_preview._changed_keys(snapshot, new)[:2] == (['b', 'd'], ['a'])
+	assert _diff(snapshot, old)[0] == "No changes since the last run."
+	assert _diff(snapshot, dict(old))[0] == "No changes since the last run."
+
+
+def test_lazy_library_isnt_loaded():
+	layer = _CountingLayer({'x': 'X', 'y': 'Y'})
+	lib = format_dict.FormatDict.from_mapping({'a': 'A'}).updated_lazy(layer)
+	_, snapshot = _diff(None, format_dict.FormatDict.from_mapping(None).updated_lazy(layer))
+	layer.loaded.clear()  # The first run previews all the entries
+	message, _ = _diff(snapshot, lib)
+	assert message.startswith("Changed since the last run: 1 added/modified, 0 removed.")
+	assert layer.loaded == []
+
+	other_layer = _CountingLayer(layer.items)
+	other_lib = format_dict.FormatDict.from_mapping(None).updated_lazy(other_layer)
+	changed, removed, _ = node_dict_preview._changed_keys(snapshot, other_lib)
+	assert (changed, removed) == (['x', 'y'], [])  # Not known to be the same items
+	assert layer.loaded == other_layer.loaded == []
+
+
+def test_shown_values_arent_kept_alive():
+	value = _Opaque()
+	lazy_value = format_dict.LazyValue(lambda: 'lazy')
+	shown = format_dict.FormatDict.from_mapping({'opaque': value, 'lazy': lazy_value, 'text': 'T' * 1000})
+	_, snapshot = _diff(None, shown)
+	assert node_dict_preview._changed_keys(snapshot, shown)[:2] == ([], [])
+
+	value_ref, lazy_ref = weakref.ref(value), weakref.ref(lazy_value)
+	del value, lazy_value, shown
+	gc.collect()
+	assert value_ref() is None and lazy_ref() is None
+
+	replacement = format_dict.FormatDict.from_mapping({'opaque': _Opaque(), 'lazy': 'x', 'text': 'T' * 1000})
+	assert node_dict_preview._changed_keys(snapshot, replacement)[:2] == (['lazy', 'opaque'], [])
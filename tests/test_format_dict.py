@@ -0,0 +1,79 @@
+# encoding: utf-8
+
+from _bootstrap import pack_module
+
+format_dict = pack_module('format_dict')
+funcs_file_index = pack_module('funcs_file_index')
+node_formatter = pack_module('node_formatter')
+
+FormatDict = format_dict.FormatDict
+
+
+def _library(tmp_path) -> str:
+	path = tmp_path / 'library.txt'
+	path.write_text('a\nvalue a\n\nb\nvalue b\n\nc\nvalue c\n', encoding='utf-8')
+	return str(path)
+
+
+def _loaded_keys():
+	return sorted(key for _, key in funcs_file_index._values_cache)
+
+
+def test_eq_doesnt_load_lazy_layers(tmp_path):
+	funcs_file_index._clear_values_cache()
+	path = _library(tmp_path)
+	dict1 = funcs_file_index.indexed_text_file_dict(path).updated({'x': 'y'})
+	dict2 = funcs_file_index.indexed_text_file_dict(path).updated({'x': 'y'})
+	assert dict1 == dict2
+	assert dict1 != funcs_file_index.indexed_text_file_dict(path).updated({'x': 'z'})
+	assert _loaded_keys() == []
+
+
+def test_results_cache_lookup_doesnt_load_lazy_layers(tmp_path):
+	funcs_file_index._clear_values_cache()
+	path = _library(tmp_path)
+	main = node_formatter.StringConstructorFormatter.main
+	assert main('{b}', dict=funcs_file_index.indexed_text_file_dict(path))[0] == 'value b'
+	assert main('{b}', dict=funcs_file_index.indexed_text_file_dict(path))[0] == 'value b'
+	assert _loaded_keys() == ['b']
+
+
+def test_eq_eager_layers():
+	dict1 = FormatDict.from_mapping({'a': 1, 'b': 'x'}).updated({'c': (1, 2)})
+	dict2 = FormatDict.from_mapping({'c': (1, 2), 'b': 'x'}).updated({'a': 1})
+	assert dict1 == dict2
+	assert dict1 == {'a': 1, 'b': 'x', 'c': (1, 2)}
+	assert dict1 != dict2.updated({'a': 2})
+
+
+def test_lazy_library_is_plain_data(tmp_path):
+	funcs_file_index._clear_values_cache()
+	library = funcs_file_index.indexed_text_file_dict(_library(tmp_path))
+	layer = library._layer
+	assert isinstance(layer, funcs_file_index._LazyTextFileDict)
+	assert format_dict.is_plain_value(layer)
+	assert not library.has_opaque_values
+	assert not library.updated({'x': 'y'}).has_opaque_values
+	assert _loaded_keys() == []
+
+
+def test_json_round_trip():
+	import json
+
+	dict_in = FormatDict.from_mapping({'a': 'x', 'b': 1.5}).updated({'c': (1, 2), 'd': {'e': None}})
+	assert json.loads(json.dumps(dict_in)) == {'a': 'x', 'b': 1.5, 'c': [1, 2], 'd': {'e': None}}
+	assert json.loads(json.dumps({'nested': dict_in}, indent=4)) == {'nested': json.loads(json.dumps(dict_in))}
+
+
+def test_frozendict_api():
+	from frozendict import frozendict
+
+	dict_in = FormatDict.from_mapping({'a': 1, 'b': 2}, keys_validated=True)
+	assert dict_in.copy() is dict_in
+	assert dict_in.set('c', 3) == {'a': 1, 'b': 2, 'c': 3}
+	assert dict_in.delete('a') == {'b': 2}
+	assert dict_in | {'b': 20, 'c': 3} == {'a': 1, 'b': 20, 'c': 3}
+	assert dict_in | FormatDict.from_mapping({'b': 20}) == {'a': 1, 'b': 20}
+	assert {'b': 20, 'c': 3} | dict_in == {'a': 1, 'b': 2, 'c': 3}
+	assert frozendict(c=3) | dict_in == {'a': 1, 'b': 2, 'c': 3}
+	assert isinstance({'c': 3} | dict_in, FormatDict)
@@ -0,0 +1,140 @@
+# encoding: utf-8
+"""
+In safe mode, a template is first formatted natively, in one go - and only if it fails, piece by piece
+(with the pre-parsed field formatters). Whichever path is taken, the result must be the same
+as formatting each piece with ``str.format_map()`` on its own.
+"""
+
+import random
+
+import pytest
+
+from _bootstrap import pack_module
+
+funcs_template = pack_module('funcs_template')
+node_formatter = pack_module('node_formatter')
+
+
+class _Reprs:
+	def __str__(self):
+		return 'as-str'
+
+	def __repr__(self):
+		return 'as-repr'
+
+	def __format__(self, format_spec):
+		return f'as-format[{format_spec}]'
+
+
+class _FormatFails:
+	def __format__(self, format_spec):
+		raise RuntimeError("Can't format")
+
+
+class _WithAttrs:
+	name = 'attr'
+	items = ['i0', 'i1']
+
+
+_FORMAT_DICT = {
+	'a': 'A',
+	'n': 3.14159,
+	'i': 42,
+	'list': ['L0', 'L1', 'L2'],
+	'map': {'k': 'K', '0': 'zero-str'},
+	'obj': _WithAttrs(),
+	'reprs': _Reprs(),
+	'fails': _FormatFails(),
+}
+
+_PIECES = [
+	'{a}', '{n:.2f}', '{i:05d}', '{i:x}', '{a:>5}', '{a:*^7}', '{n:bad spec}', '{a:{i}}',
+	'{reprs}', '{reprs!r}', '{reprs!s}', '{reprs!a}', '{reprs:spec}', '{reprs!r:>9}', '{a!x}', '{a!}',
+	'{obj.name}', '{obj.items[1]}', '{obj.missing}', '{list[0]}', '{list[5]}', '{list[x]}',
+	'{map[k]}', '{map[0]}', '{map[missing]}', '{a.upper}', '{a[0]}',
+	'{fails}', '{fails!s}', '{missing}', '{missing.attr}', '{missing:>3}', '{0}', '{}', '{[0]}',
+]
+
+
+def _reference_safe_format(template: str, format_dict: dict) -> str:
+	"""Each piece formatted by python itself, on its own - and left intact if it fails."""
+	parts = list()
+	for token in funcs_template._safe_tokens_gen(template):
+		if isinstance(token, str):
+			parts.append(token)
+			continue
+		open_brackets, inside_brackets, closed_brackets = token
+		prefix, suffix = open_brackets[:-1], closed_brackets[:-1]
+		try:
+			formatted = f'{{{inside_brackets}}}'.format_map(format_dict)
+		except Exception:
+			parts.append(f'{open_brackets}{inside_brackets}{closed_brackets}')
+			continue
+		parts.append(prefix + (inside_brackets if (prefix and suffix) else formatted) + suffix)
+	return ''.join(parts)
+
+
+def _unsafe_format(template: str, format_dict: dict):
+	try:
+		return template.format_map(format_dict)
+	except Exception as e:
+		return type(e)
+
+
+def _both_paths(template: str, format_dict: dict):
+	compiled = funcs_template._compile_template(template, True)
+	return compiled.render(format_dict), compiled._render_pieces(format_dict)
+
+
+@pytest.mark.parametrize('piece', _PIECES)
+def test_single_piece(piece):
+	template = f'<{piece}>'
+	expected = _reference_safe_format(template, _FORMAT_DICT)
+	assert _both_paths(template, _FORMAT_DICT) == (expected, expected)
+	assert node_formatter._Formatter(_FORMAT_DICT, safe=True, show_status=False)(template) == expected
+
+
+@pytest.mark.parametrize('piece', _PIECES)
+def test_unsafe_mode(piece):
+	template = f'<{piece}> {{a}}'
+	formatter = node_formatter._Formatter(_FORMAT_DICT, safe=False, show_status=False)
+	expected = _unsafe_format(template, _FORMAT_DICT)
+	if isinstance(expected, str):
+		assert formatter(template) == expected
+	else:
+		with pytest.raises(expected):
+			formatter(template)
+
+
+def test_one_shot_is_taken_for_plain_templates():
+	template = 'x {a} {n:.1f} {obj.items[0]!r} {reprs!s}'
+	compiled = funcs_template._compile_template(template, True)
+	assert compiled.one_shot
+	assert compiled.render(_FORMAT_DICT) == template.format_map(_FORMAT_DICT) == _reference_safe_format(
+		template, _FORMAT_DICT
+	)
+	# A literal bracket or a piece in extra brackets: python would see different pieces.
+	for template in ('{a}{a}', '{{a}} {a}', '{a}}', '} {a}', '{{{a}}}'):
+		assert not funcs_template._compile_template(template, True).one_shot, template
+
+
+def test_last_failures_dont_leak_into_next_render():
+	template = '{a} {missing} {n:.1f} {fails}'
+	compiled = funcs_template._compile_template(template, True)
+	with_missing_key = {k: v for k, v in _FORMAT_DICT.items() if k != 'fails'}
+	full = dict(_FORMAT_DICT, missing='M', fails='now-ok')
+	for format_dict in (_FORMAT_DICT, with_missing_key, full, _FORMAT_DICT, full, {}, full):
+		assert compiled.render(format_dict) == _reference_safe_format(template, format_dict)
+
+
+def test_random_templates():
+	rnd = random.Random(1)
+	fillers = ['', ' ', 'text', '{', '}', '{{', '}}', ':', '!']
+	for _ in range(3000):
+		template = ''.join(
+			rnd.choice(_PIECES) if rnd.random() < 0.6 else rnd.choice(fillers)
+			for _ in range(rnd.randint(1, 6))
+		)
+		expected = _reference_safe_format(template, _FORMAT_DICT)
+		assert _both_paths(template, _FORMAT_DICT) == (expected, expected), template
+		assert node_formatter._Formatter(_FORMAT_DICT, safe=True, show_status=False)(template) == expected, template
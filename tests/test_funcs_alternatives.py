@@ -0,0 +1,71 @@
+# encoding: utf-8
+
+import itertools
+
+import pytest
+
+from _bootstrap import pack_module
+
+funcs_alternatives = pack_module('funcs_alternatives')
+
+Alternatives = funcs_alternatives.Alternatives
+Expansion = funcs_alternatives.Expansion
+
+
+def test_flat_combinations_are_in_product_order():
+	format_dict = {'a': Alternatives(('1', '2')), 'b': Alternatives(('x', 'y', 'z')), 'c': 'const'}
+	expansion = Expansion('{a} {b} {c}', format_dict)
+	assert expansion.total == 6
+	expected = [f'{a} {b} const' for a, b in itertools.product('12', 'xyz')]
+	assert list(expansion.strings_gen()) == expected
+
+
+def test_nested_alternatives_only_in_branches_using_them():
+	format_dict = {'a': Alternatives(('x {b}', 'y')), 'b': Alternatives(('1', '2'))}
+	expansion = Expansion('{a}', format_dict, recursive=True)
+	assert expansion.total == 3
+	assert list(expansion.strings_gen()) == ['x 1', 'x 2', 'y']
+	# Referenced by the template itself, too - so it's a part of every combination:
+	expansion = Expansion('{a} {b}', format_dict, recursive=True)
+	assert expansion.total == 4
+	assert sorted(expansion.strings_gen()) == ['x 1 1', 'x 2 2', 'y 1', 'y 2']
+
+
+def test_nested_alternatives_slices_and_samples():
+	format_dict = {
+		'a': Alternatives(('x {b}', 'y {c}', 'z')),
+		'b': Alternatives(('1', '2')),
+		'c': Alternatives(('p {b}', 'q')),
+		'd': Alternatives(('u', 'v', 'w')),
+	}
+	expansion = Expansion('{a}-{d}', format_dict, recursive=True)
+	all_strings = list(expansion.strings_gen())
+	assert expansion.total == len(all_strings) == len(set(all_strings)) == 18
+	assert list(expansion.strings_gen(5, 4)) == all_strings[5:9]
+	assert sorted(expansion.strings_gen(seed=3)) == sorted(all_strings)
+
+
+@pytest.mark.parametrize('total', [1, 2, 3, 5, 16, 17, 100, 1000, 4097])
+@pytest.mark.parametrize('seed', [0, 1, 12345])
+def test_shuffle_is_a_permutation(total, seed):
+	indices = list(funcs_alternatives.combination_indices(total, seed=seed))
+	assert sorted(indices) == list(range(total))
+
+
+@pytest.mark.parametrize('window', [1, 7, 64])
+def test_shuffled_windows_dont_overlap(window):
+	total = 1000
+	seen = list()
+	for start in range(0, total, window):
+		seen.extend(funcs_alternatives.combination_indices(total, start, window, seed=42))
+	assert len(seen) == len(set(seen)) == total
+	assert seen == list(funcs_alternatives.combination_indices(total, seed=42))
+
+
+def test_huge_product_sample():
+	format_dict = {f'k{i}': Alternatives(tuple(str(j) for j in range(10))) for i in range(12)}
+	template = ' '.join(f'{{k{i}}}' for i in range(12))
+	expansion = Expansion(template, format_dict)
+	assert expansion.total == 10 ** 12
+	sample = list(expansion.strings_gen(0, 100, seed=7))
+	assert len(set(sample)) == 100
@@ -0,0 +1,57 @@
+# encoding: utf-8
+
+from threading import Lock
+
+from _bootstrap import pack_module
+
+funcs_batch = pack_module('funcs_batch')
+format_dict = pack_module('format_dict')
+
+
+def _lazy_dict_with_local_function():
+	def make_value():
+		return 'lazy'
+	return format_dict.FormatDict.from_mapping({'x': format_dict.LazyValue(make_value)}, keys_validated=True)
+
+
+def test_parallel_matches_serial():
+	templates = [f'{{a}}-{i}' for i in range(64)]
+	dicts = [{'a': 'A'}]
+	expected = funcs_batch.format_batch(templates, dicts, parallel=False)
+	assert funcs_batch.format_batch(templates, dicts, parallel=True, workers=2, min_parallel_size=2) == expected
+
+
+def test_unpicklable_dict_falls_back_to_serial():
+	templates = ['{x}'] * 8
+	dicts = [_lazy_dict_with_local_function()]
+	out = funcs_batch.format_batch(templates, dicts, parallel=True, workers=2, min_parallel_size=2)
+	assert out == ['lazy'] * 8
+	assert not funcs_batch._pool_unusable  # The pool itself isn't to blame
+
+
+def test_unpicklable_lock_falls_back_to_serial():
+	templates = ['{x}-{y}'] * 8
+	dicts = [{'x': 'a', 'y': Lock()}] * 8
+	assert not funcs_batch._is_picklable(dicts)
+	out = funcs_batch.format_batch(templates, dicts, safe=False, parallel=True, workers=2, min_parallel_size=2)
+	assert out == funcs_batch.format_batch(templates, dicts, safe=False, parallel=False)
+
+
+def test_workers_arent_forked():
+	funcs_batch._shutdown_pool()
+	templates = ['{a}'] * 8
+	funcs_batch.format_batch(templates, [{'a': 'A'}], parallel=True, workers=2, min_parallel_size=2)
+	assert funcs_batch._pool is not None
+	assert funcs_batch._pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+	assert not funcs_batch._pool_unusable  # The workers could import the package
+
+
+def test_transient_error_doesnt_disable_the_pool(monkeypatch):
+	def failing_pool(workers):
+		raise OSError("Too many open files")
+	monkeypatch.setattr(funcs_batch, '_get_pool', failing_pool)
+	monkeypatch.setattr(funcs_batch, '_pool_unusable', False)
+	templates = ['{a}'] * 8
+	out = funcs_batch.format_batch(templates, [{'a': 'A'}], parallel=True, workers=2, min_parallel_size=2)
+	assert out == ['A'] * 8
+	assert not funcs_batch._pool_unusable
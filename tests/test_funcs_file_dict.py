@@ -0,0 +1,79 @@
+# encoding: utf-8
+
+import os
+
+import pytest
+
+from _bootstrap import pack_module
+
+funcs_file_dict = pack_module('funcs_file_dict')
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+	root = tmp_path / 'input'
+	root.mkdir()
+	(root / 'sub').mkdir()
+	(root / 'sub' / 'lib.txt').write_text('a\nA\n', encoding='utf-8')
+	(tmp_path / 'outside.txt').write_text('secret\nS\n', encoding='utf-8')
+	funcs_file_dict._clear_cache()
+	return root
+
+
+def test_relative_path_inside(input_dir):
+	path = funcs_file_dict._resolved_path('sub/lib.txt', str(input_dir))
+	assert path == os.path.normcase(os.path.realpath(input_dir / 'sub' / 'lib.txt'))
+	assert funcs_file_dict._resolved_path(str(input_dir / 'sub' / 'lib.txt'), str(input_dir)) == path
+	assert funcs_file_dict._resolved_path('sub/../sub/lib.txt', str(input_dir)) == path
+
+
+@pytest.mark.parametrize('path', ['../outside.txt', 'sub/../../outside.txt', '..'])
+def test_parent_dir_is_rejected(input_dir, path):
+	with pytest.raises(ValueError):
+		funcs_file_dict._resolved_path(path, str(input_dir))
+
+
+def test_absolute_path_outside_is_rejected(input_dir):
+	with pytest.raises(ValueError):
+		funcs_file_dict._resolved_path(str(input_dir.parent / 'outside.txt'), str(input_dir))
+
+
+def test_symlink_out_is_rejected(input_dir):
+	try:
+		os.symlink(input_dir.parent / 'outside.txt', input_dir / 'link.txt')
+	except (OSError, NotImplementedError):
+		pytest.skip("Symlinks aren't supported here")
+	with pytest.raises(ValueError):
+		funcs_file_dict._resolved_path('link.txt', str(input_dir))
+
+
+def test_content_hash_is_computed_once_per_run(input_dir, monkeypatch):
+	calls = []
+	original = funcs_file_dict._content_hash
+
+	def counting_hash(path, size):
+		calls.append(path)
+		return original(path, size)
+
+	monkeypatch.setattr(funcs_file_dict, '_content_hash', counting_hash)
+	path = funcs_file_dict._resolved_path('sub/lib.txt', str(input_dir))
+	check = funcs_file_dict.CHECK_HASH
+
+	for run in range(3):
+		funcs_file_dict.file_signature(path, check)
+		loaded = funcs_file_dict.load_file_dict(path, check=check)
+		assert len(calls) == run + 1
+		assert dict(loaded) == {'a': 'A'}
+
+	# Without a preceding ``file_signature()``, the file is still hashed:
+	funcs_file_dict.load_file_dict(path, check=check)
+	assert len(calls) == 4
+
+
+def test_changed_file_isnt_loaded_with_a_stale_signature(input_dir):
+	path = funcs_file_dict._resolved_path('sub/lib.txt', str(input_dir))
+	check = funcs_file_dict.CHECK_HASH
+	funcs_file_dict.file_signature(path, check)
+	with open(path, 'w', encoding='utf-8') as file:
+		file.write('a\nChanged, and longer\n')
+	assert dict(funcs_file_dict.load_file_dict(path, check=check)) == {'a': 'Changed, and longer'}
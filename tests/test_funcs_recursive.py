@@ -0,0 +1,82 @@
+# encoding: utf-8
+"""
+Recursive formatting resolves the dict entries as a graph - but it must give the very same result
+(or the same error) as re-formatting the whole string until it stops changing, the way the earlier versions did.
+"""
+
+import pytest
+
+from _bootstrap import pack_module
+
+funcs_recursive = pack_module('funcs_recursive')
+node_formatter = pack_module('node_formatter')
+
+_LIMIT = 10
+
+
+@pytest.fixture(autouse=True)
+def _small_recursion_limit(monkeypatch):
+	monkeypatch.setattr(node_formatter, '_RECURSION_LIMIT', _LIMIT)
+
+
+def _fixpoint_format(template: str, format_dict: dict, safe: bool) -> str:
+	"""The legacy algorithm: format the whole string again and again."""
+	formatter = node_formatter._Formatter(format_dict=format_dict, recursive=False, safe=safe, show_status=False)
+	prev = template
+	for _ in range(_LIMIT):
+		new = formatter(prev)
+		if new == prev:
+			return new
+		prev = new
+	raise RecursionError(f"Recursion limit ({_LIMIT}) reached")
+
+
+def _recursive_format(template: str, format_dict: dict, safe: bool) -> str:
+	formatter = node_formatter._Formatter(format_dict=format_dict, recursive=True, safe=safe, show_status=False)
+	return formatter(template)
+
+
+def _chain(length: int) -> dict:
+	format_dict = {f'k{i}': f'{i} {{k{i + 1}}}' for i in range(length)}
+	format_dict[f'k{length}'] = 'end'
+	return format_dict
+
+
+_CASES = [
+	('direct_cycle', '{a}', {'a': 'x {a}'}),
+	('self_reference', '{a}', {'a': '{a}'}),
+	('indirect_cycle', '{a}', {'a': 'x {b}', 'b': 'y {a}'}),
+	('cycle_off_the_template_path', '{c}', {'a': '{b}', 'b': '{a}', 'c': 'plain'}),
+	('escaped_reference', '{a}', {'a': '{{b}}', 'b': 'B'}),
+	('built_from_escapes', '{a}', {'a': '{{{b}}}', 'b': 'c', 'c': 'C'}),
+	('diamond', '{a} {b}', {'a': '{c}', 'b': '{c}', 'c': 'C {d}', 'd': 'D'}),
+	('chain_within_limit', '{k0}', _chain(_LIMIT - 3)),
+	('chain_at_limit', '{k0}', _chain(_LIMIT - 1)),
+	('chain_over_limit', '{k0}', _chain(_LIMIT + 5)),
+]
+
+
+@pytest.mark.parametrize('safe', [True, False], ids=['safe', 'unsafe'])
+@pytest.mark.parametrize('template, format_dict', [c[1:] for c in _CASES], ids=[c[0] for c in _CASES])
+def test_same_as_fixpoint_loop(template, format_dict, safe):
+	try:
+		expected = _fixpoint_format(template, format_dict, safe)
+	except RecursionError:
+		with pytest.raises(RecursionError):
+			_recursive_format(template, format_dict, safe)
+		return
+	assert _recursive_format(template, format_dict, safe) == expected
+
+
+def test_cycle_is_reported_with_its_chain():
+	with pytest.raises(RecursionError, match='a → b → a'):
+		_recursive_format('{a}', {'a': 'x {b}', 'b': 'y {a}'}, True)
+
+
+def test_fallbacks_to_fixpoint_loop():
+	expander = funcs_recursive._RecursiveExpander
+	# A reference built from escaped brackets is only known after formatting:
+	assert expander({'a': '{{{b}}}', 'b': 'c', 'c': 'C'}).expand('{a}', _LIMIT) is None
+	# Too deep to expand: the loop must raise its own error at the same point:
+	assert expander(_chain(_LIMIT + 5)).expand('{k0}', _LIMIT) is None
+	assert expander(_chain(_LIMIT - 3)).expand('{k0}', _LIMIT) is not None
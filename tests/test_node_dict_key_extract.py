@@ -0,0 +1,27 @@
+# encoding: utf-8
+
+from _bootstrap import pack_module
+
+format_dict = pack_module('format_dict')
+funcs_alternatives = pack_module('funcs_alternatives')
+node_dict_key_extract = pack_module('node_dict_key_extract')
+
+extract = node_dict_key_extract.StringConstructorDictExtractString.main
+
+
+def test_lazy_value_is_computed():
+	def make():
+		return 'computed'
+	dict_in = format_dict.FormatDict.from_mapping({'x': format_dict.LazyValue(make)}, keys_validated=True)
+	assert extract('x', dict=dict_in) == ('computed', )
+
+
+def test_alternatives_give_the_first_one():
+	alternatives = funcs_alternatives.Alternatives(('first', 'second'))
+	dict_in = format_dict.FormatDict.from_mapping({'x': alternatives}, keys_validated=True)
+	assert extract('x', dict=dict_in) == ('first', )
+
+
+def test_missing_key():
+	assert extract('x', dict=format_dict.FormatDict.from_mapping({'y': 'a'})) == ('', )
+	assert extract('x', dict=None) == ('', )
@@ -0,0 +1,84 @@
+# encoding: utf-8
+
+from _bootstrap import pack_module
+
+format_dict = pack_module('format_dict')
+funcs_common = pack_module('funcs_common')
+node_dict_add_any = pack_module('node_dict_add_any')
+node_formatter = pack_module('node_formatter')
+
+FormatDict = format_dict.FormatDict
+
+
+def _format(template: str, items: dict) -> str:
+	dict_in = FormatDict.from_mapping(items, keys_validated=True)
+	return node_formatter.StringConstructorFormatter.main(template, dict=dict_in)[0]
+
+
+def test_signed_zero_isnt_a_hit():
+	assert _format('{x}', {'x': 0.0}) == '0.0'
+	assert _format('{x}', {'x': -0.0}) == '-0.0'
+
+
+def test_nested_types_are_checked():
+	assert _format('{x[0]}', {'x': (1, )}) == '1'
+	assert _format('{x[0]}', {'x': (1.0, )}) == '1.0'
+	assert _format('{x[0]}', {'x': (True, )}) == 'True'
+
+
+def test_equal_dicts_still_hit():
+	dict1 = FormatDict.from_mapping({'x': 'a', 'y': (1, 2.5)}, keys_validated=True)
+	dict2 = FormatDict.from_mapping({'x': 'a', 'y': (1, 2.5)}, keys_validated=True)
+	assert dict1 is not dict2
+	out1 = node_formatter.StringConstructorFormatter.main('{x} {y}', dict=dict1)[0]
+	out2 = node_formatter.StringConstructorFormatter.main('{x} {y}', dict=dict2)[0]
+	assert out1 is out2
+
+
+def test_add_any_nested_tuple():
+	add_any = node_dict_add_any.StringConstructorDictAddAny.main
+	out1 = add_any('v', value=(1, (2, )))[0]
+	out2 = add_any('v', value=(1, (2.0, )))[0]
+	assert out1['v'] == (1, (2, ))
+	assert type(out2['v'][1][0]) is float
+
+
+def test_formats_same():
+	formats_same = funcs_common._formats_same
+	assert formats_same([1, 'a', None] * 1000, [1, 'a', None] * 1000)
+	assert not formats_same([1, 2.0], [1.0, 2])
+	assert not formats_same({'a': {'b': 1}}, {'a': {'b': 1.0}})
+	opaque = object()
+	assert formats_same((opaque, ), (opaque, ))
+
+
+class _Opaque:
+	"""A stand-in for an image/latent/model object."""
+
+
+def test_opaque_inputs_arent_cached():
+	import gc
+	import weakref
+
+	add_any = node_dict_add_any.StringConstructorDictAddAny.main
+	value = _Opaque()
+	value_ref = weakref.ref(value)
+	out_dict = add_any('v', value=value)[0]
+	assert out_dict['v'] is value
+	del value, out_dict
+	gc.collect()
+	assert value_ref() is None
+
+
+def test_plain_values():
+	is_plain_value = format_dict.is_plain_value
+	assert is_plain_value(('a', 1, 2.5, None, (True, ), {'b': [1]}))
+	assert is_plain_value(list(range(10000)))
+	assert not is_plain_value((1, _Opaque()))
+	assert not is_plain_value(format_dict.LazyValue(lambda: 1))
+
+	plain_dict = FormatDict.from_mapping({'a': 'x'}, keys_validated=True)
+	assert not plain_dict.has_opaque_values
+	opaque_dict = plain_dict.updated({'b': _Opaque()}, keys_validated=True).updated({'c': 'y'}, keys_validated=True)
+	assert opaque_dict.has_opaque_values
+	assert not is_plain_value(opaque_dict)
@@ -0,0 +1,84 @@
+# encoding: utf-8
+"""
+The safe-mode quirks are defined by the regex-based tokenizer of the earlier versions:
+the current single-pass one must split any template exactly the same way.
+"""
+
+import random
+import re
+
+import pytest
+
+from _bootstrap import pack_module
+
+funcs_template = pack_module('funcs_template')
+node_formatter = pack_module('node_formatter')
+
+
+_re_legacy_match = re.compile(
+	r'(?P<prefix>.*?)'
+	r'(?P<open_brackets>\{+)'
+	r'(?P<inside_brackets>[^{}]+)'
+	r'(?P<closed_brackets>\}+)'
+	r'(?P<suffix>[^{}].*)?$',
+	flags=re.DOTALL,
+).match
+
+
+def _legacy_safe_tokens_gen(template: str):
+	suffix: str = template
+	while suffix:
+		match = _re_legacy_match(suffix)
+		if not match:
+			break
+		prefix, open_brackets, inside_brackets, closed_brackets, suffix = match.groups()
+		if prefix:
+			yield prefix
+		yield open_brackets, inside_brackets, closed_brackets
+	if suffix:
+		yield suffix
+
+
+_FORMAT_DICT = {'a': 'A', 'b': 'B', 'n': 1.5}
+
+_QUIRKS = [
+	('{a}', 'A'),
+	('{a} {b}', 'A B'),
+	('{a}{b}', '{a}B'),  # Adjacent placeholders: only the last one is formatted
+	('{{a}}', '{a}'),
+	('{{{a}}}', '{{a}}'),
+	('{{a}', '{A'),
+	('{a}}', 'A}'),
+	('{a', '{a'),
+	('a}', 'a}'),
+	('{{', '{{'),
+	('}}', '}}'),
+	('{}', '{}'),
+	('{ a }', '{ a }'),
+	('}{a}{', '}{a}{'),
+	('{missing}', '{missing}'),
+	('x{a}y{missing}z{b}', 'xAy{missing}zB'),
+	('{n:.2f}', '1.50'),
+	('{n!r}', '1.5'),
+	('{a:>3}', '  A'),
+	('{a[0]}', 'A'),
+	('{a:{b}}', '{a:B}'),
+	('{"k": 1} {a}', '{"k": 1} A'),
+	('{a}\n{b}', 'A\nB'),
+]
+
+
+@pytest.mark.parametrize('template, expected', _QUIRKS)
+def test_safe_mode_quirks(template, expected):
+	assert list(funcs_template._safe_tokens_gen(template)) == list(_legacy_safe_tokens_gen(template))
+	formatter = node_formatter._Formatter(format_dict=_FORMAT_DICT, recursive=False, safe=True, show_status=False)
+	assert formatter(template) == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_templates_match_legacy_tokenizer(seed):
+	rnd = random.Random(seed)
+	alphabet = ['{', '}', '{{', '}}', 'a', 'b', ' ', ':', '!r', '\n', '[0]', '.x', '"']
+	for _ in range(2000):
+		template = ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 16)))
+		assert list(funcs_template._safe_tokens_gen(template)) == list(_legacy_safe_tokens_gen(template)), template